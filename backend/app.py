@@ -1,27 +1,31 @@
 # backend/app.py
-from fastapi import FastAPI, UploadFile, File, Form, HTTPException
+from fastapi import FastAPI, UploadFile, File, Form, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse, HTMLResponse, FileResponse
+from fastapi.responses import JSONResponse, HTMLResponse, FileResponse, Response
 from fastapi.staticfiles import StaticFiles 
 
-import cv2
 import numpy as np
-import base64
-from io import BytesIO
-from PIL import Image
 import os 
 import logging
 import json
-import time
-import requests
+from urllib.parse import urlencode
 
-from backend.covers.analysis import analyze_cover
-from backend.covers.face import detect_faces
-from backend.covers.filters import apply_filter
 from backend.services.color_picker import ColorPicker
-from backend.services.dataset_loader import load_books
-from backend.services.stats_cache import get_cached_stats
-from backend.services.similarity_service import orb_features, compare_orb
+from backend.services.feature_store import query_stats, GROUP_COLUMNS
+from backend.services.stats_plots import stats_version
+from backend.services.similarity_engine import get_similarity_engine
+from backend.services import cv_tasks, skating_jobs
+from backend.services.analysis_cache import analysis_cache
+from backend.services.executor import (
+    run_in_process, run_in_thread, endpoint_slot, executor_info, shutdown_pools, get_job_pool
+)
+from backend.services.image_io import (
+    read_image_from_bytes, img_to_base64, load_image_from_local, load_image_from_url
+)
+from backend.services.descriptor_index import resolve_path
+from backend.services.thumbnails import ensure_thumbnail
+from backend.services.uploads import receive_form, remove_upload
+from backend.config import MAX_VIDEO_UPLOAD_BYTES
 
 app = FastAPI()
  
@@ -35,28 +39,40 @@ app.add_middleware(
 )
 
 color_picker = ColorPicker()
- 
-def read_image_from_bytes(data):
-    img = Image.open(BytesIO(data)).convert("RGB") 
-    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)  
 
-def img_to_base64(img):
-    _, buf = cv2.imencode(".png", img)
-    return base64.b64encode(buf).decode("utf-8")
 
-def load_image_from_local(path):
-    if not os.path.exists(path):
-        return None
-    return cv2.imread(path)  
+@app.middleware("http")
+async def limit_video_upload(request: Request, call_next):
+    """
+    Ранний отказ по Content-Length, не дожидаясь загрузки. Сам лимит
+    проверяется при приеме тела (receive_form) - Content-Length может не быть
+    """
+    if request.url.path in ("/api/analyze-skating", "/api/skating-jobs"):
+        length = request.headers.get("content-length")
+        # Запас на поля формы и заголовки multipart
+        if length and length.isdigit() and int(length) > MAX_VIDEO_UPLOAD_BYTES + 1024 * 1024:
+            return JSONResponse(
+                {"success": False, "error": f"Файл больше {MAX_VIDEO_UPLOAD_BYTES // (1024 * 1024)} МБ"},
+                status_code=413
+            )
+    return await call_next(request)
+
+
+@app.on_event("startup")
+def load_indexes():
+    """Индекс дескрипторов открывается (memmap) один раз при старте"""
+    index = get_similarity_engine().index
+    if len(index) == 0:
+        logging.warning(
+            "Индекс ORB-дескрипторов пуст - запустите backend/services/build_descriptor_index.py"
+        )
 
-def load_image_from_url(url: str):
-    try:
-        r = requests.get(url, timeout=10)
-        r.raise_for_status()
-        return read_image_from_bytes(r.content)
-    except Exception as e:
-        logging.error(f"Ошибка загрузки изображения по URL: {e}")
-        return None
+
+@app.on_event("shutdown")
+def stop_pools():
+    # Выполняющиеся задачи видео остановятся после текущего прыжка, а не через минуты
+    skating_jobs.cancel_all()
+    shutdown_pools()
 
 
 @app.get("/")
@@ -85,25 +101,29 @@ async def analyze(
     image_url: str = Form(None),
     image_path: str = Form(None)
 ):
-    if file:
-        data = await file.read()
-        img = read_image_from_bytes(data)
-    elif image_url:
-        img = load_image_from_url(image_url)
-        if img is None:
-            return JSONResponse({"error": "Не удалось загрузить изображение по ссылке"}, status_code=400)
-    elif image_path:
-        img = load_image_from_local(image_path)
-        if img is None:
-            return JSONResponse({"error": f"Файл не найден: {image_path}"}, status_code=400)
-    else:
-        return JSONResponse({"error": "Нет изображения"}, status_code=400)
-    analysis = analyze_cover(img)
-    faces = detect_faces(img)
-    for (x, y, w, h) in faces:
-        cv2.rectangle(img, (x, y), (x+w, y+h), (0,255,0), 2)
-    analysis["image_base64"] = img_to_base64(img)
-    return analysis
+    async with endpoint_slot("analyze"):
+        if file:
+            data = await file.read()
+            img = await run_in_thread(read_image_from_bytes, data)
+        elif image_url:
+            img = await run_in_thread(load_image_from_url, image_url)
+            if img is None:
+                return JSONResponse({"error": "Не удалось загрузить изображение по ссылке"}, status_code=400)
+        elif image_path:
+            img = await run_in_thread(load_image_from_local, image_path)
+            if img is None:
+                return JSONResponse({"error": f"Файл не найден: {image_path}"}, status_code=400)
+        else:
+            return JSONResponse({"error": "Нет изображения"}, status_code=400)
+
+        cached, cache_keys = await run_in_thread(analysis_cache.lookup, img)
+        if cached is None:
+            cached = await run_in_process(cv_tasks.analyze_image, img)
+            await run_in_thread(analysis_cache.store, cache_keys, img.shape, cached)
+
+        analysis = dict(cached["analysis"])
+        analysis["image_base64"] = await run_in_thread(cv_tasks.annotate_faces, img, cached["faces"])
+        return analysis
 
 
 @app.post("/api/filter")
@@ -112,18 +132,18 @@ async def filter_image(
     image_url: str = Form(None),
     mode: str = Form(...)
 ):
-    if file:
-        data = await file.read()
-        img = read_image_from_bytes(data)
-    elif image_url:
-        img = load_image_from_url(image_url)
-        if img is None:
-            raise HTTPException(400, "Не удалось загрузить изображение по URL")
-    else:
-        raise HTTPException(400, "Нет изображения")
+    async with endpoint_slot("filter"):
+        if file:
+            data = await file.read()
+            img = await run_in_thread(read_image_from_bytes, data)
+        elif image_url:
+            img = await run_in_thread(load_image_from_url, image_url)
+            if img is None:
+                raise HTTPException(400, "Не удалось загрузить изображение по URL")
+        else:
+            raise HTTPException(400, "Нет изображения")
 
-    filtered = apply_filter(img, mode)
-    return {"image_base64": img_to_base64(filtered)}
+        return await run_in_process(cv_tasks.filter_image, img, mode)
 
 
 
@@ -201,71 +221,139 @@ async def similarity(
     image_url: str = Form(None),
     top_n: int = Form(5)
 ):
-    if file:
-        data = await file.read()
-        query_img = read_image_from_bytes(data)
-    elif image_url:
-        query_img = load_image_from_url(image_url)
-        if query_img is None:
-            return JSONResponse({"error": "Не удалось загрузить изображение"}, status_code=400)
-    else:
-        return JSONResponse({"error": "Нет изображения"}, status_code=400) 
-    query_des = orb_features(query_img)
-    df = load_books("backend/data/books_local.csv", limit=None)
-    results = []
-    for _, row in df.iterrows():
-        img_path = row.get("image_path")
-        if not img_path or not os.path.exists(img_path):
-            continue
-        img = load_image_from_local(img_path)
-        des = orb_features(img)
-        score = compare_orb(query_des, des)
-        results.append({
-            "title": row.get("title", "Unknown"),
-            "score": score,
-            "image_base64": img_to_base64(img)
-        })
-
-    results = sorted(results, key=lambda x: x["score"], reverse=True)[:top_n]
-    return results
+    async with endpoint_slot("similarity"):
+        if file:
+            data = await file.read()
+            query_img = await run_in_thread(read_image_from_bytes, data)
+        elif image_url:
+            query_img = await run_in_thread(load_image_from_url, image_url)
+            if query_img is None:
+                return JSONResponse({"error": "Не удалось загрузить изображение"}, status_code=400)
+        else:
+            return JSONResponse({"error": "Нет изображения"}, status_code=400)
+        if len(get_similarity_engine().index) == 0:
+            # Пустой список здесь неотличим от "похожих нет" - сообщаем, что индекс не построен
+            return JSONResponse(
+                {"error": "Индекс обложек не построен: запустите backend/services/build_descriptor_index.py"},
+                status_code=503
+            )
+        return await run_in_process(cv_tasks.find_similar, query_img, top_n)
+
+
+@app.get("/api/covers/{book_id}/thumbnail")
+async def cover_thumbnail(book_id: int):
+    """Превью обложки из каталога (создается при первом запросе, если его нет)"""
+    entry = get_similarity_engine().index.find(book_id)
+    path = await run_in_thread(ensure_thumbnail, book_id, entry["image_path"]) if entry else None
+    if not path:
+        raise HTTPException(404, "Обложка не найдена")
+    return FileResponse(path, media_type="image/webp", headers={"Cache-Control": "public, max-age=86400"})
+
+
+@app.get("/api/covers/{book_id}")
+async def cover_image(book_id: int):
+    """Обложка из каталога в исходном размере"""
+    entry = get_similarity_engine().index.find(book_id)
+    path = resolve_path(entry["image_path"]) if entry else None
+    if not path or not os.path.exists(path):
+        raise HTTPException(404, "Обложка не найдена")
+    return FileResponse(path, headers={"Cache-Control": "public, max-age=86400"})
 
 
 # ---- API маршруты для статистики ----
 
+def stats_plot_url(stats, genre=None, design=None, face=None):
+    """URL графика с версией в параметрах: браузер кеширует его, пока данные не изменятся"""
+    params = [("genre", g) for g in genre or []] + [("design", d) for d in design or []]
+    if face is not None:
+        params.append(("face", str(face).lower()))
+    params.append(("v", stats_version(stats)))
+    return "/api/genre-stats/plot?" + urlencode(params)
+
+
+async def load_genre_stats(force_refresh=False, genre=None, design=None, face=None, group_by=None):
+    """Статистика из кеша (или пересчитанная) с необязательными фильтрами и разбивкой"""
+    if group_by and group_by not in GROUP_COLUMNS:
+        raise HTTPException(400, f"group_by должен быть одним из: {', '.join(GROUP_COLUMNS)}")
+
+    async with endpoint_slot("stats"):
+        # Устаревший кеш пересчитывается в пуле процессов, а не в процессе сервера
+        stats = await run_in_process(cv_tasks.refresh_stats, "backend/data/books_local.csv", force_refresh)
+
+        if genre or design or face is not None or group_by:
+            # Агрегаты по таблице признаков, построенной при расчете статистики
+            filtered = await run_in_thread(query_stats, genre, design, face, group_by)
+            if filtered is None:
+                raise HTTPException(404, "Таблица признаков обложек не построена, обновите статистику")
+            stats = dict(stats, **filtered, filters={"genre": genre, "design": design, "face": face})
+    return stats
+
+
 @app.get("/api/genre-stats")
-async def genre_stats(force_refresh: bool = False):
-    """Возвращает статистику из кеша или вычисляет заново"""
+async def genre_stats(
+    force_refresh: bool = False,
+    genre: list[str] = Query(None),
+    design: list[str] = Query(None),
+    face: bool = None,
+    group_by: str = None
+):
+    """
+    Возвращает статистику из кеша или вычисляет заново.
+    genre/design/face - отбор обложек, group_by - разбивка (genre, design, face, status).
+    График не встраивается в ответ - он доступен по plot_url
+    """
     try:
-        stats = get_cached_stats("backend/data/books_local.csv", force_refresh=force_refresh)
-        
-        plot_path = stats.get("plot_path", "")
-        if plot_path and os.path.exists(plot_path):
-            try:
-                with open(plot_path, "rb") as img_file:
-                    stats["plot_base64"] = base64.b64encode(img_file.read()).decode('utf-8')
-            except Exception as e:
-                logging.error(f"Ошибка загрузки графика: {e}")
-                stats["plot_base64"] = None
-        else:
-            stats["plot_base64"] = None
-        
+        stats = await load_genre_stats(force_refresh, genre, design, face, group_by)
+
+        stats["plot_url"] = stats_plot_url(stats, genre, design, face)
         stats["source"] = "cache" if not force_refresh else "fresh"
         stats["cache_info"] = "" if not force_refresh else "Пересчитанная статистика"
         
         return stats
         
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(
             {"error": f"Ошибка получения статистики: {str(e)}"}, 
             status_code=500
         )
 
+
+@app.get("/api/genre-stats/plot")
+async def genre_stats_plot(
+    request: Request,
+    genre: list[str] = Query(None),
+    design: list[str] = Query(None),
+    face: bool = None,
+    v: str = None
+):
+    """
+    PNG с графиками статистики. Рисуется при первом запросе для каждой версии
+    данных; ETag - версия, при совпадении If-None-Match отвечаем 304
+    """
+    stats = await load_genre_stats(genre=genre, design=design, face=face)
+    version = stats_version(stats)
+    etag = f'"{version}"'
+    # С актуальной версией в URL ответ неизменен - кешируем надолго
+    cache_control = "public, max-age=31536000, immutable" if v == version else "no-cache"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    path = await run_in_process(cv_tasks.render_stats_plot, stats)
+    return FileResponse(path, media_type="image/png", headers=headers)
+
 @app.post("/api/refresh-stats")
 async def refresh_stats():
     """Обновление статистики"""
     try:
-        stats = get_cached_stats("backend/data/books_local.csv", force_refresh=True)
+        async with endpoint_slot("stats"):
+            stats = await run_in_process(cv_tasks.refresh_stats, "backend/data/books_local.csv", True)
         return {"message": "Статистика обновлена", "stats": stats}
+    except HTTPException:
+        raise
     except Exception as e:
         return JSONResponse(
             {"error": f"Ошибка обновления статистики: {str(e)}"}, 
@@ -276,82 +364,180 @@ async def refresh_stats():
 # ---- API маршруты для анализа видео фигурного катания ----
 from backend.video.utils import extract_frames_interval
 
-@app.post("/api/analyze-skating")
-async def analyze_skating_video(
-    file: UploadFile = File(None),
-    youtube_url: str = Form(None),
-    jump_intervals: str = Form(None)
-): 
+def parse_jump_intervals(jump_intervals):
+    """
+    Интервалы прыжков из поля формы: [[start, end], ...]; ошибки - ValueError.
+    Пустое поле - None: прыжки ищутся автоматически
+    """
+    if not jump_intervals or not jump_intervals.strip():
+        return None
     try:
-        video_path = None
-        parsed_intervals = None
-
-        # 1. получение интервалов
-        if not jump_intervals:
-            return JSONResponse(
-                {"success": False, "error": "Не указаны интервалы прыжков. Пример: [[75,78],[94,96]]"},
-                status_code=400
-            )
+        parsed_intervals = json.loads(jump_intervals)
+    except json.JSONDecodeError:
+        raise ValueError("Неверный формат JSON для jump_intervals")
+
+    if not isinstance(parsed_intervals, list) or len(parsed_intervals) == 0:
+        raise ValueError("Интервалы должны быть непустым списком [[start,end], ...]")
+    for interval in parsed_intervals:
+        if not isinstance(interval, list) or len(interval) != 2:
+            raise ValueError("Каждый интервал должен быть списком [start, end]")
+        if interval[0] >= interval[1]:
+            raise ValueError("Начало интервала должно быть меньше конца")
+    return parsed_intervals
+
+
+# Форма загрузки видео для документации: тело разбирается вручную (receive_form)
+VIDEO_FORM = {
+    "requestBody": {
+        "content": {
+            "multipart/form-data": {
+                "schema": {
+                    "type": "object",
+                    "properties": {
+                        "file": {"type": "string", "format": "binary"},
+                        "youtube_url": {"type": "string"},
+                        "jump_intervals": {"type": "string", "description": "JSON [[start, end], ...]"}
+                    }
+                }
+            }
+        }
+    }
+}
+
+
+async def receive_video(request):
+    """
+    Поля формы и путь к видео на диске (скачанному или загруженному) или None.
+    Загруженный файл пишется на диск по мере приема тела запроса - без копии
+    во временном файле Starlette; анализ идет сразу по этому файлу
+    """
+    fields, upload_path = await receive_form(request)
+    youtube_url = fields.get("youtube_url")
+    if youtube_url:
+        remove_upload(upload_path)
+        from backend.video.loader import download_youtube_video
+        return fields, await run_in_thread(download_youtube_video, youtube_url)
+    return fields, upload_path
+
+
+@app.post("/api/analyze-skating", openapi_extra=VIDEO_FORM)
+async def analyze_skating_video(request: Request):
+    video_path = None
+    try:
+        # 1. загрузка видео и полей формы
+        fields, video_path = await receive_video(request)
 
+        # 2. получение интервалов
         try:
-            parsed_intervals = json.loads(jump_intervals)
-            if not isinstance(parsed_intervals, list) or len(parsed_intervals) == 0:
-                raise ValueError("Интервалы должны быть непустым списком [[start,end], ...]")
-            for interval in parsed_intervals:
-                if not isinstance(interval, list) or len(interval) != 2:
-                    raise ValueError("Каждый интервал должен быть списком [start, end]")
-                if interval[0] >= interval[1]:
-                    raise ValueError("Начало интервала должно быть меньше конца")
-        except json.JSONDecodeError:
-            return JSONResponse(
-                {"success": False, "error": "Неверный формат JSON для jump_intervals"},
-                status_code=400
-            )
+            parsed_intervals = parse_jump_intervals(fields.get("jump_intervals"))
+        except ValueError as e:
+            return JSONResponse({"success": False, "error": str(e)}, status_code=400)
 
-        # 2. загрузка видео
-        if youtube_url:
-            from backend.video.loader import download_youtube_video
-            video_path = download_youtube_video(youtube_url)
-        elif file and file.filename:
-            upload_dir = "uploads"
-            os.makedirs(upload_dir, exist_ok=True)
-            timestamp = int(time.time())
-            safe_filename = f"{timestamp}_{file.filename}"
-            video_path = os.path.join(upload_dir, safe_filename)
-            with open(video_path, "wb") as buffer:
-                buffer.write(await file.read())
-        else:
+        if video_path is None:
             return JSONResponse(
                 {"success": False, "error": "Необходимо загрузить файл или указать YouTube ссылку"},
                 status_code=400
             )
 
-        # 3. инициализация 
-        from backend.video.analyze_skating_improved import SkatingAnalyzer
-        analyzer = SkatingAnalyzer()   
-        result = analyzer.analyze_skating(video_path, jump_intervals=parsed_intervals)
+        # 3. анализ в пуле процессов
+        async with endpoint_slot("skating"):
+            result = await run_in_process(cv_tasks.analyze_skating, video_path, parsed_intervals)
  
-        result["analysis_method"] = "manual_only"
+        result["analysis_method"] = "manual_only" if parsed_intervals else "auto_candidates"
         result["shots_analysis"] = []
-        result["all_jumps"] = []
-        result["shots_timeline"] = []
-        result["total_jumps"] = 0
-        result["shots_detected"] = 0
-
-        # 4. очистка временного файла
-        if video_path and os.path.exists(video_path):
-            try:
-                os.unlink(video_path)
-            except:
-                pass
+        result["all_jumps"] = result.get("detected_jumps", [])
+        result["shots_timeline"] = result.get("shots_timeline", [])
+        result["total_jumps"] = len(result["all_jumps"])
+        result["shots_detected"] = len(result["shots_timeline"])
         return result
 
+    except HTTPException:
+        raise
     except Exception as e:
         logging.error(f"Ошибка анализа видео фигурного катания: {str(e)}")
         return JSONResponse(
             {"success": False, "error": f"Ошибка анализа: {str(e)}"},
             status_code=500
         )
+    finally:
+        # 4. очистка временного файла (в том числе при ошибке или отказе 413/429/503)
+        remove_upload(video_path)
+
+
+# ---- Фоновые задачи анализа видео ----
+
+@app.post("/api/skating-jobs", status_code=202, openapi_extra=VIDEO_FORM)
+async def create_skating_job(request: Request):
+    """
+    Ставит анализ видео в очередь и сразу возвращает job_id. Если это видео
+    с этими интервалами уже анализировалось, результат берется из хранилища
+    """
+    fields, video_path = await receive_video(request)
+    try:
+        parsed_intervals = parse_jump_intervals(fields.get("jump_intervals"))
+    except ValueError as e:
+        remove_upload(video_path)
+        return JSONResponse({"success": False, "error": str(e)}, status_code=400)
+
+    if video_path is None:
+        return JSONResponse(
+            {"success": False, "error": "Необходимо загрузить файл или указать YouTube ссылку"},
+            status_code=400
+        )
+
+    try:
+        job_id, key = await run_in_thread(skating_jobs.create_job, video_path, parsed_intervals)
+        if key is None:
+            remove_upload(video_path)
+        else:
+            # Видео теперь принадлежит задаче: его удалит воркер по завершении
+            skating_jobs.submit_job(get_job_pool(), job_id, video_path, parsed_intervals, key)
+    except Exception:
+        remove_upload(video_path)
+        raise
+    return skating_jobs.get_status(job_id)
+
+
+@app.get("/api/skating-jobs/{job_id}")
+async def skating_job_status(job_id: str):
+    """Состояние задачи: queued/running/done/failed/cancelled и прогресс по прыжкам"""
+    status = await run_in_thread(skating_jobs.get_status, job_id)
+    if status is None:
+        raise HTTPException(404, "Задача не найдена")
+    return status
+
+
+@app.get("/api/skating-jobs/{job_id}/result")
+async def skating_job_result(job_id: str):
+    status = await run_in_thread(skating_jobs.get_status, job_id)
+    if status is None:
+        raise HTTPException(404, "Задача не найдена")
+    if status["state"] != skating_jobs.DONE:
+        raise HTTPException(409, f"Результат еще не готов: {status['state']}")
+    return await run_in_thread(skating_jobs.get_result, job_id)
+
+
+@app.delete("/api/skating-jobs/{job_id}")
+async def cancel_skating_job(job_id: str):
+    """Отмена: задача в очереди снимается сразу, выполняющаяся - после текущего прыжка"""
+    status = await run_in_thread(skating_jobs.cancel_job, job_id)
+    if status is None:
+        raise HTTPException(404, "Задача не найдена")
+    return status
+
+
+# ---- Состояние пулов выполнения и кешей ----
+
+@app.get("/api/executor-stats")
+async def executor_stats():
+    """Загрузка пулов процессов/потоков и очередей эндпоинтов"""
+    return executor_info()
+
+
+@app.get("/api/cache-stats")
+async def cache_stats():
+    """Попадания/промахи кеша /api/analyze по уровням"""
+    return await run_in_thread(analysis_cache.info)
 
 
 # ---- Статические файлы фронтенда ----
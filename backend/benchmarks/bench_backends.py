@@ -0,0 +1,58 @@
+# backend/benchmarks/bench_backends.py
+"""
+Сравнение бэкендов детектора фигуриста на одних и тех же кадрах:
+совпадение с ultralytics (доля кадров с тем же решением "есть/нет
+фигуриста", средний IoU рамки) и задержка на кадр.
+
+    python -m backend.benchmarks.bench_backends --video program.mp4 --frames 120
+"""
+import argparse
+import time
+
+from backend.benchmarks.bench_detector import iou, read_frames
+from backend.video.detector_backends import DETECTOR_BACKENDS
+from backend.video.skater_detector import SkaterDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Точность и задержка бэкендов детектора")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--backends", default=",".join(DETECTOR_BACKENDS))
+    parser.add_argument("--min-iou", type=float, default=0.9, help="Порог IoU для совпадения рамок")
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.start, args.frames)
+    if not frames:
+        print(f"❌ Не удалось прочитать кадры: {args.video}")
+        return
+
+    reference = None
+    for name in args.backends.split(","):
+        detector = SkaterDetector(backend=name)
+        if detector.backend.name != name:
+            print(f"⚠️ {name}: недоступен, пропускаем")
+            continue
+
+        start = time.perf_counter()
+        boxes = [full for _, full in detector.detect_skaters(frames)]
+        ms_per_frame = 1000 * (time.perf_counter() - start) / len(frames)
+
+        if reference is None:
+            reference = boxes
+            print(f"{name:12s} {ms_per_frame:7.1f} мс/кадр (эталон)")
+            continue
+
+        same_presence = sum((a is None) == (b is None) for a, b in zip(reference, boxes))
+        ious = [iou(a, b) for a, b in zip(reference, boxes) if a is not None and b is not None]
+        mean_iou = sum(ious) / len(ious) if ious else 0.0
+        matched = sum(v >= args.min_iou for v in ious)
+        print(
+            f"{name:12s} {ms_per_frame:7.1f} мс/кадр, наличие совпало: {same_presence}/{len(frames)}, "
+            f"средний IoU: {mean_iou:.3f}, IoU >= {args.min_iou}: {matched}/{len(ious)}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# backend/benchmarks/bench_decode.py
+"""
+Время декодирования окон [до прыжка, прыжок, после] для нескольких прыжков:
+прежнее чтение (отдельный VideoCapture и перемотка на каждое окно) против
+FramePlanner (объединенные отрезки, один проход по файлу).
+
+    python -m backend.benchmarks.bench_decode --video program.mp4 --intervals "[[75, 78], [94, 96]]"
+    python -m backend.benchmarks.bench_decode --video program.mp4 --jumps 8
+"""
+import argparse
+import json
+import time
+
+import cv2
+
+from backend.video.frame_planner import FramePlanner
+from backend.video.utils import extract_frames_interval
+
+
+def legacy_decode(video_path, intervals, context_window):
+    frames = 0
+    for start, end in intervals:
+        cap = cv2.VideoCapture(video_path)
+        cap.get(cv2.CAP_PROP_FPS)
+        cap.release()
+        for a, b in ((start, end), (max(0, start - context_window), start), (end, end + context_window)):
+            window, _ = extract_frames_interval(video_path, a, b)
+            frames += len(window)
+    return frames
+
+
+def planner_decode(video_path, intervals, context_window):
+    planner = FramePlanner(video_path)
+    for idx, (start, end) in enumerate(intervals):
+        planner.add((idx, "pre"), max(0, start - context_window), start)
+        planner.add((idx, "jump"), start, end)
+        planner.add((idx, "post"), end, end + context_window)
+
+    frames = 0
+    for windows in planner.read():
+        frames += sum(len(window) for window, _ in windows.values())
+    spans = planner.spans()
+    decoded = sum(stop - start for start, stop, _ in spans)
+    return frames, decoded, len(spans)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер декодирования окон прыжков")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--intervals", help="JSON со списком [начало, конец] в секундах")
+    parser.add_argument("--jumps", type=int, default=8, help="Число прыжков, если --intervals не задан")
+    parser.add_argument("--jump-duration", type=float, default=2.0)
+    parser.add_argument("--context", type=float, default=3.0)
+    args = parser.parse_args()
+
+    if args.intervals:
+        intervals = json.loads(args.intervals)
+    else:
+        # Прыжки равномерно по программе, контекст соседних пересекается
+        cap = cv2.VideoCapture(args.video)
+        duration = cap.get(cv2.CAP_PROP_FRAME_COUNT) / (cap.get(cv2.CAP_PROP_FPS) or 25)
+        cap.release()
+        step = duration / (args.jumps + 1)
+        intervals = [[round(step * (i + 1), 2), round(step * (i + 1) + args.jump_duration, 2)] for i in range(args.jumps)]
+    print(f"🎬 Прыжков: {len(intervals)}, контекст: {args.context} с")
+
+    start = time.perf_counter()
+    legacy_frames = legacy_decode(args.video, intervals, args.context)
+    legacy_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    frames, decoded, spans = planner_decode(args.video, intervals, args.context)
+    planner_time = time.perf_counter() - start
+
+    print(f"Прежнее чтение: {legacy_time:.2f} с, кадров в окнах: {legacy_frames}, открытий файла: {4 * len(intervals)}")
+    print(f"FramePlanner:   {planner_time:.2f} с, кадров в окнах: {frames}, декодировано: {decoded}, отрезков: {spans}")
+    print(f"Ускорение: {legacy_time / planner_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# backend/benchmarks/bench_detector.py
+"""
+Скорость детекции фигуриста на CPU: покадровый detect_skater против
+пакетного detect_skaters с разными размерами пачки и размерами входа
+YOLO (кадров/с; для размеров входа - средний IoU с рамками при 640).
+
+    python -m backend.benchmarks.bench_detector --video program.mp4 --frames 120 --input-sizes 640,416,320
+"""
+import argparse
+import time
+
+import cv2
+
+from backend.video.skater_detector import SkaterDetector
+
+
+def read_frames(video_path, start_sec, count):
+    cap = cv2.VideoCapture(video_path)
+    cap.set(cv2.CAP_PROP_POS_MSEC, start_sec * 1000)
+    frames = []
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames
+
+
+def iou(a, b):
+    if a is None or b is None:
+        return float(a is None and b is None)
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер пакетной детекции YOLO")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--start", type=float, default=0.0, help="С какой секунды брать кадры")
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--batch-sizes", default="1,4,8,16,32")
+    parser.add_argument("--input-sizes", default="640,480,416,320")
+    parser.add_argument("--backend", default="ultralytics", help="ultralytics, onnx или onnx-int8")
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.start, args.frames)
+    if not frames:
+        print(f"❌ Не удалось прочитать кадры: {args.video}")
+        return
+    h, w = frames[0].shape[:2]
+    detector = SkaterDetector(backend=args.backend)
+    print(f"🎬 Кадров: {len(frames)}, разрешение {w}x{h}, бэкенд: {detector.backend.name} ({detector.backend.device})")
+
+    detector.detect_skaters(frames[:1])  # прогрев
+
+    start = time.perf_counter()
+    single = [detector.detect_skater(frame)[1] for frame in frames]
+    elapsed = time.perf_counter() - start
+    print(f"По одному кадру:  {len(frames) / elapsed:6.2f} кадров/с")
+
+    for batch_size in (int(b) for b in args.batch_sizes.split(",")):
+        start = time.perf_counter()
+        batched = detector.detect_skaters(frames, batch_size=batch_size)
+        elapsed = time.perf_counter() - start
+        mismatches = sum(a != b for a, (b, _) in zip(single, batched))
+        print(f"Пачка {batch_size:3d}:        {len(frames) / elapsed:6.2f} кадров/с, расхождений: {mismatches}")
+
+    detector.input_size = 640
+    reference = [full for _, full in detector.detect_skaters(frames)]
+    for input_size in (int(s) for s in args.input_sizes.split(",")):
+        detector.input_size = input_size
+        detector.detect_skaters(frames[:1])  # прогрев под новый размер
+        start = time.perf_counter()
+        boxes = [full for _, full in detector.detect_skaters(frames)]
+        elapsed = time.perf_counter() - start
+        mean_iou = sum(iou(a, b) for a, b in zip(reference, boxes)) / len(frames)
+        print(f"Вход {input_size:4d}:         {len(frames) / elapsed:6.2f} кадров/с, IoU с 640: {mean_iou:.3f}")
+
+
+if __name__ == "__main__":
+    main()
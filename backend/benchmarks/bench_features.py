@@ -0,0 +1,147 @@
+# backend/benchmarks/bench_features.py
+"""
+Бенчмарк извлечения признаков обложки: прежний конвейер (каждая метрика
+сама считает grayscale/Canny/контуры, лица ищутся дважды - в analyze_cover
+и в /api/analyze) против CoverFeatures, где примитивы считаются один раз.
+
+KMeans и OCR по умолчанию не замеряются - этот рефакторинг их не меняет.
+
+    python -m backend.benchmarks.bench_features --limit 200
+"""
+import argparse
+import os
+import time
+
+import cv2
+import numpy as np
+
+from backend.config import BOOKS_CSV
+from backend.covers.analysis import dominant_colors, text_density, edge_density, negative_space_ratio
+from backend.covers.face import detect_faces
+from backend.covers.features import CoverFeatures
+from backend.covers.placeholder import is_placeholder
+from backend.covers.placeholder_ocr import preprocess_for_ocr
+from backend.services.dataset_loader import load_books
+from backend.services.descriptor_index import resolve_path
+
+
+# ---- Прежняя реализация (до CoverFeatures) ----
+
+def legacy_is_placeholder(image, white_thresh=240, white_ratio_thresh=0.45, edge_thresh=0.05, text_thresh=0.03):
+    h, w, _ = image.shape
+    area = h * w
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    white_ratio = np.sum(gray > white_thresh) / area
+    edges = cv2.Canny(gray, 100, 200)
+    edge_density = np.sum(edges > 0) / edges.size
+    _, thresh = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    text_density = sum(cv2.contourArea(c) for c in contours) / area
+    is_blank = white_ratio > white_ratio_thresh and edge_density < edge_thresh and text_density < text_thresh
+    return {
+        "is_placeholder": bool(is_blank),
+        "white_ratio": round(white_ratio, 3),
+        "edge_density": round(edge_density, 3),
+        "text_density": round(text_density, 3)
+    }
+
+
+def legacy_text_density(image):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    _, thresh = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
+    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+    return sum(cv2.contourArea(c) for c in contours) / (image.shape[0] * image.shape[1])
+
+
+def legacy_edge_density(image):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 100, 200)
+    return np.sum(edges > 0) / edges.size
+
+
+def legacy_negative_space_ratio(image):
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    edges = cv2.Canny(gray, 100, 200)
+    return 1 - (np.sum(edges > 0) / edges.size)
+
+
+def legacy_pipeline(image, with_colors):
+    return {
+        "visual": legacy_is_placeholder(image),
+        "ocr_input": preprocess_for_ocr(image),
+        "colors": dominant_colors(image) if with_colors else None,
+        "text": legacy_text_density(image),
+        "edge": legacy_edge_density(image),
+        "negative": legacy_negative_space_ratio(image),
+        "faces": detect_faces(image),
+        "faces_api": detect_faces(image),
+    }
+
+
+def shared_pipeline(image, with_colors):
+    features = CoverFeatures(image)
+    return {
+        "visual": is_placeholder(image, features=features),
+        "ocr_input": preprocess_for_ocr(image, gray=features.gray),
+        "colors": dominant_colors(image) if with_colors else None,
+        "text": text_density(image, features),
+        "edge": edge_density(image, features),
+        "negative": negative_space_ratio(image, features),
+        "faces": features.faces,
+        "faces_api": features.faces,
+    }
+
+
+def identical(a, b):
+    for key in a:
+        x, y = a[key], b[key]
+        if isinstance(x, np.ndarray) or isinstance(y, np.ndarray):
+            if not np.array_equal(np.asarray(x), np.asarray(y)):
+                return False
+        elif x != y:
+            return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк CoverFeatures")
+    parser.add_argument("--csv", default=BOOKS_CSV)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--with-colors", action="store_true", help="Включить KMeans в замер")
+    args = parser.parse_args()
+
+    df = load_books(args.csv, limit=args.limit)
+    legacy_time = shared_time = 0.0
+    n = mismatches = 0
+
+    for image_path in df["image_path"]:
+        path = resolve_path(image_path)
+        img = cv2.imread(path) if os.path.exists(path) else None
+        if img is None:
+            continue
+
+        start = time.perf_counter()
+        legacy = legacy_pipeline(img, args.with_colors)
+        legacy_time += time.perf_counter() - start
+
+        start = time.perf_counter()
+        shared = shared_pipeline(img, args.with_colors)
+        shared_time += time.perf_counter() - start
+
+        n += 1
+        if not identical(legacy, shared):
+            mismatches += 1
+            print(f"⚠️ Расхождение: {image_path}")
+
+    if n == 0:
+        print("Нет изображений для замера")
+        return
+
+    print(f"Обложек: {n}, расхождений: {mismatches}")
+    print(f"Прежний конвейер: {1000 * legacy_time / n:.2f} мс/обложка")
+    print(f"CoverFeatures:    {1000 * shared_time / n:.2f} мс/обложка")
+    print(f"Ускорение: {legacy_time / shared_time:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
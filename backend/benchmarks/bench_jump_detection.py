@@ -0,0 +1,58 @@
+# backend/benchmarks/bench_jump_detection.py
+"""
+Скорость автоматического поиска прыжков относительно длительности видео
+(x > 1 - быстрее реального времени) и найденные интервалы.
+Если заданы ручные интервалы, печатает, сколько из них найдено.
+
+    python -m backend.benchmarks.bench_jump_detection --video program.mp4
+    python -m backend.benchmarks.bench_jump_detection --video program.mp4 --intervals "[[75, 78], [94, 96]]" --no-yolo
+"""
+import argparse
+import json
+import time
+
+import cv2
+
+from backend.video.jumps_improved import ImprovedJumpDetector
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер автоматического поиска прыжков")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--intervals", help="JSON с ручными интервалами [начало, конец] для сверки")
+    parser.add_argument("--sample-fps", type=float, default=10)
+    parser.add_argument("--detect-fps", type=float, default=2)
+    parser.add_argument("--motion", default="dis", help="Плотный оценщик движения: dis или farneback")
+    parser.add_argument("--stride", type=int, default=0, help="Шаг между кадрами с потоком (0 - из --sample-fps)")
+    parser.add_argument("--no-yolo", action="store_true", help="Только оптический поток, без детектора")
+    args = parser.parse_args()
+
+    cap = cv2.VideoCapture(args.video)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    duration = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) / fps
+    cap.release()
+
+    skater_detector = None
+    if not args.no_yolo:
+        from backend.video.skater_detector import SkaterDetector
+        skater_detector = SkaterDetector()
+
+    detector = ImprovedJumpDetector(
+        skater_detector, sample_fps=args.sample_fps, detect_fps=args.detect_fps, motion=args.motion, stride=args.stride
+    )
+    start = time.perf_counter()
+    jumps, detections = detector.scan(args.video)
+    elapsed = time.perf_counter() - start
+
+    print(f"🎬 Видео {duration:.0f} с, поиск {elapsed:.1f} с (x{duration / elapsed:.1f} к реальному времени), YOLO: {len(detections)} кадров")
+    for jump in jumps:
+        print(f"   {jump['start']:7.2f} - {jump['end']:7.2f} с, оценка {jump['score']:6.2f} ({jump['detection_method']})")
+
+    if args.intervals:
+        intervals = json.loads(args.intervals)
+        found = sum(any(jump["start"] <= end and jump["end"] >= start for jump in jumps) for start, end in intervals)
+        print(f"✅ Найдено ручных интервалов: {found} из {len(intervals)}, лишних кандидатов: {max(0, len(jumps) - found)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,120 @@
+# backend/benchmarks/bench_motion.py
+"""
+Оценщики движения для detect_jumps на размеченных клипах: скорость
+(кадров видео в секунду), корреляция вертикального смещения с эталоном
+(Farneback 480x270, шаг 1) и совпадение найденных прыжков с эталоном и
+с разметкой.
+
+Разметка - JSON: [{"video": "clip.mp4", "jumps": [[начало, конец], ...]}, ...]
+(время в секундах от начала клипа).
+
+    python -m backend.benchmarks.bench_motion --clips clips.json --configs farneback:1,dis:1,dis:2,lk:1,lk:2
+    python -m backend.benchmarks.bench_motion --clips clips.json --yolo
+"""
+import argparse
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+from backend.video.jumps import detect_jumps
+from backend.video.motion import create_motion_estimator
+
+
+def read_clip(video_path):
+    cap = cv2.VideoCapture(video_path)
+    fps = cap.get(cv2.CAP_PROP_FPS) or 25
+    frames = []
+    while True:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+    return frames, fps
+
+
+def motion_series(frames, name, stride, bboxes):
+    """Вертикальное смещение на кадр по шагам stride: (номера кадров, dy, секунды)"""
+    estimator = create_motion_estimator(name)
+    indices, dy = [], []
+    start = time.perf_counter()
+    prev = estimator.prepare(frames[0])
+    for i in range(stride, len(frames), stride):
+        curr = estimator.prepare(frames[i])
+        bbox = bboxes[i - stride] if bboxes is not None else None
+        dy.append(estimator.estimate(prev, curr, bbox)[1] / stride)
+        indices.append(i)
+        prev = curr
+    return np.array(indices), np.array(dy), time.perf_counter() - start
+
+
+def matched(found, reference, tolerance=0.3):
+    """Сколько интервалов reference пересекаются с найденными (с допуском tolerance с)"""
+    return sum(
+        any(jump["time"] - tolerance <= end and jump["end_time"] + tolerance >= start for jump in found)
+        for start, end in reference
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Сравнение оценщиков движения для поиска прыжков")
+    parser.add_argument("--clips", required=True, help="JSON с разметкой клипов")
+    parser.add_argument("--configs", default="farneback:1,farneback:2,dis:1,dis:2,lk:1,lk:2",
+                        help="оценщик:шаг через запятую")
+    parser.add_argument("--yolo", action="store_true", help="Рамки фигуриста от YOLO (для lk и среднего по рамке)")
+    args = parser.parse_args()
+
+    with open(args.clips, "r", encoding="utf-8") as f:
+        clips = json.load(f)
+    base_dir = os.path.dirname(os.path.abspath(args.clips))
+    configs = [(name, int(stride)) for name, stride in (c.split(":") for c in args.configs.split(","))]
+
+    detector = None
+    if args.yolo:
+        from backend.video.skater_detector import SkaterDetector
+        detector = SkaterDetector()
+
+    totals = {config: {"frames": 0, "seconds": 0.0, "corr": [], "baseline": 0, "labels": 0} for config in configs}
+    baseline_total = labels_total = 0
+    for clip in clips:
+        frames, fps = read_clip(os.path.join(base_dir, clip["video"]))
+        if len(frames) < 10:
+            print(f"❌ Слишком короткий клип: {clip['video']}")
+            continue
+        bboxes = [full for _, full in detector.detect_skaters(frames)] if detector else None
+
+        base_indices, base_dy, _ = motion_series(frames, "farneback", 1, bboxes)
+        baseline = detect_jumps(frames, fps, bboxes=bboxes)
+        baseline_intervals = [[jump["time"], jump["end_time"]] for jump in baseline]
+        baseline_total += len(baseline_intervals)
+        labels_total += len(clip["jumps"])
+
+        for name, stride in configs:
+            indices, dy, seconds = motion_series(frames, name, stride, bboxes)
+            # Эталон на тех же кадрах, усредненный по шагу
+            reference = np.array([base_dy[max(0, i - stride):i].mean() for i in indices])
+            found = detect_jumps(frames, fps, motion=name, stride=stride, bboxes=bboxes)
+            stats = totals[(name, stride)]
+            stats["frames"] += len(frames)
+            stats["seconds"] += seconds
+            if np.std(dy) > 0 and np.std(reference) > 0:
+                stats["corr"].append(float(np.corrcoef(dy, reference)[0, 1]))
+            stats["baseline"] += matched(found, baseline_intervals)
+            stats["labels"] += matched(found, clip["jumps"])
+
+    print(f"🎬 Клипов: {len(clips)}, прыжков по разметке: {labels_total}, найдено эталоном: {baseline_total}")
+    print(f"{'оценщик':>10} {'шаг':>4} {'кадров/с':>9} {'корр. dy':>9} {'с эталоном':>11} {'с разметкой':>12}")
+    for (name, stride), stats in totals.items():
+        fps_value = stats["frames"] / stats["seconds"] if stats["seconds"] else 0.0
+        corr = np.mean(stats["corr"]) if stats["corr"] else float("nan")
+        print(
+            f"{name:>10} {stride:>4} {fps_value:9.1f} {corr:9.3f} "
+            f"{stats['baseline']:>5}/{baseline_total:<5} {stats['labels']:>6}/{labels_total:<5}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,122 @@
+# backend/benchmarks/bench_ocr.py
+"""
+Отчет по OCR заглушек: число вызовов Tesseract на обложку и общее время
+до (4 конфигурации --psm + image_to_string на всем изображении) и после
+каскада detect_placeholder_text.
+
+    python -m backend.benchmarks.bench_ocr --limit 200
+    python -m backend.benchmarks.bench_ocr --limit 1000 --busy-edge-thresh 0.1
+"""
+import argparse
+import os
+import re
+import time
+from collections import Counter
+
+import cv2
+import pytesseract
+
+from backend.config import BOOKS_CSV
+from backend.covers.features import CoverFeatures
+from backend.covers.placeholder import is_placeholder
+from backend.covers.placeholder_ocr import PLACEHOLDER_PATTERNS, preprocess_for_ocr, detect_placeholder_text
+from backend.services.dataset_loader import load_books
+from backend.services.descriptor_index import resolve_path
+
+ocr_calls = Counter()
+
+
+def counted(name, fn):
+    def wrapper(*args, **kwargs):
+        ocr_calls[name] += 1
+        return fn(*args, **kwargs)
+    return wrapper
+
+
+def legacy_detect_placeholder_text(image, min_confidence=30):
+    """Прежняя реализация: пять вызовов Tesseract на каждое изображение"""
+    processed = preprocess_for_ocr(image)
+    found = []
+    for config in ['--psm 6', '--psm 7', '--psm 8', '--psm 13']:
+        try:
+            data = pytesseract.image_to_data(
+                processed, lang='rus+eng', config=config, output_type=pytesseract.Output.DICT
+            )
+            for i, text in enumerate(data['text']):
+                if text.strip() and int(data['conf'][i]) >= min_confidence:
+                    if any(re.search(p, text.lower()) for p in PLACEHOLDER_PATTERNS):
+                        found.append(text.strip())
+        except Exception:
+            continue
+    try:
+        simple_text = pytesseract.image_to_string(processed, lang='rus+eng')
+        if any(re.search(p, simple_text.lower()) for p in PLACEHOLDER_PATTERNS):
+            found.extend(t.strip() for t in simple_text.split('\n') if t.strip())
+    except Exception:
+        pass
+    return len(found) > 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Отчет по вызовам OCR")
+    parser.add_argument("--csv", default=BOOKS_CSV)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--busy-edge-thresh", type=float, default=None,
+                        help="Пропускать OCR при плотности границ выше порога (по умолчанию шаг выключен)")
+    args = parser.parse_args()
+
+    try:
+        pytesseract.get_tesseract_version()
+    except Exception:
+        # Без Tesseract все вызовы OCR падают и до, и после - сравнение решений бессмысленно
+        print("❌ Tesseract не установлен - замер OCR невозможен")
+        return
+
+    pytesseract.image_to_data = counted("image_to_data", pytesseract.image_to_data)
+    pytesseract.image_to_string = counted("image_to_string", pytesseract.image_to_string)
+
+    legacy_time = cascade_time = 0.0
+    legacy_calls = cascade_calls = 0
+    n = disagreements = 0
+    skipped = Counter()
+
+    for image_path in load_books(args.csv, limit=args.limit)["image_path"]:
+        path = resolve_path(image_path)
+        img = cv2.imread(path) if os.path.exists(path) else None
+        if img is None:
+            continue
+        n += 1
+
+        ocr_calls.clear()
+        start = time.perf_counter()
+        legacy_visual = is_placeholder(img)["is_placeholder"]
+        legacy_hit = legacy_detect_placeholder_text(img)
+        legacy_time += time.perf_counter() - start
+        legacy_calls += sum(ocr_calls.values())
+
+        ocr_calls.clear()
+        start = time.perf_counter()
+        features = CoverFeatures(img)
+        visual = is_placeholder(img, features=features)
+        result = detect_placeholder_text(img, features=features, visual=visual, busy_edge_thresh=args.busy_edge_thresh)
+        cascade_time += time.perf_counter() - start
+        cascade_calls += sum(ocr_calls.values())
+        skipped[result["skipped"] or "ocr"] += 1
+
+        # Сравниваем итоговое решение analyze_cover: визуальный признак ИЛИ OCR
+        if bool(legacy_visual or legacy_hit) != bool(visual["is_placeholder"] or result["is_placeholder_text"]):
+            disagreements += 1
+            print(f"⚠️ Решение изменилось: {image_path}")
+
+    if n == 0:
+        print("Нет изображений для замера")
+        return
+
+    print(f"Обложек: {n}, расхождений в типе обложки: {disagreements}")
+    print(f"До:    {legacy_calls / n:.2f} вызовов OCR/обложка, всего {legacy_time:.1f} с")
+    print(f"После: {cascade_calls / n:.2f} вызовов OCR/обложка, всего {cascade_time:.1f} с")
+    print("Исход каскада: " + ", ".join(f"{k}: {v}" for k, v in skipped.most_common()))
+
+
+if __name__ == "__main__":
+    main()
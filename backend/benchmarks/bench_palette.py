@@ -0,0 +1,84 @@
+# backend/benchmarks/bench_palette.py
+"""
+Точность и скорость методов доминирующих цветов относительно эталона
+(KMeans по всем пикселям) на обложках каталога.
+
+Ошибка палитры - среднее расстояние в RGB между цветами при наилучшем
+сопоставлении; также сравниваются производные метрики analyze_cover
+(color_contrast, warm_cold_balance и флаг monochrome).
+
+    python -m backend.benchmarks.bench_palette --limit 100
+"""
+import argparse
+import itertools
+import os
+import time
+
+import cv2
+import numpy as np
+
+from backend.config import BOOKS_CSV
+from backend.covers.colors import color_contrast, warm_cold_ratio
+from backend.covers.palette import PALETTE_BACKENDS
+from backend.services.dataset_loader import load_books
+from backend.services.descriptor_index import resolve_path
+
+
+def palette_error(reference, colors):
+    """Среднее RGB-расстояние при лучшей перестановке (цветов всего несколько)"""
+    reference = np.asarray(reference, dtype=float)
+    colors = np.asarray(colors, dtype=float)
+    return min(
+        float(np.mean(np.linalg.norm(reference - colors[list(p)], axis=1)))
+        for p in itertools.permutations(range(len(colors)))
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк методов палитры")
+    parser.add_argument("--csv", default=BOOKS_CSV)
+    parser.add_argument("--limit", type=int, default=100)
+    parser.add_argument("--backends", default=",".join(PALETTE_BACKENDS))
+    args = parser.parse_args()
+
+    backends = args.backends.split(",")
+    images = []
+    for image_path in load_books(args.csv, limit=args.limit)["image_path"]:
+        path = resolve_path(image_path)
+        img = cv2.imread(path) if os.path.exists(path) else None
+        if img is not None:
+            images.append(img)
+
+    if not images:
+        print("Нет изображений для замера")
+        return
+
+    timings = {b: 0.0 for b in backends}
+    palettes = {b: [] for b in backends + ["kmeans"]}
+    for name in dict.fromkeys(["kmeans"] + backends):
+        for img in images:
+            start = time.perf_counter()
+            palettes[name].append(PALETTE_BACKENDS[name](img, 3))
+            timings[name] = timings.get(name, 0.0) + time.perf_counter() - start
+
+    reference = palettes["kmeans"]
+    ref_contrast = np.array([color_contrast(c) for c in reference])
+    ref_warmth = np.array([warm_cold_ratio(c) for c in reference])
+    base_time = timings["kmeans"]
+
+    print(f"Обложек: {len(images)}")
+    print(f"{'метод':>11} {'мс/обл.':>8} {'ускор.':>7} {'ошибка RGB':>11} {'Δконтраст':>10} {'Δwarm/cold':>11} {'monochrome':>11}")
+    for name in backends:
+        errors = [palette_error(r, c) for r, c in zip(reference, palettes[name])]
+        contrast = np.array([color_contrast(c) for c in palettes[name]])
+        warmth = np.array([warm_cold_ratio(c) for c in palettes[name]])
+        mono_agree = np.mean((contrast < 20) == (ref_contrast < 20))
+        print(
+            f"{name:>11} {1000 * timings[name] / len(images):>8.1f} {base_time / timings[name]:>6.1f}x "
+            f"{np.mean(errors):>11.2f} {np.mean(np.abs(contrast - ref_contrast)):>10.2f} "
+            f"{np.mean(np.abs(warmth - ref_warmth)):>11.2f} {100 * mono_agree:>10.1f}%"
+        )
+
+
+if __name__ == "__main__":
+    main()
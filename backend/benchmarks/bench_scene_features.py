@@ -0,0 +1,82 @@
+# backend/benchmarks/bench_scene_features.py
+"""
+Признаки сцены для окна кадров: прежний покадровый цикл (Sobel в CV_64F,
+HSV и scipy.stats.entropy на каждый кадр) против пакетного
+extract_scene_features, в том числе с уменьшением кадров.
+Печатает время и максимальное расхождение метрик с прежней версией.
+
+    python -m backend.benchmarks.bench_scene_features --video program.mp4 --frames 360
+"""
+import argparse
+import time
+
+import cv2
+import numpy as np
+from scipy.stats import entropy
+
+from backend.benchmarks.bench_detector import read_frames
+from backend.video.scene_features import extract_scene_features
+
+
+def legacy_scene_features(frames):
+    brightness, edges, color_entropy = [], [], []
+    for frame in frames:
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        brightness.append(float(np.mean(gray)))
+        sobel_x = cv2.Sobel(gray, cv2.CV_64F, 1, 0, ksize=3)
+        sobel_y = cv2.Sobel(gray, cv2.CV_64F, 0, 1, ksize=3)
+        edges.append(float(np.mean(np.sqrt(sobel_x**2 + sobel_y**2))))
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        h_hist = cv2.calcHist([hsv], [0], None, [256], [0, 256])
+        h_hist = h_hist / h_hist.sum() if h_hist.sum() > 0 else h_hist
+        color_entropy.append(float(entropy(h_hist.flatten() + 1e-10)))
+    return {
+        "brightness": np.array(brightness),
+        "edges": np.array(edges),
+        "color_entropy": np.array(color_entropy)
+    }
+
+
+def timed(func, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return result, best
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер признаков сцены")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--frames", type=int, default=360)
+    parser.add_argument("--widths", default="640,320", help="Ширины для варианта с уменьшением")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.start, args.frames)
+    if not frames:
+        print(f"❌ Не удалось прочитать кадры: {args.video}")
+        return
+    stack = np.stack(frames)
+    h, w = stack.shape[1:3]
+    print(f"🎬 Кадров: {len(stack)}, разрешение {w}x{h}")
+
+    reference, legacy_time = timed(lambda: legacy_scene_features(stack), args.repeat)
+    print(f"По кадрам (CV_64F, scipy):  {legacy_time * 1000:8.1f} мс")
+
+    variants = [("Пачкой", None)] + [(f"Пачкой, ширина {width}", width) for width in map(int, args.widths.split(","))]
+    for name, max_width in variants:
+        if max_width and max_width >= w:
+            continue
+        result, elapsed = timed(lambda: extract_scene_features(stack, max_width=max_width), args.repeat)
+        diffs = ", ".join(
+            f"{key} {np.max(np.abs(result[key] - reference[key])):.4f}" for key in ("brightness", "edges", "color_entropy")
+        )
+        print(f"{name + ':':27s} {elapsed * 1000:8.1f} мс (x{legacy_time / elapsed:4.1f}), макс. расхождение: {diffs}")
+
+
+if __name__ == "__main__":
+    main()
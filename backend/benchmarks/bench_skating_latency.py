@@ -0,0 +1,46 @@
+# backend/benchmarks/bench_skating_latency.py
+"""
+Задержка анализа видео в "холодном" процессе (импорт ultralytics/torch,
+загрузка и прогрев YOLO) и в "теплом" (модель уже в реестре процесса).
+
+    python -m backend.benchmarks.bench_skating_latency --video program.mp4 --intervals "[[75, 78]]" --runs 3
+"""
+import argparse
+import json
+import time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Холодная и теплая задержка анализа видео")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--intervals", default="[[5, 7]]", help="JSON со списком [начало, конец] в секундах")
+    parser.add_argument("--runs", type=int, default=3, help="Сколько теплых запусков")
+    args = parser.parse_args()
+    intervals = json.loads(args.intervals)
+
+    # Импорт тоже входит в холодный запуск
+    start = time.perf_counter()
+    from backend.video.analyze_skating_improved import SkatingAnalyzer
+    from backend.video.models import models_info
+
+    # Как /api/analyze-skating: новый SkatingAnalyzer на каждый запрос
+    result = SkatingAnalyzer().analyze_skating(args.video, jump_intervals=intervals)
+    cold = time.perf_counter() - start
+    if not result["success"]:
+        print(f"❌ Ошибка анализа: {result['error']}")
+        return
+
+    warm = []
+    for _ in range(args.runs):
+        start = time.perf_counter()
+        SkatingAnalyzer().analyze_skating(args.video, jump_intervals=intervals)
+        warm.append(time.perf_counter() - start)
+
+    for path, info in models_info().items():
+        print(f"Модель {path} ({info['device']}): загрузка {info['load_seconds']} с, прогрев {info['warmup_seconds']} с")
+    print(f"Холодный запрос: {cold:.2f} с")
+    print(f"Теплый запрос:   {sum(warm) / len(warm):.2f} с (среднее из {len(warm)}, мин. {min(warm):.2f} с)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# backend/benchmarks/bench_tracker.py
+"""
+Детекция фигуриста на каждом кадре против YOLO на каждом K-м кадре с
+трекингом между ними (SkaterTracker): вызовы YOLO, время, средний IoU
+рамок с покадровой детекцией и признаки тела из get_body_features.
+
+    python -m backend.benchmarks.bench_tracker --video program.mp4 --start 75 --frames 150 --every 3,5,10
+"""
+import argparse
+import time
+
+from backend.benchmarks.bench_detector import read_frames, iou
+from backend.video.skater_detector import SkaterDetector
+from backend.video.skater_tracker import SkaterTracker
+
+FEATURES = ["height_max", "vertical_velocity_max", "aspect_ratio_mean", "angle_mean", "hands_open_ratio"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Замер трекинга фигуриста")
+    parser.add_argument("--video", required=True)
+    parser.add_argument("--start", type=float, default=0.0)
+    parser.add_argument("--frames", type=int, default=150)
+    parser.add_argument("--every", default="3,5,10", help="Детекция на каждом K-м кадре")
+    parser.add_argument("--fps", type=float, default=25)
+    args = parser.parse_args()
+
+    frames = read_frames(args.video, args.start, args.frames)
+    if not frames:
+        print(f"❌ Не удалось прочитать кадры: {args.video}")
+        return
+    detector = SkaterDetector()
+    detector.detect_skaters(frames[:1])  # прогрев
+    print(f"🎬 Кадров: {len(frames)}, бэкенд: {detector.backend.name} ({detector.backend.device})")
+
+    start = time.perf_counter()
+    reference = detector.detect_skaters(frames)
+    elapsed = time.perf_counter() - start
+    features = detector.get_body_features(frames, args.fps, reference)
+    print(f"Каждый кадр: YOLO {len(frames):4d}, {elapsed:6.2f} с")
+    print("   " + ", ".join(f"{key} {features.get(key, 0):.3f}" for key in FEATURES))
+
+    for every in (int(k) for k in args.every.split(",")):
+        tracker = SkaterTracker(detector, every)
+        start = time.perf_counter()
+        tracked = tracker.track(frames)
+        elapsed = time.perf_counter() - start
+        info = tracker.info()
+        mean_iou = sum(iou(a[1], b[1]) for a, b in zip(reference, tracked)) / len(frames)
+        features = detector.get_body_features(frames, args.fps, tracked)
+        print(
+            f"K={every:<3d}       YOLO {info['yolo_frames']:4d} (повторных {info['redetections']}), "
+            f"{elapsed:6.2f} с, IoU с покадровой: {mean_iou:.3f}"
+        )
+        print("   " + ", ".join(f"{key} {features.get(key, 0):.3f}" for key in FEATURES))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,169 @@
+# backend/benchmarks/check_backends.py
+"""
+Проверка согласованности бэкендов детектора (ultralytics / onnx / onnx-int8)
+на фиксированном входе. Недоступный бэкенд пропускается; код выхода 1,
+если хотя бы одна проверка не прошла.
+
+1. Пересчет рамок из letterbox (модель не нужна): рамки исходного кадра
+   переводятся в координаты уменьшенного кадра с полями и обратно через
+   SkaterDetector._person_boxes - для разных размеров кадра и входа YOLO.
+2. Один кадр через каждый доступный бэкенд: рамки людей в координатах
+   исходного кадра совпадают с fp32-эталоном (ultralytics, без него - onnx)
+   с IoU не ниже --min-iou, рамки onnx-int8 в среднем совпадают с onnx
+   (fp32) с IoU не ниже --min-int8-iou.
+
+По умолчанию кадр - bus.jpg из ultralytics (люди и автобус).
+
+    python -m backend.benchmarks.check_backends
+    python -m backend.benchmarks.check_backends --image photo.jpg --min-iou 0.9 --min-int8-iou 0.8
+"""
+import argparse
+import os
+import sys
+
+import cv2
+import numpy as np
+
+from backend.benchmarks.bench_detector import iou
+from backend.config import SKATER_MODEL, SKATER_INPUT_SIZE, SKATER_ONNX_DIR
+from backend.video.detector_backends import DETECTOR_BACKENDS, create_backend
+from backend.video.skater_detector import STRIDE, PERSON_CLASS, SkaterDetector, letterbox
+
+FRAME_SHAPES = [(1080, 1920), (720, 1280), (1920, 1080), (480, 640), (300, 500)]
+INPUT_SIZES = [640, 416, 320]
+
+
+def check_letterbox_remap():
+    """Список ошибок пересчета рамок letterbox -> исходный кадр"""
+    errors = []
+    for h, w in FRAME_SHAPES:
+        frame = np.zeros((h, w, 3), dtype=np.uint8)
+        truth = np.array([
+            [0.1 * w, 0.2 * h, 0.4 * w, 0.9 * h],
+            [0.6 * w, 0.1 * h, 0.7 * w, 0.5 * h],
+        ]).round()
+        for size in INPUT_SIZES:
+            image, scale, (left, top) = letterbox(frame, size)
+            if image.shape[0] % STRIDE or image.shape[1] % STRIDE:
+                errors.append(f"{w}x{h} -> {size}: размер {image.shape[1]}x{image.shape[0]} не кратен {STRIDE}")
+            if max(image.shape[:2]) > size + STRIDE:
+                errors.append(f"{w}x{h} -> {size}: кадр {image.shape[1]}x{image.shape[0]} больше входа")
+
+            # Так рамки возвращает бэкенд: в координатах кадра с полями, плюс уверенность и класс
+            xyxy = truth * scale + np.array([left, top, left, top])
+            detections = np.column_stack([xyxy, np.full(len(xyxy), 0.9), np.full(len(xyxy), PERSON_CLASS)])
+            boxes = SkaterDetector._person_boxes(detections.astype(np.float32), frame.shape, scale, (left, top))
+
+            # Допуск - пиксель уменьшенного кадра в исходных координатах и округление
+            tolerance = 1 / scale + 1
+            expected = sorted(truth.astype(int).tolist(), key=lambda b: -(b[2] - b[0]) * (b[3] - b[1]))
+            if len(boxes) != len(expected):
+                errors.append(f"{w}x{h} -> {size}: {len(boxes)} рамок вместо {len(expected)}")
+                continue
+            for box, target in zip(boxes, expected):
+                if np.abs(np.array(box) - np.array(target)).max() > tolerance:
+                    errors.append(f"{w}x{h} -> {size}: рамка {box} вместо {target}")
+    return errors
+
+
+def load_backends(names, model_path, onnx_dir):
+    """Доступные бэкенды по имени; create_backend без ONNX откатывается на ultralytics - такие пропускаем"""
+    backends = {}
+    for name in names:
+        try:
+            backend = create_backend(name, model_path, onnx_dir)
+        except Exception as e:
+            print(f"⏭️ {name}: недоступен ({e})")
+            continue
+        if backend.name != name:
+            print(f"⏭️ {name}: недоступен (подменен на {backend.name})")
+            continue
+        backends[name] = backend
+    return backends
+
+
+def person_boxes(backend, frame, input_size):
+    """Рамки людей в координатах исходного кадра - тот же путь, что SkaterDetector.detect_people"""
+    image, scale, pad = letterbox(frame, input_size)
+    detections = backend.detect([image], input_size)[0]
+    return SkaterDetector._person_boxes(detections, frame.shape, scale, pad)
+
+
+def match_ious(reference, boxes):
+    """Для каждой рамки эталона - лучший IoU среди рамок boxes (0, если рамок нет)"""
+    return [max((iou(ref, box) for box in boxes), default=0.0) for ref in reference]
+
+
+def default_image():
+    try:
+        from ultralytics.utils import ASSETS
+    except Exception:
+        return None
+    path = os.path.join(str(ASSETS), "bus.jpg")
+    return path if os.path.exists(path) else None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Согласованность бэкендов детектора на фиксированном входе")
+    parser.add_argument("--image", default=None, help="Кадр с людьми (по умолчанию bus.jpg из ultralytics)")
+    parser.add_argument("--model", default=SKATER_MODEL)
+    parser.add_argument("--input-size", type=int, default=SKATER_INPUT_SIZE)
+    parser.add_argument("--backends", default=",".join(DETECTOR_BACKENDS))
+    parser.add_argument("--min-iou", type=float, default=0.9, help="Минимальный IoU onnx с ultralytics")
+    parser.add_argument("--min-int8-iou", type=float, default=0.8, help="Минимальный средний IoU onnx-int8 с onnx")
+    args = parser.parse_args()
+
+    failed = False
+
+    errors = check_letterbox_remap()
+    if errors:
+        failed = True
+        print(f"❌ Пересчет рамок letterbox: {len(errors)} ошибок")
+        for error in errors:
+            print(f"   {error}")
+    else:
+        print(f"✅ Пересчет рамок letterbox: {len(FRAME_SHAPES)} размеров кадра x {len(INPUT_SIZES)} размеров входа")
+
+    image_path = args.image or default_image()
+    frame = cv2.imread(image_path) if image_path else None
+    if frame is None:
+        print("⏭️ Сравнение бэкендов пропущено: нет кадра (--image) и ultralytics недоступен")
+        sys.exit(1 if failed else 0)
+
+    backends = load_backends(args.backends.split(","), args.model, SKATER_ONNX_DIR)
+    boxes = {name: person_boxes(backend, frame, args.input_size) for name, backend in backends.items()}
+    for name, found in boxes.items():
+        print(f"   {name:12s} людей: {len(found)}")
+
+    reference = "ultralytics" if "ultralytics" in boxes else "onnx" if "onnx" in boxes else None
+    if reference is None:
+        print("⏭️ Сравнение бэкендов пропущено: нет fp32-бэкенда")
+        sys.exit(1 if failed else 0)
+    if not boxes[reference]:
+        print(f"❌ {reference}: на кадре не найдено людей - вход не подходит для проверки")
+        sys.exit(1)
+
+    checks = []
+    if reference == "ultralytics" and "onnx" in boxes:
+        checks.append(("onnx", "ultralytics", args.min_iou, min))
+    if "onnx-int8" in boxes and "onnx" in boxes:
+        checks.append(("onnx-int8", "onnx", args.min_int8_iou, lambda values: sum(values) / len(values)))
+    if not checks:
+        print(f"⏭️ Сравнивать не с чем: доступен только {reference}")
+
+    for name, base, threshold, aggregate in checks:
+        ious = match_ious(boxes[base], boxes[name])
+        value = aggregate(ious)
+        kind = "минимальный" if aggregate is min else "средний"
+        ok = value >= threshold and (aggregate is not min or len(boxes[name]) == len(boxes[base]))
+        failed = failed or not ok
+        print(
+            f"{'✅' if ok else '❌'} {name} против {base}: {kind} IoU {value:.3f} (порог {threshold}), "
+            f"людей {len(boxes[name])}/{len(boxes[base])}"
+        )
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+# backend/benchmarks/check_placeholder_ocr.py
+"""
+Регрессионная проверка каскада OCR заглушек на синтетических обложках:
+надпись "COMING SOON" на ровном фоне (красный, белый, серый; PNG и
+JPEG q90) должна давать текстовую область, однотонное изображение - нет. Если установлен Tesseract, фраза-заглушка должна
+распознаваться. Код выхода 1, если проверка не прошла.
+
+    python -m backend.benchmarks.check_placeholder_ocr
+"""
+import sys
+
+import cv2
+import numpy as np
+import pytesseract
+
+from backend.covers.features import CoverFeatures
+from backend.covers.placeholder_ocr import detect_placeholder_text, text_candidate_region
+
+BACKGROUNDS = {"красный": (40, 40, 200), "белый": (255, 255, 255), "серый": (128, 128, 128)}
+FORMATS = {"PNG": (".png", []), "JPEG q90": (".jpg", [cv2.IMWRITE_JPEG_QUALITY, 90])}
+
+
+def placeholder_cover(background, ext, params):
+    """Обложка 300x450 с надписью COMING SOON, пропущенная через кодек"""
+    image = np.full((450, 300, 3), background, dtype=np.uint8)
+    color = (0, 0, 0) if sum(background) > 300 else (255, 255, 255)
+    cv2.putText(image, "COMING", (40, 200), cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 3)
+    cv2.putText(image, "SOON", (70, 260), cv2.FONT_HERSHEY_SIMPLEX, 1.5, color, 3)
+    _, encoded = cv2.imencode(ext, image, params)
+    return cv2.imdecode(encoded, cv2.IMREAD_COLOR)
+
+
+def tesseract_available():
+    try:
+        pytesseract.get_tesseract_version()
+        return True
+    except Exception:
+        return False
+
+
+def main():
+    errors = []
+    with_ocr = tesseract_available()
+    for bg_name, background in BACKGROUNDS.items():
+        for fmt_name, (ext, params) in FORMATS.items():
+            image = placeholder_cover(background, ext, params)
+            case = f"{bg_name} фон, {fmt_name}"
+            if text_candidate_region(CoverFeatures(image).gray) is None:
+                errors.append(f"{case}: текстовая область не найдена")
+                continue
+            if with_ocr:
+                result = detect_placeholder_text(image)
+                if not result["is_placeholder_text"]:
+                    errors.append(f"{case}: OCR не нашел заглушку ({result['skipped'] or result['found_phrases']})")
+
+    flat = np.full((450, 300, 3), (40, 40, 200), dtype=np.uint8)
+    if text_candidate_region(CoverFeatures(flat).gray) is not None:
+        errors.append("однотонное изображение: найдена текстовая область")
+
+    if not with_ocr:
+        print("⏭️ Tesseract не установлен - проверены только текстовые области")
+    if errors:
+        print(f"❌ Ошибок: {len(errors)}")
+        for error in errors:
+            print(f"   {error}")
+        sys.exit(1)
+    print(f"✅ Заглушки на ровном фоне: {len(BACKGROUNDS) * len(FORMATS)} случаев")
+
+
+if __name__ == "__main__":
+    main()
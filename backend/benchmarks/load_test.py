@@ -0,0 +1,131 @@
+# backend/benchmarks/load_test.py
+"""
+Нагрузочный тест: пропускная способность эндпоинта в зависимости от числа
+процессов-воркеров CV (CV_WORKERS).
+
+Для каждого значения --workers поднимается отдельный uvicorn, на него
+отправляется --requests запросов с параллелизмом --concurrency.
+
+    python -m backend.benchmarks.load_test --workers 1,2,4 --endpoint analyze
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import requests
+
+from backend.config import PROJECT_ROOT
+
+SAMPLE_IMAGE = os.path.join(PROJECT_ROOT, "backend", "data", "images", "0.jpg")
+
+ENDPOINT_FORMS = {
+    "analyze": ("/api/analyze", {}),
+    "filter": ("/api/filter", {"mode": "warm"}),
+    "similarity": ("/api/similarity", {"top_n": "5"}),
+}
+
+
+def wait_for_server(base_url, timeout=60):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            requests.get(f"{base_url}/api/executor-stats", timeout=1)
+            return True
+        except requests.RequestException:
+            time.sleep(0.5)
+    return False
+
+
+def send_request(base_url, path, form, image_bytes):
+    start = time.perf_counter()
+    try:
+        r = requests.post(
+            f"{base_url}{path}",
+            data=form,
+            files={"file": ("cover.jpg", image_bytes, "image/jpeg")},
+            timeout=600,
+        )
+        status = r.status_code
+    except requests.RequestException:
+        status = -1
+    return status, time.perf_counter() - start
+
+
+def run_load(base_url, endpoint, n_requests, concurrency, image_bytes):
+    path, form = ENDPOINT_FORMS[endpoint]
+    # Прогрев: воркеры поднимаются и импортируют модули при первом запросе
+    for _ in range(2):
+        send_request(base_url, path, form, image_bytes)
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda _: send_request(base_url, path, form, image_bytes), range(n_requests)
+        ))
+    elapsed = time.perf_counter() - start
+
+    statuses = [s for s, _ in results]
+    latencies = [t for s, t in results if s == 200]
+    return {
+        "ok": statuses.count(200),
+        "rejected": sum(s in (429, 503) for s in statuses),
+        "errors": sum(s not in (200, 429, 503) for s in statuses),
+        "throughput": statuses.count(200) / elapsed if elapsed > 0 else 0.0,
+        "p50": float(np.percentile(latencies, 50)) if latencies else 0.0,
+        "p95": float(np.percentile(latencies, 95)) if latencies else 0.0,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Нагрузочный тест пулов выполнения")
+    parser.add_argument("--workers", default="1,2,4", help="Список значений CV_WORKERS через запятую")
+    parser.add_argument("--endpoint", default="analyze", choices=sorted(ENDPOINT_FORMS))
+    parser.add_argument("--requests", type=int, default=40)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--image", default=SAMPLE_IMAGE)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    with open(args.image, "rb") as f:
+        image_bytes = f.read()
+
+    print(f"CPU: {os.cpu_count()}, эндпоинт: {args.endpoint}, "
+          f"запросов: {args.requests}, параллельно: {args.concurrency}")
+    print(f"{'workers':>8} {'ok':>5} {'429/503':>8} {'err':>5} {'req/s':>8} {'p50,s':>7} {'p95,s':>7} {'speedup':>8}")
+
+    baseline = None
+    for workers in [int(w) for w in args.workers.split(",")]:
+        # Очереди не должны отбрасывать запросы самого теста
+        env = dict(
+            os.environ,
+            CV_WORKERS=str(workers),
+            CV_MAX_PENDING=str(args.concurrency * 2),
+            ENDPOINT_QUEUE=str(args.concurrency),
+        )
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "backend.app:app", "--port", str(args.port), "--log-level", "warning"],
+            cwd=PROJECT_ROOT,
+            env=env,
+        )
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            if not wait_for_server(base_url):
+                print(f"{workers:>8} сервер не запустился")
+                continue
+            stats = run_load(base_url, args.endpoint, args.requests, args.concurrency, image_bytes)
+        finally:
+            server.terminate()
+            server.wait()
+
+        baseline = baseline or stats["throughput"]
+        speedup = stats["throughput"] / baseline if baseline else 0.0
+        print(f"{workers:>8} {stats['ok']:>5} {stats['rejected']:>8} {stats['errors']:>5} "
+              f"{stats['throughput']:>8.2f} {stats['p50']:>7.2f} {stats['p95']:>7.2f} {speedup:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
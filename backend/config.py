@@ -0,0 +1,94 @@
+# backend/config.py
+import os
+
+# Корневая директория проекта (пути из CSV задаются относительно неё)
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DATA_DIR = os.path.join(PROJECT_ROOT, "backend", "data")
+BOOKS_CSV = os.path.join(DATA_DIR, "books_local.csv")
+
+# Индекс ORB-дескрипторов для /api/similarity
+ORB_INDEX_DIR = os.path.join(DATA_DIR, "orb_index")
+
+# Превью обложек (по id книги) для результатов поиска
+THUMBNAILS_DIR = os.path.join(DATA_DIR, "thumbnails")
+THUMBNAIL_MAX_SIDE = 256
+THUMBNAIL_QUALITY = 80
+
+# Пулы выполнения: процессы для CV/OCR, потоки для I/O
+CV_WORKERS = int(os.getenv("CV_WORKERS", os.cpu_count() or 1))
+IO_WORKERS = int(os.getenv("IO_WORKERS", 8))
+# Сколько задач может ждать в пуле процессов, прежде чем сервер ответит 503
+CV_MAX_PENDING = int(os.getenv("CV_MAX_PENDING", CV_WORKERS * 4))
+
+# Ограничения по эндпоинтам: одновременно выполняемые запросы и длина очереди (иначе 429)
+ENDPOINT_QUEUE = int(os.getenv("ENDPOINT_QUEUE", CV_WORKERS * 4))
+ENDPOINT_LIMITS = {
+    "analyze": {"concurrency": CV_WORKERS, "queue": ENDPOINT_QUEUE},
+    "filter": {"concurrency": CV_WORKERS, "queue": ENDPOINT_QUEUE},
+    "similarity": {"concurrency": CV_WORKERS, "queue": ENDPOINT_QUEUE},
+    "stats": {"concurrency": 1, "queue": 4},
+    "skating": {"concurrency": max(1, CV_WORKERS // 2), "queue": 2},
+}
+
+# Доминирующие цвета обложки: kmeans (все пиксели, эталон), minibatch,
+# median_cut, octree, histogram - см. backend/covers/palette.py
+PALETTE_BACKEND = os.getenv("PALETTE_BACKEND", "histogram")
+PALETTE_MAX_SIDE = 128
+
+# Кеш результатов /api/analyze (по хешу содержимого и перцептивному хешу)
+ANALYSIS_CACHE_DB = os.path.join(DATA_DIR, "analysis_cache.sqlite")
+ANALYSIS_CACHE_MEMORY_ITEMS = int(os.getenv("ANALYSIS_CACHE_MEMORY_ITEMS", 256))
+ANALYSIS_CACHE_MAX_BYTES = int(os.getenv("ANALYSIS_CACHE_MAX_BYTES", 200 * 1024 * 1024))
+# Максимальное расстояние Хэмминга между pHash для почти-дубликатов (0 - выключено).
+# pHash не видит цвет и мелкий текст ("Том 1" / "Том 2" - расстояние 2), поэтому
+# по умолчанию выключено; совпадение дополнительно сверяется по цветной миниатюре
+ANALYSIS_CACHE_PHASH_DISTANCE = int(os.getenv("ANALYSIS_CACHE_PHASH_DISTANCE", 0))
+# Допустимое среднее отличие цветных миниатюр 8x8 почти-дубликата (0-255)
+ANALYSIS_CACHE_COLOR_TOLERANCE = float(os.getenv("ANALYSIS_CACHE_COLOR_TOLERANCE", 8))
+
+# Результаты analyze_cover по каждой обложке каталога (для инкрементальной статистики)
+COVER_STORE_FILE = os.path.join(DATA_DIR, "cover_analyses.json")
+# Колоночная таблица признаков обложек (npz) для агрегатов и фильтров /api/genre-stats
+COVER_FEATURES_FILE = os.path.join(DATA_DIR, "cover_features.npz")
+
+# Графики статистики: рисуются по запросу, файл на каждую версию данных
+STATS_PLOTS_DIR = os.path.join(DATA_DIR, "stats", "plots")
+STATS_PLOTS_KEEP = 16
+
+# Детекция фигуриста (YOLO): веса, бэкенд (ultralytics, onnx, onnx-int8 -
+# см. backend/video/detector_backends.py) и кадров в одном вызове модели
+SKATER_MODEL = os.getenv("SKATER_MODEL", "yolov8n.pt")
+SKATER_BACKEND = os.getenv("SKATER_BACKEND", "ultralytics")
+SKATER_ONNX_DIR = os.path.join(DATA_DIR, "models")
+SKATER_BATCH_SIZE = int(os.getenv("SKATER_BATCH_SIZE", 16))
+# Длинная сторона кадра на входе YOLO (кадр уменьшается с сохранением пропорций)
+SKATER_INPUT_SIZE = int(os.getenv("SKATER_INPUT_SIZE", 640))
+# Экспериментально: YOLO на каждом K-м кадре окна, между ними - трекинг
+# (SkaterTracker). По умолчанию 1 - детекция на каждом кадре, трекер выключен:
+# отклонение рамок трекера от покадровой YOLO на реальных видео не измерено,
+# перед включением проверьте его (backend/benchmarks/bench_tracker.py)
+SKATER_DETECT_EVERY = int(os.getenv("SKATER_DETECT_EVERY", 1))
+# Автоматический поиск прыжков: плотный оценщик движения (dis, farneback -
+# см. backend/video/motion.py) и шаг между кадрами с потоком (0 - 10 раз в секунду)
+SKATING_MOTION = os.getenv("SKATING_MOTION", "dis")
+SKATING_MOTION_STRIDE = int(os.getenv("SKATING_MOTION_STRIDE", 0))
+# Ширина кадра для признаков сцены окна прыжка (яркость, контраст, энтропия).
+# По умолчанию 0 - исходный размер, значения как у прежнего покадрового расчета.
+# Уменьшение быстрее, но контраст (edges) зависит от масштаба и в ответе изменится
+SCENE_FEATURES_MAX_WIDTH = int(os.getenv("SCENE_FEATURES_MAX_WIDTH", 0))
+# Загружать YOLO в каждом воркере пула процессов при старте (память на каждый процесс)
+PRELOAD_SKATER_MODEL = os.getenv("PRELOAD_SKATER_MODEL", "0") == "1"
+
+# Загрузка видео: пишется на диск кусками, размер ограничен (иначе 413)
+UPLOAD_DIR = os.path.join(PROJECT_ROOT, "uploads")
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+MAX_VIDEO_UPLOAD_BYTES = int(os.getenv("MAX_VIDEO_UPLOAD_BYTES", 4 * 1024 ** 3))
+# Текстовые поля формы загрузки (youtube_url, jump_intervals) держатся в памяти
+MAX_FORM_FIELD_BYTES = 64 * 1024
+
+# Фоновые задачи анализа видео (/api/skating-jobs): отдельный пул процессов,
+# состояние задач и сохраненные результаты (по хешу видео и интервалам)
+SKATING_JOB_WORKERS = int(os.getenv("SKATING_JOB_WORKERS", 1))
+SKATING_JOBS_DIR = os.path.join(DATA_DIR, "skating_jobs")
+SKATING_RESULTS_DIR = os.path.join(DATA_DIR, "skating_results")
+SKATING_JOB_TTL = 24 * 3600
@@ -1,58 +1,54 @@
 # backend/covers/analysis.py
-import cv2
-import numpy as np
-from sklearn.cluster import KMeans
 from backend.covers.placeholder import is_placeholder as check_placeholder   
 from backend.covers.colors import color_contrast, warm_cold_ratio
-from backend.covers.face import detect_faces
 from backend.covers.composition import face_position
 from backend.covers.placeholder_ocr import detect_placeholder_text
+from backend.covers.features import CoverFeatures
+from backend.covers.palette import extract_palette
 
 
-def dominant_colors(image, n_colors=3):
-    img = cv2.cvtColor(image, cv2.COLOR_BGR2RGB)
-    img = img.reshape((-1, 3))
-    kmeans = KMeans(n_clusters=n_colors, random_state=42).fit(img)
-    return kmeans.cluster_centers_.astype(int)
+def dominant_colors(image, n_colors=3, backend=None):
+    return extract_palette(image, n_colors, backend)
 
-def text_density(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    _, thresh = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
-    contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
-    area = image.shape[0] * image.shape[1]
-    return sum(cv2.contourArea(c) for c in contours) / area
+def text_density(image, features=None):
+    features = features or CoverFeatures(image)
+    return features.dark_area / features.area
 
-def edge_density(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 100, 200)
-    return np.sum(edges > 0) / edges.size
+def edge_density(image, features=None):
+    features = features or CoverFeatures(image)
+    return features.edge_density
 
-def negative_space_ratio(image):
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    edges = cv2.Canny(gray, 100, 200)
-    return 1 - (np.sum(edges > 0) / edges.size)
+def negative_space_ratio(image, features=None):
+    features = features or CoverFeatures(image)
+    return 1 - features.edge_density
 
 
-def analyze_cover(image): 
-    placeholder_visual = check_placeholder(image) 
-    placeholder_ocr = detect_placeholder_text(image)
+def analyze_cover(image, features=None):
+    """
+    Полный анализ обложки. Промежуточные результаты (grayscale, Canny,
+    контуры, лица) берутся из features и считаются один раз на изображение
+    """
+    features = features or CoverFeatures(image)
+
+    placeholder_visual = check_placeholder(image, features=features)
+    placeholder_ocr = detect_placeholder_text(image, features=features, visual=placeholder_visual)
  
-    is_placeholder_result = (
+    is_placeholder_result = bool(
         placeholder_visual["is_placeholder"] or
         placeholder_ocr["is_placeholder_text"]
     )
  
     colors = dominant_colors(image)
-    text = text_density(image)
-    edge = edge_density(image)
-    negative = negative_space_ratio(image)
+    text = text_density(image, features)
+    edge = edge_density(image, features)
+    negative = negative_space_ratio(image, features)
 
     complexity = 0.4 * edge + 0.3 * text + 0.3 * (1 - negative)
     contrast = color_contrast(colors)
     warmth = warm_cold_ratio(colors)
 
     try:
-        faces = detect_faces(image)
+        faces = features.faces
         face_pos = face_position(image, faces)
     except Exception:
         faces = []
@@ -3,17 +3,17 @@ import cv2
 CASCADE_PATH = cv2.data.haarcascades + "haarcascade_frontalface_default.xml"
 face_cascade = cv2.CascadeClassifier(CASCADE_PATH)
 
-def detect_faces(image):
+def detect_faces(image, gray=None):
     if image is None:
         return []
  
     if image.dtype != "uint8":
         image = image.astype("uint8")
  
-    if len(image.shape) == 3 and image.shape[2] == 3:
-        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    else:
+    if not (len(image.shape) == 3 and image.shape[2] == 3):
         return []
+    if gray is None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
 
     faces = face_cascade.detectMultiScale(
         gray,
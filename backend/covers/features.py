@@ -0,0 +1,49 @@
+# backend/covers/features.py
+from functools import cached_property
+
+import cv2
+import numpy as np
+
+
+class CoverFeatures:
+    """
+    Общие промежуточные результаты для метрик обложки.
+
+    Каждый примитив (grayscale, Canny, контуры, лица) считается один раз
+    при первом обращении и переиспользуется всеми метриками.
+    """
+
+    def __init__(self, image):
+        self.image = image
+
+    @property
+    def area(self):
+        return self.image.shape[0] * self.image.shape[1]
+
+    @cached_property
+    def gray(self):
+        return cv2.cvtColor(self.image, cv2.COLOR_BGR2GRAY)
+
+    @cached_property
+    def edges(self):
+        return cv2.Canny(self.gray, 100, 200)
+
+    @cached_property
+    def edge_density(self):
+        return np.sum(self.edges > 0) / self.edges.size
+
+    @cached_property
+    def dark_contours(self):
+        """Контуры темных областей (текст, рисунок) на светлом фоне"""
+        _, thresh = cv2.threshold(self.gray, 200, 255, cv2.THRESH_BINARY_INV)
+        contours, _ = cv2.findContours(thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE)
+        return contours
+
+    @cached_property
+    def dark_area(self):
+        return sum(cv2.contourArea(c) for c in self.dark_contours)
+
+    @cached_property
+    def faces(self):
+        from backend.covers.face import detect_faces
+        return detect_faces(self.image, gray=self.gray)
@@ -0,0 +1,125 @@
+# backend/covers/palette.py
+import cv2
+import numpy as np
+from PIL import Image
+
+from backend.config import PALETTE_BACKEND, PALETTE_MAX_SIDE
+
+
+def to_rgb_pixels(image, max_side=None):
+    """Пиксели изображения (N, 3) в RGB, при необходимости после уменьшения"""
+    if max_side:
+        h, w = image.shape[:2]
+        scale = max_side / max(h, w)
+        if scale < 1:
+            image = cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+    return cv2.cvtColor(image, cv2.COLOR_BGR2RGB).reshape((-1, 3))
+
+
+def _pad(colors, n_colors):
+    """Если различных цветов меньше n_colors, повторяем последний"""
+    if len(colors) == 0:
+        return np.zeros((n_colors, 3), dtype=int)
+    if len(colors) < n_colors:
+        colors = np.vstack([colors, np.repeat(colors[-1:], n_colors - len(colors), axis=0)])
+    return colors
+
+
+def kmeans_palette(image, n_colors=3):
+    """Эталон: sklearn KMeans по всем пикселям полного разрешения"""
+    from sklearn.cluster import KMeans
+    pixels = to_rgb_pixels(image)
+    kmeans = KMeans(n_clusters=n_colors, random_state=42).fit(pixels)
+    return kmeans.cluster_centers_.astype(int)
+
+
+def minibatch_palette(image, n_colors=3, max_side=PALETTE_MAX_SIDE):
+    from sklearn.cluster import MiniBatchKMeans
+    pixels = to_rgb_pixels(image, max_side)
+    kmeans = MiniBatchKMeans(n_clusters=n_colors, random_state=42, n_init=3, batch_size=2048).fit(pixels)
+    return kmeans.cluster_centers_.astype(int)
+
+
+def _pil_palette(image, n_colors, method, max_side):
+    pixels = to_rgb_pixels(image, max_side)
+    pil_img = Image.fromarray(pixels.reshape((1, -1, 3)))
+    quantized = pil_img.quantize(colors=n_colors, method=method)
+    palette = np.array(quantized.getpalette()[:3 * n_colors]).reshape((-1, 3))
+    # Сортируем по числу пикселей, неиспользуемые записи палитры отбрасываем
+    counts = sorted(quantized.getcolors(), reverse=True)
+    return _pad(palette[[idx for _, idx in counts]].astype(int), n_colors)
+
+
+def median_cut_palette(image, n_colors=3, max_side=PALETTE_MAX_SIDE):
+    return _pil_palette(image, n_colors, Image.Quantize.MEDIANCUT, max_side)
+
+
+def octree_palette(image, n_colors=3, max_side=PALETTE_MAX_SIDE):
+    return _pil_palette(image, n_colors, Image.Quantize.FASTOCTREE, max_side)
+
+
+def histogram_palette(image, n_colors=3, bits=4, iterations=20, seed=42):
+    """
+    Взвешенный k-means на NumPy по 3D-гистограмме цветов: пиксели полного
+    разрешения раскладываются в 2^(3*bits) корзин, кластеризуются только
+    непустые корзины (их средние цвета с весом = числом пикселей)
+    """
+    pixels = to_rgb_pixels(image)
+    shift = 8 - bits
+    q = (pixels >> shift).astype(np.int32)
+    bins = (q[:, 0] << (2 * bits)) | (q[:, 1] << bits) | q[:, 2]
+
+    n_bins = 1 << (3 * bits)
+    weights = np.bincount(bins, minlength=n_bins).astype(np.float64)
+    occupied = np.flatnonzero(weights)
+    weights = weights[occupied]
+    points = np.stack([
+        np.bincount(bins, weights=pixels[:, c], minlength=n_bins)[occupied]
+        for c in range(3)
+    ], axis=1) / weights[:, None]
+
+    if len(points) <= n_colors:
+        return _pad(np.round(points).astype(int), n_colors)
+
+    # k-means++ инициализация с весами
+    rng = np.random.default_rng(seed)
+    centers = [points[rng.choice(len(points), p=weights / weights.sum())]]
+    for _ in range(1, n_colors):
+        d2 = np.min(((points[:, None, :] - np.array(centers)[None]) ** 2).sum(-1), axis=1)
+        prob = weights * d2
+        centers.append(points[rng.choice(len(points), p=prob / prob.sum())])
+    centers = np.array(centers)
+
+    for _ in range(iterations):
+        labels = np.argmin(((points[:, None, :] - centers[None]) ** 2).sum(-1), axis=1)
+        totals = np.bincount(labels, weights=weights, minlength=n_colors)
+        new_centers = np.stack([
+            np.bincount(labels, weights=weights * points[:, c], minlength=n_colors)
+            for c in range(3)
+        ], axis=1)
+        non_empty = totals > 0
+        new_centers[non_empty] /= totals[non_empty, None]
+        new_centers[~non_empty] = centers[~non_empty]
+        if np.allclose(new_centers, centers, atol=0.5):
+            centers = new_centers
+            break
+        centers = new_centers
+
+    return centers.astype(int)
+
+
+PALETTE_BACKENDS = {
+    "kmeans": kmeans_palette,
+    "minibatch": minibatch_palette,
+    "median_cut": median_cut_palette,
+    "octree": octree_palette,
+    "histogram": histogram_palette,
+}
+
+
+def extract_palette(image, n_colors=3, backend=None):
+    """Доминирующие цвета (n_colors, 3) в RGB выбранным методом"""
+    backend = backend or PALETTE_BACKEND
+    if backend not in PALETTE_BACKENDS:
+        raise ValueError(f"Неизвестный метод палитры: {backend}. Доступны: {', '.join(PALETTE_BACKENDS)}")
+    return PALETTE_BACKENDS[backend](image, n_colors)
@@ -1,6 +1,5 @@
-import cv2
 import numpy as np
-from backend.covers.placeholder_ocr import detect_placeholder_text
+from backend.covers.features import CoverFeatures
 
 
 def is_placeholder(
@@ -8,28 +7,23 @@ def is_placeholder(
         white_thresh=240,
         white_ratio_thresh = 0.45,
         edge_thresh = 0.05,
-        text_thresh = 0.03
+        text_thresh = 0.03,
+        features=None
     ):
 
     """
     Определяет, является ли обложка заглушкой
     """
 
-    h, w, _ = image.shape
-    area = h * w
+    features = features or CoverFeatures(image)
+    area = features.area
  
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    white_pixels = np.sum(gray > white_thresh)
+    white_pixels = np.sum(features.gray > white_thresh)
     white_ratio = white_pixels / area
  
-    edges = cv2.Canny(gray, 100, 200)
-    edge_density = np.sum(edges > 0) / edges.size
+    edge_density = features.edge_density
  
-    _, thresh = cv2.threshold(gray, 200, 255, cv2.THRESH_BINARY_INV)
-    contours, _ = cv2.findContours(
-        thresh, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
-    )
-    text_area = sum(cv2.contourArea(c) for c in contours)
+    text_area = features.dark_area
     text_density = text_area / area
  
     is_blank = (
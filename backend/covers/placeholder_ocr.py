@@ -1,8 +1,21 @@
 # backend/covers/placeholder_ocr.py
+import logging
 import cv2
 import pytesseract
 import re
 import numpy as np
+from backend.covers.features import CoverFeatures
+
+logger = logging.getLogger(__name__)
+
+# Параметры каскада OCR по умолчанию (входят в версию кеша анализа)
+OCR_MIN_CONFIDENCE = 30
+OCR_CONFIGS = ('--psm 6', '--psm 11')
+# Порог плотности границ для пропуска OCR на "насыщенных иллюстрациях".
+# None - шаг выключен: порог не подобран по замеру с Tesseract (bench_ocr)
+BUSY_EDGE_THRESH = None
+# Перепад яркости, ниже которого пиксель не считается границей символа
+MIN_TEXT_GRADIENT = 20
 
 PLACEHOLDER_PATTERNS = [
     r"обложка\s+скоро",
@@ -14,10 +27,11 @@ PLACEHOLDER_PATTERNS = [
     r"cover\s+not\s+available"
 ]
 
-def preprocess_for_ocr(image):
+def preprocess_for_ocr(image, gray=None):
     """Улучшает изображение для OCR"""
     # Конвертируем в grayscale
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    if gray is None:
+        gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
     
     # Увеличиваем контраст
     gray = cv2.equalizeHist(gray)
@@ -31,58 +45,161 @@ def preprocess_for_ocr(image):
     
     return thresh
 
-def detect_placeholder_text(image, min_confidence=30):
-    """Улучшенный OCR для определения текста заглушек"""
-    
-    processed = preprocess_for_ocr(image)
-    
-    configs = [
-        '--psm 6',     
-        '--psm 7',       
-        '--psm 8',       
-        '--psm 13'      
-    ]
-    
-    all_found_phrases = []
-    
+def text_candidate_region(gray, pad=10, min_box_ratio=0.0005):
+    """
+    Область, где вероятен текст: строки дают сильный градиент, слипающийся
+    по горизонтали в широкие блоки. Возвращает (x1, y1, x2, y2) - общую рамку
+    всех блоков - или None, если текстоподобных блоков нет
+    """
+    h, w = gray.shape[:2]
+    grad = cv2.morphologyEx(gray, cv2.MORPH_GRADIENT, np.ones((3, 3), np.uint8))
+    if grad.max() < MIN_TEXT_GRADIENT:
+        # Однотонное изображение: перепадов, похожих на символы, нет вовсе
+        return None
+
+    # На ровном фоне с четким текстом гистограмма градиента двугорбая (0 и
+    # большие значения) и Оцу дает порог 0 - снизу его ограничивает MIN_TEXT_GRADIENT
+    level, _ = cv2.threshold(grad, 0, 255, cv2.THRESH_BINARY + cv2.THRESH_OTSU)
+    _, bw = cv2.threshold(grad, max(level, MIN_TEXT_GRADIENT), 255, cv2.THRESH_BINARY)
+
+    kernel = cv2.getStructuringElement(cv2.MORPH_RECT, (max(9, w // 30), 1))
+    connected = cv2.morphologyEx(bw, cv2.MORPH_CLOSE, kernel)
+    # RETR_LIST: рамка по краю обложки не должна скрывать текст внутри нее
+    contours, _ = cv2.findContours(connected, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    boxes = []
+    for c in contours:
+        x, y, bw_w, bw_h = cv2.boundingRect(c)
+        if bw_w * bw_h < min_box_ratio * h * w or bw_w < bw_h:
+            continue
+        if cv2.countNonZero(bw[y:y+bw_h, x:x+bw_w]) / (bw_w * bw_h) < 0.2:
+            continue
+        boxes.append((x, y, x + bw_w, y + bw_h))
+
+    if not boxes:
+        return None
+    boxes = np.array(boxes)
+    return (
+        max(0, int(boxes[:, 0].min()) - pad),
+        max(0, int(boxes[:, 1].min()) - pad),
+        min(w, int(boxes[:, 2].max()) + pad),
+        min(h, int(boxes[:, 3].max()) + pad),
+    )
+
+
+def find_placeholder_phrases(data, min_confidence):
+    """Фразы-заглушки в результате image_to_data: слова собираются в строки"""
+    lines = {}
+    for i, text in enumerate(data['text']):
+        if not text.strip():
+            continue
+        if float(data['conf'][i]) < min_confidence:
+            continue
+        key = (data['block_num'][i], data['par_num'][i], data['line_num'][i])
+        lines.setdefault(key, []).append(text.strip())
+
+    found = []
+    for words in lines.values():
+        line = " ".join(words)
+        if any(re.search(pattern, line.lower()) for pattern in PLACEHOLDER_PATTERNS):
+            found.append(line)
+    return found
+
+
+def detect_placeholder_text(
+        image,
+        min_confidence=OCR_MIN_CONFIDENCE,
+        features=None,
+        visual=None,
+        busy_edge_thresh=BUSY_EDGE_THRESH,
+        configs=OCR_CONFIGS
+    ):
+    """
+    OCR текста заглушек каскадом от дешевого к дорогому:
+    1. визуальные признаки: если обложка уже распознана как заглушка или
+       (при заданном busy_edge_thresh) это насыщенная деталями иллюстрация -
+       OCR не нужен;
+    2. поиск текстоподобных областей - без них OCR не запускается, иначе
+       распознается только их общая рамка;
+    3. один вызов image_to_data на конфигурацию, выход после первого совпадения.
+
+    Если OCR не запускался (или все вызовы завершились ошибкой), причина
+    в skipped, а is_placeholder_text и found_phrases равны None - "не
+    проверялось", в отличие от False/[] - "OCR текста заглушки не нашел"
+    """
+    features = features or CoverFeatures(image)
+
+    result = {
+        "is_placeholder_text": None,
+        "found_phrases": None,
+        "confidence": None,
+        "ocr_calls": 0,
+        "skipped": None
+    }
+
+    if visual is not None and visual.get("is_placeholder"):
+        result["skipped"] = "visual_placeholder"
+        return result
+    if busy_edge_thresh is not None and features.edge_density > busy_edge_thresh:
+        result["skipped"] = "busy_artwork"
+        return result
+
+    region = text_candidate_region(features.gray)
+    if region is None:
+        result["skipped"] = "no_text_regions"
+        return result
+
+    x1, y1, x2, y2 = region
+    processed = preprocess_for_ocr(image[y1:y2, x1:x2], gray=features.gray[y1:y2, x1:x2])
+    return _recognize(processed, result, min_confidence, configs)
+
+
+def recognize_placeholder_text(image, min_confidence=OCR_MIN_CONFIDENCE, features=None, configs=OCR_CONFIGS):
+    """
+    OCR всего изображения без шагов каскада (визуальная заглушка, плотность
+    границ, текстовые области) - для выгрузки датасета, где колонки OCR
+    должны быть заполнены для каждой обложки. Результат - как у detect_placeholder_text
+    """
+    features = features or CoverFeatures(image)
+    result = {
+        "is_placeholder_text": None,
+        "found_phrases": None,
+        "confidence": None,
+        "ocr_calls": 0,
+        "skipped": None
+    }
+    return _recognize(preprocess_for_ocr(image, gray=features.gray), result, min_confidence, configs)
+
+
+def _recognize(processed, result, min_confidence, configs):
+    """Один вызов image_to_data на конфигурацию, выход после первого совпадения"""
+    recognized = False
     for config in configs:
         try:
+            result["ocr_calls"] += 1
             data = pytesseract.image_to_data(
                 processed,
                 lang='rus+eng',
                 config=config,
                 output_type=pytesseract.Output.DICT
             )
-            
-            for i, text in enumerate(data['text']):
-                if not text.strip():
-                    continue
-                    
-                conf = int(data['conf'][i])
-                if conf < min_confidence:
-                    continue
-                
-                text_lower = text.lower()
-                for pattern in PLACEHOLDER_PATTERNS:
-                    if re.search(pattern, text_lower):
-                        all_found_phrases.append(text.strip())
-                        
         except Exception as e:
-            print(f"OCR error with config {config}: {e}")
+            logger.warning(f"Ошибка OCR с конфигурацией {config}: {e}")
             continue
-     
-    try:
-        simple_text = pytesseract.image_to_string(processed, lang='rus+eng')
-        if simple_text:
-            simple_text_lower = simple_text.lower()
-            for pattern in PLACEHOLDER_PATTERNS:
-                if re.search(pattern, simple_text_lower):
-                    all_found_phrases.extend([t.strip() for t in simple_text.split('\n') if t.strip()])
-    except Exception as e:
-        print(f"Simple OCR error: {e}")
-    
-    return {
-        "is_placeholder_text": len(all_found_phrases) > 0,
-        "found_phrases": list(set(all_found_phrases)),
-        "confidence": "high" if len(all_found_phrases) > 0 else "low"
-    }
+
+        recognized = True
+        found = find_placeholder_phrases(data, min_confidence)
+        if found:
+            result.update({
+                "is_placeholder_text": True,
+                "found_phrases": list(set(found)),
+                "confidence": "high"
+            })
+            return result
+
+    if not recognized:
+        result["skipped"] = "ocr_error"
+        return result
+
+    result.update({"is_placeholder_text": False, "found_phrases": [], "confidence": "low"})
+    return result
@@ -0,0 +1,285 @@
+# backend/services/analysis_cache.py
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from backend.config import (
+    ANALYSIS_CACHE_DB, ANALYSIS_CACHE_MEMORY_ITEMS, ANALYSIS_CACHE_MAX_BYTES,
+    ANALYSIS_CACHE_PHASH_DISTANCE, ANALYSIS_CACHE_COLOR_TOLERANCE, PALETTE_BACKEND, PALETTE_MAX_SIDE
+)
+from backend.covers.placeholder_ocr import OCR_MIN_CONFIDENCE, OCR_CONFIGS, BUSY_EDGE_THRESH
+
+logger = logging.getLogger(__name__)
+
+# Увеличивать при любом изменении логики analyze_cover
+ANALYSIS_SCHEMA = 1
+
+
+def analysis_version():
+    """Версия результатов: меняется вместе с параметрами анализа"""
+    params = {
+        "schema": ANALYSIS_SCHEMA,
+        "palette_backend": PALETTE_BACKEND,
+        "palette_max_side": PALETTE_MAX_SIDE,
+        "ocr_min_confidence": OCR_MIN_CONFIDENCE,
+        "ocr_configs": list(OCR_CONFIGS),
+        "ocr_busy_edge_thresh": BUSY_EDGE_THRESH,
+    }
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def content_hash(image):
+    """Хеш декодированных пикселей (не зависит от формата/метаданных файла)"""
+    h = hashlib.sha256()
+    h.update(str(image.shape).encode())
+    h.update(np.ascontiguousarray(image).data)
+    return h.hexdigest()
+
+
+def perceptual_hash(image):
+    """64-битный pHash: знаки низкочастотных коэффициентов DCT относительно медианы"""
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY) if image.ndim == 3 else image
+    small = cv2.resize(gray, (32, 32), interpolation=cv2.INTER_AREA).astype(np.float32)
+    low = cv2.dct(small)[:8, :8].flatten()
+    bits = low > np.median(low[1:])
+    return int(np.packbits(bits.astype(np.uint8)).view(">u8")[0])
+
+
+def color_signature(image):
+    """Цветная миниатюра 8x8 (192 байта): pHash построен по серому и цвета не различает"""
+    if image.ndim == 2:
+        image = cv2.cvtColor(image, cv2.COLOR_GRAY2BGR)
+    return cv2.resize(image[..., :3], (8, 8), interpolation=cv2.INTER_AREA).tobytes()
+
+
+def _to_signed(value):
+    """SQLite хранит INTEGER как знаковое 64-битное"""
+    return value - (1 << 64) if value >= (1 << 63) else value
+
+
+def json_default(obj):
+    if hasattr(obj, "item"):
+        return obj.item()
+    if hasattr(obj, "tolist"):
+        return obj.tolist()
+    return str(obj)
+
+
+class AnalysisCache:
+    """
+    Двухуровневый кеш результатов analyze_cover:
+    LRU в памяти процесса и SQLite на диске с вытеснением по размеру.
+
+    Ключ - хеш пикселей изображения; почти-дубликаты (пережатие, ресайз)
+    находятся по pHash, если phash_distance > 0, и принимаются, только если
+    цветные миниатюры отличаются не больше color_tolerance. Записи другой
+    версии анализа не используются.
+    """
+
+    def __init__(self, db_path=ANALYSIS_CACHE_DB, memory_items=ANALYSIS_CACHE_MEMORY_ITEMS,
+                 max_bytes=ANALYSIS_CACHE_MAX_BYTES, phash_distance=ANALYSIS_CACHE_PHASH_DISTANCE,
+                 color_tolerance=ANALYSIS_CACHE_COLOR_TOLERANCE):
+        self.db_path = db_path
+        self.memory_items = memory_items
+        self.max_bytes = max_bytes
+        self.phash_distance = phash_distance
+        self.color_tolerance = color_tolerance
+        self.version = analysis_version()
+
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        # (ключи, pHash) записей текущей версии для поиска дубликатов: читаются
+        # из базы один раз, дальше дополняются в store и чистятся в _evict
+        self._phashes = None
+        self.counters = {
+            "memory_hits": 0, "disk_hits": 0, "near_duplicate_hits": 0,
+            "misses": 0, "stores": 0, "evictions": 0
+        }
+
+    def _db(self):
+        if self._conn is None:
+            os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+            self._conn = sqlite3.connect(self.db_path, check_same_thread=False)
+            self._conn.execute("""
+                CREATE TABLE IF NOT EXISTS analyses (
+                    key TEXT PRIMARY KEY,
+                    version TEXT NOT NULL,
+                    phash INTEGER NOT NULL,
+                    height INTEGER NOT NULL,
+                    width INTEGER NOT NULL,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    last_access REAL NOT NULL,
+                    signature BLOB
+                )
+            """)
+            columns = {row[1] for row in self._conn.execute("PRAGMA table_info(analyses)")}
+            if "signature" not in columns:
+                # База прежней версии: у старых записей миниатюры нет - как почти-дубликаты они не используются
+                self._conn.execute("ALTER TABLE analyses ADD COLUMN signature BLOB")
+            self._conn.execute("CREATE INDEX IF NOT EXISTS idx_analyses_access ON analyses(last_access)")
+            # Записи старых версий больше не понадобятся
+            self._conn.execute("DELETE FROM analyses WHERE version != ?", (self.version,))
+            self._conn.commit()
+        return self._conn
+
+    def _load_phashes(self):
+        if self._phashes is None:
+            rows = self._db().execute("SELECT key, phash FROM analyses").fetchall()
+            keys = [r[0] for r in rows]
+            values = np.array([r[1] for r in rows], dtype=np.int64).view(np.uint64)
+            self._phashes = (keys, values)
+        return self._phashes
+
+    def _find_near_duplicate(self, phash, signature, max_candidates=5):
+        """
+        Ключ почти-дубликата или None: ближайшие по pHash записи проверяются
+        по цветной миниатюре (разные цвета при одной компоновке pHash не различает)
+        """
+        if self.phash_distance <= 0:
+            return None
+        keys, values = self._load_phashes()
+        if not keys:
+            return None
+        xor = (values ^ np.uint64(phash)).view(np.uint8).reshape(-1, 8)
+        distances = np.unpackbits(xor, axis=1).sum(axis=1)
+        close = np.flatnonzero(distances <= self.phash_distance)
+        query = np.frombuffer(signature, dtype=np.uint8).astype(np.int16)
+        for i in close[np.argsort(distances[close], kind="stable")][:max_candidates]:
+            row = self._db().execute("SELECT signature FROM analyses WHERE key = ?", (keys[i],)).fetchone()
+            if row is None or row[0] is None or len(row[0]) != len(signature):
+                continue
+            stored = np.frombuffer(row[0], dtype=np.uint8).astype(np.int16)
+            if np.abs(stored - query).mean() <= self.color_tolerance:
+                return keys[i]
+        return None
+
+    def _remember(self, key, entry):
+        self._memory[key] = entry
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.memory_items:
+            self._memory.popitem(last=False)
+
+    @staticmethod
+    def _fit_to_shape(entry, shape):
+        """Для почти-дубликата другого размера масштабируем рамки лиц"""
+        value = entry["value"]
+        height, width = entry["shape"]
+        if (height, width) == tuple(shape[:2]) or not value.get("faces"):
+            return value
+        sx, sy = shape[1] / width, shape[0] / height
+        faces = [[int(x * sx), int(y * sy), int(w * sx), int(h * sy)] for x, y, w, h in value["faces"]]
+        return dict(value, faces=faces)
+
+    def lookup(self, image):
+        """
+        Возвращает (value или None, keys). keys передаются в store(),
+        чтобы не считать хеши повторно
+        """
+        key = content_hash(image)
+        phash = perceptual_hash(image)
+        signature = color_signature(image)
+        keys = (key, phash, signature)
+
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                self.counters["memory_hits"] += 1
+                return entry["value"], keys
+
+            db = self._db()
+            row = db.execute("SELECT key, height, width, value FROM analyses WHERE key = ?", (key,)).fetchone()
+            counter = "disk_hits"
+            if row is None:
+                near_key = self._find_near_duplicate(phash, signature)
+                if near_key is not None:
+                    row = db.execute(
+                        "SELECT key, height, width, value FROM analyses WHERE key = ?", (near_key,)
+                    ).fetchone()
+                    counter = "near_duplicate_hits"
+
+            if row is None:
+                self.counters["misses"] += 1
+                return None, keys
+
+            db.execute("UPDATE analyses SET last_access = ? WHERE key = ?", (time.time(), row[0]))
+            db.commit()
+            entry = {"value": json.loads(row[3]), "shape": (row[1], row[2])}
+            value = self._fit_to_shape(entry, image.shape)
+            self._remember(key, {"value": value, "shape": image.shape[:2]})
+            self.counters[counter] += 1
+            return value, keys
+
+    def store(self, keys, image_shape, value):
+        key, phash, signature = keys
+        payload = json.dumps(value, ensure_ascii=False, default=json_default)
+
+        with self._lock:
+            self._remember(key, {"value": json.loads(payload), "shape": tuple(image_shape[:2])})
+            db = self._db()
+            db.execute(
+                "INSERT OR REPLACE INTO analyses "
+                "(key, version, phash, height, width, value, size, last_access, signature) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (key, self.version, _to_signed(phash), int(image_shape[0]), int(image_shape[1]),
+                 payload, len(payload.encode("utf-8")), time.time(), signature)
+            )
+            if self._phashes is not None and key not in self._phashes[0]:
+                keys, values = self._phashes
+                self._phashes = (keys + [key], np.append(values, np.uint64(phash)))
+            self._evict(db)
+            db.commit()
+            self.counters["stores"] += 1
+
+    def _evict(self, db):
+        """Удаляет давно не использованные записи, пока размер выше лимита"""
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM analyses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        target = total - int(self.max_bytes * 0.9)
+        freed = 0
+        victims = []
+        for key, size in db.execute("SELECT key, size FROM analyses ORDER BY last_access"):
+            victims.append((key,))
+            freed += size
+            if freed >= target:
+                break
+        db.executemany("DELETE FROM analyses WHERE key = ?", victims)
+        for (key,) in victims:
+            self._memory.pop(key, None)
+        if self._phashes is not None:
+            evicted = {key for (key,) in victims}
+            keys, values = self._phashes
+            keep = [i for i, key in enumerate(keys) if key not in evicted]
+            self._phashes = ([keys[i] for i in keep], values[keep])
+        self.counters["evictions"] += len(victims)
+
+    def info(self):
+        with self._lock:
+            count, size = self._db().execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM analyses"
+            ).fetchone()
+            lookups = sum(self.counters[k] for k in ("memory_hits", "disk_hits", "near_duplicate_hits", "misses"))
+            hits = lookups - self.counters["misses"]
+            return {
+                "version": self.version,
+                **self.counters,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "memory_items": len(self._memory),
+                "disk_items": count,
+                "disk_bytes": size,
+                "max_bytes": self.max_bytes,
+            }
+
+
+analysis_cache = AnalysisCache()
@@ -1,87 +1,167 @@
 # backend/services/build_analysis_csv.py
 import os
+import sys
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
 import cv2
 import pandas as pd
+
+# Добавляем корневую директорию проекта в путь Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
 from backend.covers.analysis import analyze_cover
-from backend.covers.placeholder_ocr import detect_placeholder_text
+from backend.covers.features import CoverFeatures
+from backend.covers.placeholder_ocr import recognize_placeholder_text
 
 CSV_INPUT = "backend/data/books_local.csv"
 CSV_OUTPUT = "backend/data/books_analysis.csv"
 
+OUTPUT_COLUMNS = [
+    "id", "title", "genre", "image_path",
+    "placeholder_auto", "placeholder_text", "found_phrases",
+    "design", "face", "face_position", "text_density", "edge_density", "negative_space",
+    "colors", "color_contrast", "warm_cold_balance", "monochrome",
+]
+
+
+def init_worker():
+    # Параллелизм - на уровне процессов, OpenCV внутри воркера однопоточный
+    cv2.setNumThreads(1)
+
+
+def analyze_row(row):
+    """Анализ одной обложки: (строка результата или None, сообщение)"""
+    image_path = row.get("image_path")
+    if not isinstance(image_path, str) or not os.path.exists(image_path):
+        return None, f"⚠️ Файл не найден: {image_path}"
+
+    img = cv2.imread(image_path)
+    if img is None:
+        return None, f"⚠️ Не удалось прочитать изображение: {image_path}"
+
+    features = CoverFeatures(img)
+    analysis = analyze_cover(img, features)
+    placeholder_ocr = analysis["placeholder"]["ocr"]
+    if placeholder_ocr["skipped"] == "visual_placeholder":
+        # В API OCR для визуальных заглушек не нужен, но колонки placeholder_text
+        # и found_phrases описывают именно их - как раньше, OCR всего изображения без каскада
+        placeholder_ocr = recognize_placeholder_text(img, features=features)
+
+    return {
+        "id": row.get("id"),
+        "title": row.get("title"),
+        "genre": row.get("genre"),
+        "image_path": image_path,
+
+        # Placeholder
+        "placeholder_auto": analysis.get("type") == "placeholder",
+        # Пустое значение - OCR не проверял обложку (пропущен каскадом или ошибка)
+        "placeholder_text": placeholder_ocr["is_placeholder_text"],
+        "found_phrases": ",".join(placeholder_ocr["found_phrases"] or []),
+
+        # Дизайн и композиция
+        "design": analysis.get("design"),
+        "face": analysis.get("face"),
+        "face_position": analysis.get("face_position"),
+        "text_density": analysis.get("text_density"),
+        "edge_density": analysis.get("edge_density"),
+        "negative_space": analysis.get("negative_space"),
+
+        # Цвет
+        "colors": str(analysis.get("colors")),
+        "color_contrast": analysis.get("color_contrast"),
+        "warm_cold_balance": analysis.get("warm_cold_balance"),
+        "monochrome": analysis.get("color_contrast") < 20
+    }, None
+
+
+def analyze_chunk(rows):
+    """Ошибка на одной обложке не прерывает чанк: она пропускается, как нечитаемое изображение"""
+    results = []
+    for row in rows:
+        try:
+            results.append(analyze_row(row))
+        except Exception as e:
+            results.append((None, f"⚠️ Ошибка анализа {row.get('image_path')}: {e}"))
+    return results
+
+
+def load_checkpoint(output_path):
+    """
+    id уже обработанных книг. Выходной CSV дописывается по чанкам и служит
+    контрольной точкой; оборванная при падении строка отбрасывается
+    """
+    if not os.path.exists(output_path):
+        return set()
+
+    done = pd.read_csv(output_path, on_bad_lines="skip", engine="python")
+    done = done.dropna(subset=["id", "monochrome"])
+    done.to_csv(output_path, index=False, columns=OUTPUT_COLUMNS)
+    return set(done["id"].astype(int))
+
+
+def append_rows(output_path, rows):
+    write_header = not os.path.exists(output_path)
+    pd.DataFrame(rows, columns=OUTPUT_COLUMNS).to_csv(
+        output_path, mode="a", header=write_header, index=False
+    )
+
+
 def main():
-    if not os.path.exists(CSV_INPUT):
-        print(f"❌ CSV файл не найден: {CSV_INPUT}")
+    parser = argparse.ArgumentParser(description="Пакетный анализ обложек в books_analysis.csv")
+    parser.add_argument("--input", default=CSV_INPUT)
+    parser.add_argument("--output", default=CSV_OUTPUT)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Число процессов")
+    parser.add_argument("--chunk-size", type=int, default=16, help="Обложек на одну задачу воркера")
+    parser.add_argument("--restart", action="store_true", help="Игнорировать контрольную точку и начать заново")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.input):
+        print(f"❌ CSV файл не найден: {args.input}")
         return
 
-    df = pd.read_csv(CSV_INPUT)
-    print(f"📊 Начинаем анализ {len(df)} изображений...")
+    if args.restart and os.path.exists(args.output):
+        os.remove(args.output)
 
-    results = []
+    df = pd.read_csv(args.input)
+    done = load_checkpoint(args.output)
+    pending = [row for row in df.to_dict("records") if int(row["id"]) not in done]
+
+    print(f"📊 Всего {len(df)} изображений, уже обработано: {len(done)}, осталось: {len(pending)}")
+    if not pending:
+        print(f"✅ Анализ уже завершен: {args.output}")
+        return
 
-    for i, row in enumerate(df.itertuples(), start=1):
-        image_path = getattr(row, "image_path", None)
-        if not image_path or not os.path.exists(image_path):
-            print(f"⚠️ Файл не найден: {image_path}")
-            continue
-
-        img = cv2.imread(image_path)
-        if img is None:
-            print(f"⚠️ Не удалось прочитать изображение: {image_path}")
-            continue
-
-        # Placeholder OCR
-        placeholder_ocr = detect_placeholder_text(img)
-
-        # Полный анализ
-        analysis = analyze_cover(img)
-        placeholder_text = False
-        found_phrases = ""
-
-        if analysis.get("type") == "placeholder":
-            placeholder_text = analysis["placeholder"]["ocr"].get("is_placeholder_text", False)
-            found_phrases = ",".join(
-                analysis["placeholder"]["ocr"].get("found_phrases", [])
-            )
-
-
-        result_row = {
-            "id": getattr(row, "id", None),
-            "title": getattr(row, "title", None),
-            "genre": getattr(row, "genre", None),
-            "image_path": image_path,
-
-            # Placeholder
-            "placeholder_auto": analysis.get("type") == "placeholder",
-            "placeholder_text": placeholder_ocr["is_placeholder_text"],
-            "found_phrases": ",".join(placeholder_ocr["found_phrases"]),
-
-            # Дизайн и композиция
-            "design": analysis.get("design"),
-            "face": analysis.get("face"),
-            "face_position": analysis.get("face_position"),
-            "text_density": analysis.get("text_density"),
-            "edge_density": analysis.get("edge_density"),
-            "negative_space": analysis.get("negative_space"),
-
-            # Цвет
-            "colors": str(analysis.get("colors")),
-            "color_contrast": analysis.get("color_contrast"),
-            "warm_cold_balance": analysis.get("warm_cold_balance"),
-            "monochrome": analysis.get("color_contrast") < 20
-        }
-
-        results.append(result_row)
-        print(f"[{i}/{len(df)}] {getattr(row, 'title', '')} - обработано")
-        print(
-                analysis.get("design"),
-                analysis.get("face"),
-                analysis.get("color_contrast"),
-                analysis.get("warm_cold_balance")
-            )
-
-    df_out = pd.DataFrame(results)
-    df_out.to_csv(CSV_OUTPUT, index=False)
-    print(f"✅ Анализ завершен. CSV сохранен: {CSV_OUTPUT}")
+    chunks = [pending[i:i + args.chunk_size] for i in range(0, len(pending), args.chunk_size)]
+    processed = skipped = 0
+    start = time.perf_counter()
+
+    with ProcessPoolExecutor(max_workers=args.workers, initializer=init_worker) as pool:
+        futures = [pool.submit(analyze_chunk, chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            rows = []
+            for row, message in future.result():
+                if row is None:
+                    print(message)
+                    skipped += 1
+                else:
+                    rows.append(row)
+
+            if rows:
+                append_rows(args.output, rows)
+            processed += len(rows)
+
+            elapsed = time.perf_counter() - start
+            print(f"[{processed + skipped}/{len(pending)}] обработано, {processed / elapsed:.2f} обложек/с")
+
+    elapsed = time.perf_counter() - start
+    print(f"✅ Анализ завершен. CSV сохранен: {args.output}")
+    print(
+        f"⏱️ Обработано {processed} обложек (пропущено {skipped}) за {elapsed:.1f} с: "
+        f"{processed / elapsed:.2f} обложек/с, процессов: {args.workers}"
+    )
 
 
 if __name__ == "__main__":
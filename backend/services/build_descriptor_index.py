@@ -0,0 +1,45 @@
+# backend/services/build_descriptor_index.py
+import sys
+import os
+import argparse
+
+# Добавляем корневую директорию проекта в путь Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.config import BOOKS_CSV, ORB_INDEX_DIR
+from backend.services.descriptor_index import DescriptorIndex
+from backend.services.similarity_engine import SimilarityEngine
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Построение индекса ORB-дескрипторов обложек")
+    parser.add_argument("--csv", default=BOOKS_CSV, help="CSV каталога с колонкой image_path")
+    parser.add_argument("--force", action="store_true", help="Пересчитать дескрипторы всех обложек")
+    parser.add_argument("--retrain", action="store_true", help="Заново обучить словарь визуальных слов")
+    parser.add_argument("--words", type=int, default=1024, help="Размер словаря визуальных слов")
+    args = parser.parse_args()
+
+    print("🏗️ Обновление индекса ORB-дескрипторов...")
+    index = DescriptorIndex.load()
+    summary = index.update(args.csv, force=args.force)
+
+    print(
+        f"✅ Индекс обновлен: {len(index)} обложек, {len(index.descriptors)} дескрипторов "
+        f"(новых: {summary['added']}, изменено: {summary['updated']}, "
+        f"без изменений: {summary['unchanged']}, удалено: {summary['removed']}, "
+        f"не найдено: {summary['missing']})"
+    )
+
+    print("🔤 Построение инвертированного индекса визуальных слов...")
+    engine = SimilarityEngine.load(index)
+    engine.build(n_words=args.words, retrain=args.retrain or args.force)
+    engine.save()
+    if engine.is_ready:
+        print(f"✅ Словарь: {len(engine.vocabulary)} слов, записей в индексе: {len(engine.postings_images)}")
+    else:
+        print("⚠️ Каталог пуст - словарь визуальных слов не построен")
+    print(f"📁 Директория индекса: {ORB_INDEX_DIR}")
+
+
+if __name__ == "__main__":
+    main()
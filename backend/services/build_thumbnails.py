@@ -0,0 +1,26 @@
+# backend/services/build_thumbnails.py
+import sys
+import os
+import argparse
+
+# Добавляем корневую директорию проекта в путь Python
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+
+from backend.config import BOOKS_CSV, THUMBNAILS_DIR, THUMBNAIL_MAX_SIDE
+from backend.services.thumbnails import build_thumbnails
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Построение превью обложек")
+    parser.add_argument("--csv", default=BOOKS_CSV, help="CSV каталога с колонками id и image_path")
+    parser.add_argument("--force", action="store_true", help="Пересоздать все превью")
+    args = parser.parse_args()
+
+    print(f"🖼️ Построение превью (до {THUMBNAIL_MAX_SIDE}px)...")
+    summary = build_thumbnails(args.csv, force=args.force)
+    print(f"✅ Готово превью: {summary['ready']}, обложек не найдено: {summary['missing']}")
+    print(f"📁 Директория превью: {THUMBNAILS_DIR}")
+
+
+if __name__ == "__main__":
+    main()
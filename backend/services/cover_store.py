@@ -0,0 +1,115 @@
+# backend/services/cover_store.py
+import json
+import logging
+import os
+
+import cv2
+
+from backend.config import COVER_STORE_FILE
+from backend.covers.analysis import analyze_cover
+from backend.services.analysis_cache import analysis_version, json_default
+from backend.services.descriptor_index import resolve_path, file_hash
+
+logger = logging.getLogger(__name__)
+
+
+class CoverAnalysisStore:
+    """
+    Результаты analyze_cover для обложек каталога, ключ - sha1 файла.
+
+    Для каждого пути запоминаются mtime/размер/sha1: неизмененный файл не
+    читается вовсе, измененный - хешируется, и анализ запускается только
+    если такого содержимого еще не было
+    """
+
+    def __init__(self, path=COVER_STORE_FILE):
+        self.path = path
+        self.version = analysis_version()
+        self.files = {}
+        self.analyses = {}
+        self.counters = {"reused": 0, "analyzed": 0, "missing": 0, "pruned": 0}
+        # Пути, запрошенные через get с момента загрузки
+        self.seen = set()
+        self.dirty = False
+
+    @classmethod
+    def load(cls, path=COVER_STORE_FILE):
+        store = cls(path)
+        if not os.path.exists(path):
+            return store
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == store.version:
+                store.files = data["files"]
+                store.analyses = data["analyses"]
+            else:
+                logger.info("Параметры анализа изменились - результаты по обложкам пересчитываются")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки результатов анализа обложек: {e}")
+        return store
+
+    def save(self):
+        if not self.dirty:
+            return
+        # Удаляем результаты, на которые больше не ссылается ни один файл
+        used = {info["sha1"] for info in self.files.values()}
+        self.analyses = {h: a for h, a in self.analyses.items() if h in used}
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(
+                {"version": self.version, "files": self.files, "analyses": self.analyses},
+                f, ensure_ascii=False, default=json_default
+            )
+        os.replace(tmp_path, self.path)
+        self.dirty = False
+
+    def prune(self):
+        """Забывает пути, не запрошенные с момента загрузки (ушли из каталога)"""
+        stale = [image_path for image_path in self.files if image_path not in self.seen]
+        for image_path in stale:
+            del self.files[image_path]
+        if stale:
+            self.counters["pruned"] += len(stale)
+            self.dirty = True
+
+    def _current_hash(self, image_path, path):
+        stat = os.stat(path)
+        info = self.files.get(image_path)
+        if info and info["mtime"] == stat.st_mtime and info["size"] == stat.st_size:
+            return info["sha1"]
+
+        sha1 = file_hash(path)
+        self.files[image_path] = {"mtime": stat.st_mtime, "size": stat.st_size, "sha1": sha1}
+        self.dirty = True
+        return sha1
+
+    def get(self, image_path):
+        """Анализ обложки: из хранилища или свежий для новых/измененных файлов"""
+        if not isinstance(image_path, str):
+            self.counters["missing"] += 1
+            return None
+        self.seen.add(image_path)
+        path = resolve_path(image_path)
+        if not os.path.exists(path):
+            self.counters["missing"] += 1
+            return None
+
+        sha1 = self._current_hash(image_path, path)
+        analysis = self.analyses.get(sha1)
+        if analysis is not None:
+            self.counters["reused"] += 1
+            return analysis
+
+        img = cv2.imread(path)
+        if img is None:
+            self.counters["missing"] += 1
+            return None
+
+        analysis = json.loads(json.dumps(analyze_cover(img), default=json_default))
+        self.analyses[sha1] = analysis
+        self.dirty = True
+        self.counters["analyzed"] += 1
+        return analysis
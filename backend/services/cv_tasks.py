@@ -0,0 +1,68 @@
+# backend/services/cv_tasks.py
+"""
+Задачи для пула процессов (см. backend/services/executor.py).
+
+Функции уровня модуля, чтобы их можно было передать в воркер через pickle.
+"""
+import cv2
+
+from backend.covers.analysis import analyze_cover
+from backend.covers.features import CoverFeatures
+from backend.covers.filters import apply_filter
+from backend.services.image_io import img_to_base64
+from backend.services.similarity_service import orb_features
+
+
+def analyze_image(img):
+    """Результат analyze_cover и рамки найденных лиц [[x, y, w, h], ...]"""
+    features = CoverFeatures(img)
+    analysis = analyze_cover(img, features)
+    # Как в analyze_cover: сбой каскада лиц не должен ронять весь анализ
+    # (cached_property не кеширует исключение, поэтому повторная защита)
+    try:
+        faces = [[int(v) for v in face] for face in features.faces]
+    except Exception:
+        faces = []
+    return {"analysis": analysis, "faces": faces}
+
+
+def annotate_faces(img, faces):
+    for (x, y, w, h) in faces:
+        cv2.rectangle(img, (x, y), (x+w, y+h), (0,255,0), 2)
+    return img_to_base64(img)
+
+
+def filter_image(img, mode):
+    return {"image_base64": img_to_base64(apply_filter(img, mode))}
+
+
+def find_similar(img, top_n):
+    from backend.services.similarity_engine import get_similarity_engine
+
+    query_des = orb_features(img)
+    return [
+        {
+            "id": entry["id"],
+            "title": entry.get("title", "Unknown"),
+            "score": score,
+            "thumbnail_url": f"/api/covers/{entry['id']}/thumbnail",
+            "image_url": f"/api/covers/{entry['id']}"
+        }
+        for entry, score in get_similarity_engine().search(query_des, top_n=top_n)
+    ]
+
+
+def refresh_stats(csv_path, force_refresh):
+    from backend.services.stats_cache import get_cached_stats
+    return get_cached_stats(csv_path, force_refresh=force_refresh)
+
+
+def analyze_skating(video_path, jump_intervals):
+    from backend.video.analyze_skating_improved import SkatingAnalyzer
+    analyzer = SkatingAnalyzer()
+    return analyzer.analyze_skating(video_path, jump_intervals=jump_intervals)
+
+
+def render_stats_plot(stats):
+    from backend.services.stats_plots import get_stats_plot
+    return get_stats_plot(stats)
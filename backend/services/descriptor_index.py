@@ -0,0 +1,215 @@
+# backend/services/descriptor_index.py
+import hashlib
+import json
+import logging
+import os
+
+import cv2
+import numpy as np
+import pandas as pd
+
+from backend.config import PROJECT_ROOT, ORB_INDEX_DIR, BOOKS_CSV
+from backend.services.similarity_service import orb_features
+
+logger = logging.getLogger(__name__)
+
+INDEX_VERSION = 1
+DESCRIPTORS_FILE = "descriptors.npy"
+META_FILE = "meta.json"
+DESCRIPTOR_SIZE = 32  # ORB: 256 бит = 32 байта
+
+
+def resolve_path(path):
+    """Пути в CSV заданы относительно корня проекта"""
+    return path if os.path.isabs(path) else os.path.join(PROJECT_ROOT, path)
+
+
+def file_hash(path, chunk_size=1 << 20):
+    h = hashlib.sha1()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class DescriptorIndex:
+    """
+    Персистентный индекс ORB-дескрипторов каталога обложек.
+
+    Дескрипторы всех обложек хранятся одним массивом (N, 32) uint8 в
+    descriptors.npy и открываются через memmap, метаданные (книга, путь,
+    mtime/размер/sha1 файла, смещение в массиве) - в meta.json.
+    """
+
+    def __init__(self, index_dir=ORB_INDEX_DIR):
+        self.index_dir = index_dir
+        self.entries = []
+        self.descriptors = np.empty((0, DESCRIPTOR_SIZE), dtype=np.uint8)
+        self.loaded_mtime = None
+        self._by_id = None
+
+    @property
+    def meta_path(self):
+        return os.path.join(self.index_dir, META_FILE)
+
+    @property
+    def descriptors_path(self):
+        return os.path.join(self.index_dir, DESCRIPTORS_FILE)
+
+    def __len__(self):
+        return len(self.entries)
+
+    @classmethod
+    def load(cls, index_dir=ORB_INDEX_DIR):
+        """Загружает индекс с диска (дескрипторы - memmap, без чтения в память)"""
+        index = cls(index_dir)
+        if not os.path.exists(index.meta_path) or not os.path.exists(index.descriptors_path):
+            return index
+
+        try:
+            with open(index.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != INDEX_VERSION:
+                logger.warning("Версия индекса дескрипторов устарела - требуется перестроение")
+                return index
+
+            index.entries = meta["entries"]
+            index.descriptors = np.load(index.descriptors_path, mmap_mode="r")
+            index.loaded_mtime = os.path.getmtime(index.meta_path)
+        except Exception as e:
+            logger.error(f"Ошибка загрузки индекса дескрипторов: {e}")
+            index.entries = []
+            index.descriptors = np.empty((0, DESCRIPTOR_SIZE), dtype=np.uint8)
+        return index
+
+    def is_outdated(self):
+        """True, если индекс на диске был перестроен после загрузки"""
+        if not os.path.exists(self.meta_path):
+            return False
+        return os.path.getmtime(self.meta_path) != self.loaded_mtime
+
+    def get_descriptors(self, position):
+        """Дескрипторы обложки по позиции в индексе (view на memmap) или None"""
+        entry = self.entries[position]
+        if entry["count"] == 0:
+            return None
+        return self.descriptors[entry["offset"]:entry["offset"] + entry["count"]]
+
+    def find(self, book_id):
+        """Запись индекса по id книги или None"""
+        if self._by_id is None:
+            self._by_id = {entry["id"]: entry for entry in self.entries}
+        return self._by_id.get(book_id)
+
+    def items(self):
+        for position, entry in enumerate(self.entries):
+            yield entry, self.get_descriptors(position)
+
+    def _is_unchanged(self, entry, path):
+        """Проверка актуальности: сначала mtime/размер, при расхождении - sha1"""
+        stat = os.stat(path)
+        if entry["mtime"] == stat.st_mtime and entry["size"] == stat.st_size:
+            return True
+        if entry["size"] == stat.st_size and entry["sha1"] == file_hash(path):
+            entry["mtime"] = stat.st_mtime
+            return True
+        return False
+
+    def update(self, csv_path=BOOKS_CSV, force=False):
+        """
+        Инкрементально обновляет индекс по CSV каталога: дескрипторы
+        считаются только для новых и изменившихся обложек
+        """
+        df = pd.read_csv(resolve_path(csv_path))
+        old_entries = {e["image_path"]: (i, e) for i, e in enumerate(self.entries)}
+
+        new_entries = []
+        chunks = []
+        offset = 0
+        summary = {"added": 0, "updated": 0, "unchanged": 0, "missing": 0}
+
+        for row in df.itertuples():
+            image_path = getattr(row, "image_path", None)
+            if not isinstance(image_path, str) or not os.path.exists(resolve_path(image_path)):
+                summary["missing"] += 1
+                continue
+
+            path = resolve_path(image_path)
+            previous = old_entries.get(image_path)
+
+            if previous and not force and self._is_unchanged(previous[1], path):
+                entry = dict(previous[1])
+                des = self.get_descriptors(previous[0])
+                summary["unchanged"] += 1
+            else:
+                img = cv2.imread(path)
+                if img is None:
+                    summary["missing"] += 1
+                    continue
+                des = orb_features(img)
+                stat = os.stat(path)
+                entry = {
+                    "image_path": image_path,
+                    "mtime": stat.st_mtime,
+                    "size": stat.st_size,
+                    "sha1": file_hash(path),
+                }
+                summary["updated" if previous else "added"] += 1
+
+            count = 0 if des is None else len(des)
+            if count:
+                chunks.append(np.asarray(des, dtype=np.uint8))
+
+            entry.update({
+                "id": int(getattr(row, "id", len(new_entries))),
+                "title": getattr(row, "title", "Unknown"),
+                "genre": getattr(row, "genre", "Unknown"),
+                "offset": offset,
+                "count": count,
+            })
+            new_entries.append(entry)
+            offset += count
+
+        summary["removed"] = len(set(old_entries) - {e["image_path"] for e in new_entries})
+
+        descriptors = (
+            np.concatenate(chunks) if chunks
+            else np.empty((0, DESCRIPTOR_SIZE), dtype=np.uint8)
+        )
+        self._save(new_entries, descriptors)
+        return summary
+
+    def _save(self, entries, descriptors):
+        """Атомарная запись: сначала во временные файлы, затем os.replace"""
+        os.makedirs(self.index_dir, exist_ok=True)
+
+        tmp_descriptors = self.descriptors_path + ".tmp.npy"
+        np.save(tmp_descriptors, descriptors)
+        os.replace(tmp_descriptors, self.descriptors_path)
+
+        tmp_meta = self.meta_path + ".tmp"
+        with open(tmp_meta, "w", encoding="utf-8") as f:
+            json.dump({"version": INDEX_VERSION, "entries": entries}, f, ensure_ascii=False)
+        os.replace(tmp_meta, self.meta_path)
+
+        self.entries = entries
+        self._by_id = None
+        self.descriptors = np.load(self.descriptors_path, mmap_mode="r")
+        self.loaded_mtime = os.path.getmtime(self.meta_path)
+
+
+_index = None
+
+
+def get_descriptor_index():
+    """Индекс, загруженный при первом обращении; перечитывается после перестроения"""
+    global _index
+    if _index is None or _index.is_outdated():
+        _index = DescriptorIndex.load()
+        logger.info(f"Индекс дескрипторов загружен: {len(_index)} обложек")
+    return _index
+
+
+def update_descriptor_index(csv_path=BOOKS_CSV, force=False):
+    index = DescriptorIndex.load()
+    return index.update(csv_path, force=force)
@@ -0,0 +1,173 @@
+# backend/services/executor.py
+import asyncio
+import logging
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from contextlib import asynccontextmanager
+
+from fastapi import HTTPException
+
+from backend.config import (
+    CV_WORKERS, IO_WORKERS, CV_MAX_PENDING, ENDPOINT_LIMITS, PRELOAD_SKATER_MODEL, SKATING_JOB_WORKERS
+)
+
+logger = logging.getLogger(__name__)
+
+_process_pool = None
+_thread_pool = None
+_job_pool = None
+_pending = 0
+
+
+def _init_worker():
+    """Инициализация процесса-воркера: OpenCV не должен плодить свои потоки"""
+    import cv2
+    cv2.setNumThreads(1)
+    if PRELOAD_SKATER_MODEL:
+        # Загрузка и прогрев YOLO до первого запроса на анализ видео
+        from backend.video.models import preload_models
+        preload_models()
+
+
+def get_process_pool():
+    global _process_pool
+    if _process_pool is None:
+        # spawn: воркеры не наследуют потоки и состояние сервера (torch/OpenCV)
+        _process_pool = ProcessPoolExecutor(
+            max_workers=CV_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _process_pool
+
+
+def get_job_pool():
+    """Пул для долгих фоновых задач (анализ видео), чтобы они не занимали CV-воркеры"""
+    global _job_pool
+    if _job_pool is None:
+        _job_pool = ProcessPoolExecutor(
+            max_workers=SKATING_JOB_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+    return _job_pool
+
+
+def reset_job_pool():
+    """После аварийного завершения воркера пул пересоздается при следующей задаче"""
+    global _job_pool
+    _job_pool = None
+
+
+def get_thread_pool():
+    global _thread_pool
+    if _thread_pool is None:
+        _thread_pool = ThreadPoolExecutor(max_workers=IO_WORKERS, thread_name_prefix="io")
+    return _thread_pool
+
+
+def shutdown_pools():
+    global _process_pool, _thread_pool, _job_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(wait=True, cancel_futures=True)
+        _process_pool = None
+    if _job_pool is not None:
+        _job_pool.shutdown(wait=True, cancel_futures=True)
+        _job_pool = None
+    if _thread_pool is not None:
+        _thread_pool.shutdown(wait=False, cancel_futures=True)
+        _thread_pool = None
+
+
+async def run_in_process(fn, *args):
+    """
+    Выполняет CPU-нагруженную функцию (CV/OCR) в пуле процессов.
+    fn и аргументы должны сериализоваться pickle (функции уровня модуля)
+    """
+    global _process_pool, _pending
+    if _pending >= CV_MAX_PENDING:
+        raise HTTPException(503, "Сервер перегружен, повторите запрос позже", headers={"Retry-After": "5"})
+
+    _pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(get_process_pool(), fn, *args)
+    except BrokenProcessPool:
+        logger.error("Пул процессов аварийно завершился - пересоздаем")
+        _process_pool = None
+        raise HTTPException(503, "Воркер анализа аварийно завершился, повторите запрос")
+    finally:
+        _pending -= 1
+
+
+async def run_in_thread(fn, *args):
+    """Выполняет блокирующий I/O (сеть, диск) в пуле потоков"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_thread_pool(), fn, *args)
+
+
+class EndpointLimiter:
+    """
+    Ограничение параллелизма эндпоинта с очередью ограниченной длины:
+    если все слоты заняты и очередь заполнена - сразу 429
+    """
+
+    def __init__(self, name, concurrency, queue):
+        self.name = name
+        self.concurrency = concurrency
+        self.max_queue = queue
+        self.waiting = 0
+        self.active = 0
+        self.rejected = 0
+        self._semaphore = asyncio.Semaphore(concurrency)
+
+    @asynccontextmanager
+    async def slot(self):
+        if self._semaphore.locked() and self.waiting >= self.max_queue:
+            self.rejected += 1
+            raise HTTPException(
+                429,
+                f"Слишком много запросов к {self.name}, повторите позже",
+                headers={"Retry-After": "1"},
+            )
+
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._semaphore.release()
+
+    def info(self):
+        return {
+            "concurrency": self.concurrency,
+            "queue": self.max_queue,
+            "active": self.active,
+            "waiting": self.waiting,
+            "rejected": self.rejected,
+        }
+
+
+limiters = {name: EndpointLimiter(name, **limits) for name, limits in ENDPOINT_LIMITS.items()}
+
+
+def endpoint_slot(name):
+    return limiters[name].slot()
+
+
+def executor_info():
+    return {
+        "cv_workers": CV_WORKERS,
+        "io_workers": IO_WORKERS,
+        "cv_pending": _pending,
+        "cv_max_pending": CV_MAX_PENDING,
+        "job_workers": SKATING_JOB_WORKERS,
+        "endpoints": {name: limiter.info() for name, limiter in limiters.items()},
+    }
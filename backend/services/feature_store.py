@@ -0,0 +1,207 @@
+# backend/services/feature_store.py
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from backend.config import COVER_FEATURES_FILE
+
+logger = logging.getLogger(__name__)
+
+# Статус обложки: нет файла / заглушка "Обложка скоро появится" / обычная
+STATUS_MISSING = "missing"
+STATUS_PLACEHOLDER = "placeholder"
+STATUS_NORMAL = "normal"
+
+DESIGN_LABELS = ["минималистичная", "сбалансированная", "перегруженная"]
+
+NUMERIC_COLUMNS = [
+    "text_density", "edge_density", "negative_space", "complexity",
+    "color_contrast", "warm_cold_balance",
+]
+TEXT_COLUMNS = ["title", "genre", "status", "design", "face_position"]
+
+# По каким колонкам можно группировать в /api/genre-stats
+GROUP_COLUMNS = ["genre", "design", "face", "status"]
+
+MONOCHROME_CONTRAST = 20
+CONTRAST_BINS = 20
+
+
+def features_frame(records):
+    """
+    Колоночная таблица признаков по списку (row, analysis);
+    analysis = None для отсутствующих/нечитаемых обложек
+    """
+    n = len(records)
+    columns = {
+        "id": np.full(n, -1, dtype=np.int64),
+        "face": np.zeros(n, dtype=bool),
+        **{name: np.full(n, np.nan, dtype=np.float32) for name in NUMERIC_COLUMNS},
+        **{name: [""] * n for name in TEXT_COLUMNS},
+    }
+
+    for i, (row, analysis) in enumerate(records):
+        book_id = row.get("id")
+        if book_id is not None and not pd.isna(book_id):
+            columns["id"][i] = int(book_id)
+        columns["title"][i] = str(row.get("title", "Unknown"))
+        columns["genre"][i] = str(row.get("genre", "Unknown"))
+
+        if analysis is None:
+            columns["status"][i] = STATUS_MISSING
+            continue
+
+        columns["status"][i] = STATUS_PLACEHOLDER if analysis.get("type") == "placeholder" else STATUS_NORMAL
+        columns["design"][i] = analysis["design"]
+        columns["face_position"][i] = analysis["face_position"]
+        columns["face"][i] = bool(analysis["face"])
+        for name in NUMERIC_COLUMNS:
+            columns[name][i] = analysis[name]
+
+    return pd.DataFrame(columns)
+
+
+def save_features(df, path=COVER_FEATURES_FILE):
+    """Сохраняет таблицу в .npz: по массиву на колонку, строки - без pickle"""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    arrays = {}
+    for name in df.columns:
+        values = df[name].to_numpy()
+        arrays[name] = values.astype(str) if name in TEXT_COLUMNS else values
+
+    tmp_path = path + ".tmp.npz"
+    np.savez(tmp_path, **arrays)
+    os.replace(tmp_path, path)
+
+
+def load_features(path=COVER_FEATURES_FILE):
+    """Таблица признаков или None, если она еще не построена"""
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path, allow_pickle=False) as data:
+            df = pd.DataFrame({name: data[name] for name in data.files})
+    except Exception as e:
+        logger.error(f"Ошибка загрузки таблицы признаков обложек: {e}")
+        return None
+
+    for name in ("genre", "status", "design", "face_position"):
+        df[name] = df[name].astype("category")
+    return df
+
+
+def filter_features(df, genre=None, design=None, face=None):
+    """Отбор обложек; genre/design - значение или список значений"""
+    mask = np.ones(len(df), dtype=bool)
+    if genre:
+        mask &= df["genre"].isin([genre] if isinstance(genre, str) else genre).to_numpy()
+    if design:
+        mask &= df["design"].isin([design] if isinstance(design, str) else design).to_numpy()
+    if face is not None:
+        mask &= (df["face"] == face).to_numpy()
+    return df[mask]
+
+
+def summarize(df, contrast_bins=CONTRAST_BINS):
+    """
+    Сводная статистика: заглушки и отсутствующие обложки считаются вместе,
+    дизайн/лица/цвет - только по обычным обложкам
+    """
+    normal = df[df["status"] == STATUS_NORMAL]
+    design = normal["design"].value_counts()
+    contrast = normal["color_contrast"].to_numpy(dtype=np.float64)
+    warmth = normal["warm_cold_balance"].to_numpy(dtype=np.float64)
+
+    counts, edges = np.histogram(contrast, bins=contrast_bins) if len(contrast) else ([], [])
+
+    return {
+        "total_books": int(len(df)),
+        "placeholders": int(len(df) - len(normal)),
+        "minimalistic": int(design.get("минималистичная", 0)),
+        "overloaded": int(design.get("перегруженная", 0)),
+        "faces": int(normal["face"].sum()),
+        "design_counts": {label: int(design.get(label, 0)) for label in DESIGN_LABELS},
+        "avg_color_contrast": float(contrast.mean()) if len(contrast) else 0,
+        "avg_warm_cold_balance": float(warmth.mean()) if len(warmth) else 0,
+        "monochrome_percentage": float(100 * (contrast < MONOCHROME_CONTRAST).mean()) if len(contrast) else 0,
+        "warm_count": int((warmth > 0).sum()),
+        "cold_count": int((warmth <= 0).sum()),
+        "contrast_histogram": {
+            "counts": [int(c) for c in counts],
+            "edges": [round(float(e), 2) for e in edges],
+        },
+    }
+
+
+def group_stats(df, by="genre"):
+    """Разбивка по группам (доли лиц, минималистичных/перегруженных, средние)"""
+    if by not in GROUP_COLUMNS:
+        raise ValueError(f"Группировка по {by} не поддерживается, доступно: {', '.join(GROUP_COLUMNS)}")
+    if df.empty:
+        return {}
+
+    is_normal = df["status"] == STATUS_NORMAL
+    frame = pd.DataFrame({
+        "key": df[by].astype(str),
+        "normal": is_normal,
+        "faces": df["face"] & is_normal,
+        "minimalistic": (df["design"] == "минималистичная") & is_normal,
+        "overloaded": (df["design"] == "перегруженная") & is_normal,
+        # NaN у заглушек и отсутствующих обложек в mean не учитываются
+        "complexity": df["complexity"].astype(np.float64).where(is_normal),
+        "color_contrast": df["color_contrast"].astype(np.float64).where(is_normal),
+        "warm_cold_balance": df["warm_cold_balance"].astype(np.float64).where(is_normal),
+    })
+    grouped = frame.groupby("key", sort=True).agg(
+        total_books=("normal", "size"),
+        analyzed=("normal", "sum"),
+        books_with_faces=("faces", "sum"),
+        minimalistic_books=("minimalistic", "sum"),
+        overloaded_books=("overloaded", "sum"),
+        avg_complexity=("complexity", "mean"),
+        avg_color_contrast=("color_contrast", "mean"),
+        avg_warm_cold_balance=("warm_cold_balance", "mean"),
+    )
+
+    analyzed = grouped["analyzed"].where(grouped["analyzed"] > 0)
+    grouped["placeholders"] = grouped["total_books"] - grouped["analyzed"]
+    grouped["face_percentage"] = (100 * grouped["books_with_faces"] / analyzed).round(1)
+    grouped["minimalistic_percentage"] = (100 * grouped["minimalistic_books"] / analyzed).round(1)
+    grouped["overloaded_percentage"] = (100 * grouped["overloaded_books"] / analyzed).round(1)
+    grouped["avg_complexity"] = grouped["avg_complexity"].round(3)
+    grouped["avg_color_contrast"] = grouped["avg_color_contrast"].round(2)
+    grouped["avg_warm_cold_balance"] = grouped["avg_warm_cold_balance"].round(2)
+
+    grouped = grouped.astype(object).where(grouped.notna(), None)
+    return {
+        key: {name: (value.item() if hasattr(value, "item") else value) for name, value in row.items()}
+        for key, row in grouped.to_dict("index").items()
+    }
+
+
+_features = None
+_features_mtime = None
+
+
+def get_features():
+    """Таблица признаков, загруженная при первом обращении; перечитывается после пересчета статистики"""
+    global _features, _features_mtime
+    mtime = os.path.getmtime(COVER_FEATURES_FILE) if os.path.exists(COVER_FEATURES_FILE) else None
+    if _features is None or mtime != _features_mtime:
+        _features = load_features()
+        _features_mtime = mtime
+    return _features
+
+
+def query_stats(genre=None, design=None, face=None, group_by=None):
+    """Статистика по отобранным обложкам с необязательной разбивкой по группам"""
+    df = get_features()
+    if df is None:
+        return None
+    selected = filter_features(df, genre=genre, design=design, face=face)
+    stats = summarize(selected)
+    if group_by:
+        stats["groups"] = group_stats(selected, by=group_by)
+    return stats
@@ -0,0 +1,36 @@
+# backend/services/image_io.py
+import base64
+import logging
+import os
+from io import BytesIO
+
+import cv2
+import numpy as np
+import requests
+from PIL import Image
+
+
+def read_image_from_bytes(data):
+    img = Image.open(BytesIO(data)).convert("RGB")
+    return cv2.cvtColor(np.array(img), cv2.COLOR_RGB2BGR)
+
+
+def img_to_base64(img):
+    _, buf = cv2.imencode(".png", img)
+    return base64.b64encode(buf).decode("utf-8")
+
+
+def load_image_from_local(path):
+    if not os.path.exists(path):
+        return None
+    return cv2.imread(path)
+
+
+def load_image_from_url(url: str):
+    try:
+        r = requests.get(url, timeout=10)
+        r.raise_for_status()
+        return read_image_from_bytes(r.content)
+    except Exception as e:
+        logging.error(f"Ошибка загрузки изображения по URL: {e}")
+        return None
@@ -0,0 +1,265 @@
+# backend/services/similarity_engine.py
+import logging
+import os
+
+import cv2
+import numpy as np
+
+from backend.config import BOOKS_CSV
+from backend.services.descriptor_index import DescriptorIndex, get_descriptor_index
+from backend.services.similarity_service import compare_orb
+
+logger = logging.getLogger(__name__)
+
+VOCABULARY_FILE = "vocabulary.npy"
+POSTINGS_FILE = "postings.npz"
+
+
+def assign_words(descriptors, vocabulary):
+    """Номер ближайшего визуального слова (по Хэммингу) для каждого дескриптора"""
+    if descriptors is None or len(descriptors) == 0:
+        return np.empty(0, dtype=np.int32)
+    matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+    matches = matcher.match(np.ascontiguousarray(descriptors), vocabulary)
+    words = np.empty(len(descriptors), dtype=np.int32)
+    for m in matches:
+        words[m.queryIdx] = m.trainIdx
+    return words
+
+
+def train_vocabulary(descriptors, n_words=1024, iterations=10, sample_size=100000, seed=42):
+    """
+    Словарь визуальных слов для бинарных дескрипторов (k-majority):
+    кластеризация по Хэммингу, центр кластера - побитовое большинство.
+    Для пустого каталога - None
+    """
+    if len(descriptors) == 0:
+        return None
+    rng = np.random.default_rng(seed)
+    if len(descriptors) > sample_size:
+        descriptors = descriptors[rng.choice(len(descriptors), sample_size, replace=False)]
+    descriptors = np.ascontiguousarray(descriptors, dtype=np.uint8)
+    n_words = min(n_words, len(descriptors))
+
+    vocabulary = descriptors[rng.choice(len(descriptors), n_words, replace=False)].copy()
+    bits = np.unpackbits(descriptors, axis=1)
+
+    for _ in range(iterations):
+        words = assign_words(descriptors, vocabulary)
+        counts = np.bincount(words, minlength=n_words)
+        sums = np.stack([
+            np.bincount(words, weights=bits[:, b], minlength=n_words)
+            for b in range(bits.shape[1])
+        ], axis=1)
+
+        non_empty = counts > 0
+        majority = sums[non_empty] * 2 >= counts[non_empty, None]
+        vocabulary[non_empty] = np.packbits(majority.astype(np.uint8), axis=1)
+        # Пустые кластеры переинициализируем случайными дескрипторами
+        empty = np.flatnonzero(~non_empty)
+        if len(empty):
+            vocabulary[empty] = descriptors[rng.choice(len(descriptors), len(empty), replace=False)]
+
+    return vocabulary
+
+
+class SimilarityEngine:
+    """
+    Поиск похожих обложек: мешок визуальных слов поверх ORB с tf-idf весами,
+    инвертированный индекс слово -> обложки и точное ORB-сравнение только
+    для короткого списка кандидатов
+    """
+
+    def __init__(self, index, vocabulary=None, postings=None):
+        self.index = index
+        self.vocabulary = vocabulary
+        self.idf = None
+        self.postings_ptr = None
+        self.postings_images = None
+        self.postings_weights = None
+        self.loaded_mtimes = None
+        if postings is not None:
+            self.idf = postings["idf"]
+            self.postings_ptr = postings["ptr"]
+            self.postings_images = postings["images"]
+            self.postings_weights = postings["weights"]
+
+    @property
+    def is_ready(self):
+        return self.vocabulary is not None and self.postings_ptr is not None
+
+    @staticmethod
+    def _file_mtimes(index_dir):
+        """mtime словаря и инвертированного индекса (None - файла нет)"""
+        mtimes = []
+        for name in (VOCABULARY_FILE, POSTINGS_FILE):
+            path = os.path.join(index_dir, name)
+            mtimes.append(os.path.getmtime(path) if os.path.exists(path) else None)
+        return tuple(mtimes)
+
+    @classmethod
+    def load(cls, index):
+        vocabulary_path = os.path.join(index.index_dir, VOCABULARY_FILE)
+        postings_path = os.path.join(index.index_dir, POSTINGS_FILE)
+        # mtime до чтения: если файлы перепишут во время загрузки, is_outdated это заметит
+        mtimes = cls._file_mtimes(index.index_dir)
+        engine = cls(index)
+        if os.path.exists(vocabulary_path):
+            try:
+                vocabulary = np.load(vocabulary_path)
+                if not os.path.exists(postings_path):
+                    engine = cls(index, vocabulary)
+                else:
+                    postings = dict(np.load(postings_path))
+                    if int(postings["n_images"]) != len(index):
+                        logger.warning("Инвертированный индекс не соответствует индексу дескрипторов")
+                        engine = cls(index, vocabulary)
+                    else:
+                        engine = cls(index, vocabulary, postings)
+            except Exception as e:
+                logger.error(f"Ошибка загрузки инвертированного индекса: {e}")
+        engine.loaded_mtimes = mtimes
+        return engine
+
+    def is_outdated(self):
+        """True, если словарь или инвертированный индекс перезаписаны после загрузки"""
+        return self._file_mtimes(self.index.index_dir) != self.loaded_mtimes
+
+    def build(self, n_words=1024, retrain=False, max_df_ratio=0.5):
+        """Строит tf-idf векторы обложек и инвертированный индекс (CSR по словам)"""
+        if self.vocabulary is None or retrain:
+            self.vocabulary = train_vocabulary(np.asarray(self.index.descriptors), n_words=n_words)
+        if self.vocabulary is None:
+            # Пустой каталог - словарь не из чего строить, поиск остается полным перебором
+            logger.warning("Нет дескрипторов для словаря визуальных слов")
+            self.idf = self.postings_ptr = self.postings_images = self.postings_weights = None
+            return self
+        n_words = len(self.vocabulary)
+        n_images = len(self.index)
+
+        image_words = []
+        image_counts = []
+        for position in range(n_images):
+            words = assign_words(self.index.get_descriptors(position), self.vocabulary)
+            unique, counts = np.unique(words, return_counts=True)
+            image_words.append(unique.astype(np.int32))
+            image_counts.append(counts.astype(np.float32))
+
+        all_words = np.concatenate(image_words) if image_words else np.empty(0, dtype=np.int32)
+        df = np.bincount(all_words, minlength=n_words)
+        self.idf = np.log((n_images + 1) / (df + 1)).astype(np.float32)
+        # Слишком частые слова ("стоп-слова") не несут информации и раздувают списки
+        self.idf[df > max_df_ratio * n_images] = 0.0
+
+        images, weights = [], []
+        for position, (words, counts) in enumerate(zip(image_words, image_counts)):
+            vector = counts * self.idf[words]
+            norm = np.linalg.norm(vector)
+            weights.append(vector / norm if norm > 0 else vector)
+            images.append(np.full(len(words), position, dtype=np.int32))
+
+        weights = np.concatenate(weights) if weights else np.empty(0, dtype=np.float32)
+        images = np.concatenate(images) if images else np.empty(0, dtype=np.int32)
+        keep = weights > 0
+        all_words, images, weights = all_words[keep], images[keep], weights[keep]
+
+        order = np.argsort(all_words, kind="stable")
+        self.postings_images = images[order]
+        self.postings_weights = weights[order].astype(np.float32)
+        self.postings_ptr = np.searchsorted(all_words[order], np.arange(n_words + 1)).astype(np.int64)
+        return self
+
+    def save(self):
+        """
+        Атомарная запись через временные файлы и os.replace; инвертированный
+        индекс пишется последним - по его mtime работающий сервер перечитывает движок
+        """
+        if not self.is_ready:
+            return
+        index_dir = self.index.index_dir
+        os.makedirs(index_dir, exist_ok=True)
+
+        vocabulary_path = os.path.join(index_dir, VOCABULARY_FILE)
+        tmp_vocabulary = vocabulary_path + ".tmp.npy"
+        np.save(tmp_vocabulary, self.vocabulary)
+        os.replace(tmp_vocabulary, vocabulary_path)
+
+        postings_path = os.path.join(index_dir, POSTINGS_FILE)
+        tmp_postings = postings_path + ".tmp.npz"
+        np.savez(
+            tmp_postings,
+            idf=self.idf,
+            ptr=self.postings_ptr,
+            images=self.postings_images,
+            weights=self.postings_weights,
+            n_images=np.int64(len(self.index)),
+        )
+        os.replace(tmp_postings, postings_path)
+        self.loaded_mtimes = self._file_mtimes(index_dir)
+
+    def query_vector(self, descriptors):
+        words = assign_words(descriptors, self.vocabulary)
+        vector = np.bincount(words, minlength=len(self.vocabulary)).astype(np.float32) * self.idf
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm > 0 else vector
+
+    def candidates(self, descriptors, shortlist=50):
+        """Позиции обложек-кандидатов по косинусной близости tf-idf векторов"""
+        vector = self.query_vector(descriptors)
+        scores = np.zeros(len(self.index), dtype=np.float32)
+        for word in np.flatnonzero(vector):
+            start, end = self.postings_ptr[word], self.postings_ptr[word + 1]
+            scores[self.postings_images[start:end]] += vector[word] * self.postings_weights[start:end]
+
+        touched = np.flatnonzero(scores)
+        if len(touched) > shortlist:
+            touched = touched[np.argpartition(-scores[touched], shortlist)[:shortlist]]
+        return touched
+
+    def search(self, descriptors, top_n=5, shortlist=50):
+        """
+        Возвращает [(entry, score), ...], где score - число ORB-совпадений.
+        Без построенного словаря сравнивает со всем каталогом
+        """
+        if descriptors is None or len(self.index) == 0:
+            return []
+
+        if self.is_ready:
+            positions = self.candidates(descriptors, shortlist=max(shortlist, top_n))
+        else:
+            positions = range(len(self.index))
+
+        results = [
+            (self.index.entries[p], compare_orb(descriptors, self.index.get_descriptors(p)))
+            for p in positions
+        ]
+        results.sort(key=lambda r: r[1], reverse=True)
+        return results[:top_n]
+
+
+_engine = None
+
+
+def get_similarity_engine():
+    """
+    Движок поверх текущего индекса дескрипторов; пересоздается после
+    перестроения индекса дескрипторов, словаря или инвертированного индекса
+    """
+    global _engine
+    index = get_descriptor_index()
+    if _engine is None or _engine.index is not index or _engine.is_outdated():
+        _engine = SimilarityEngine.load(index)
+        if not _engine.is_ready:
+            logger.warning("Словарь визуальных слов не построен - поиск полным перебором")
+    return _engine
+
+
+def rebuild_similarity_index(csv_path=BOOKS_CSV, force=False, retrain=False, n_words=1024):
+    """Обновляет дескрипторы каталога и перестраивает инвертированный индекс"""
+    index = DescriptorIndex.load()
+    summary = index.update(csv_path, force=force)
+
+    engine = SimilarityEngine.load(index)
+    engine.build(n_words=n_words, retrain=retrain or force)
+    engine.save()
+    return summary
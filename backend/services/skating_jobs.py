@@ -0,0 +1,220 @@
+# backend/services/skating_jobs.py
+"""
+Фоновые задачи анализа видео фигурного катания.
+
+Задача выполняется в отдельном пуле процессов (executor.get_job_pool).
+Состояние лежит в файлах SKATING_JOBS_DIR/<job_id>/: status.json (этап и
+прогресс по прыжкам - пишет воркер), cancel (флаг отмены - создает сервер),
+result.json. Готовые результаты сохраняются в SKATING_RESULTS_DIR по ключу
+"хеш видео + интервалы + параметры детектора" и выдаются повторно без анализа
+"""
+import hashlib
+import json
+import logging
+import os
+import re
+import shutil
+import time
+import uuid
+
+from backend.config import (
+    SKATING_JOBS_DIR, SKATING_RESULTS_DIR, SKATING_JOB_TTL,
+    SKATER_BACKEND, SKATER_MODEL, SKATER_INPUT_SIZE, SKATER_DETECT_EVERY
+)
+from backend.services.descriptor_index import file_hash
+
+logger = logging.getLogger(__name__)
+
+# Увеличивать при изменении логики анализа прыжков
+SKATING_ANALYSIS_VERSION = 1
+
+QUEUED, RUNNING, DONE, FAILED, CANCELLED = "queued", "running", "done", "failed", "cancelled"
+FINISHED = (DONE, FAILED, CANCELLED)
+
+_futures = {}
+
+
+class JobCancelled(Exception):
+    pass
+
+
+def _job_dir(job_id):
+    return os.path.join(SKATING_JOBS_DIR, job_id)
+
+
+def _is_job_id(job_id):
+    return re.fullmatch(r"[0-9a-f]{32}", job_id or "") is not None
+
+
+def _write_json(path, data):
+    """Атомарная запись: читатель никогда не видит недописанный файл"""
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _update_status(job_id, **fields):
+    path = os.path.join(_job_dir(job_id), "status.json")
+    status = _read_json(path) or {}
+    status.update(fields, updated=time.time())
+    _write_json(path, status)
+    return status
+
+
+def result_key(video_path, jump_intervals):
+    """Ключ сохраненного результата: содержимое видео, интервалы и параметры детектора"""
+    params = {
+        "video": file_hash(video_path),
+        "intervals": jump_intervals,
+        "version": SKATING_ANALYSIS_VERSION,
+        "detector": [SKATER_BACKEND, SKATER_MODEL, SKATER_INPUT_SIZE, SKATER_DETECT_EVERY],
+    }
+    return hashlib.sha1(json.dumps(params, sort_keys=True).encode()).hexdigest()
+
+
+def _result_path(key):
+    return os.path.join(SKATING_RESULTS_DIR, f"{key}.json")
+
+
+def run_skating_job(job_id, video_path, jump_intervals, key):
+    """Выполняется в воркере пула задач; удаляет видео по завершении"""
+    cancel_flag = os.path.join(_job_dir(job_id), "cancel")
+
+    def progress(done, total):
+        _update_status(job_id, jumps_done=done, jumps_total=total)
+        if os.path.exists(cancel_flag):
+            raise JobCancelled()
+
+    try:
+        if os.path.exists(cancel_flag):
+            _update_status(job_id, state=CANCELLED)
+            return
+
+        _update_status(job_id, state=RUNNING, started=time.time())
+        from backend.video.analyze_skating_improved import SkatingAnalyzer
+        result = SkatingAnalyzer().analyze_skating(video_path, jump_intervals=jump_intervals, progress=progress)
+
+        # Отмена посреди анализа: SkatingAnalyzer превращает исключение в success=False
+        if os.path.exists(cancel_flag):
+            _update_status(job_id, state=CANCELLED)
+        elif result.get("success"):
+            os.makedirs(SKATING_RESULTS_DIR, exist_ok=True)
+            _write_json(_result_path(key), result)
+            _write_json(os.path.join(_job_dir(job_id), "result.json"), result)
+            _update_status(job_id, state=DONE, finished=time.time())
+        else:
+            _update_status(job_id, state=FAILED, error=result.get("error"), finished=time.time())
+    except Exception as e:
+        logger.error(f"Задача {job_id}: ошибка анализа: {e}")
+        _update_status(job_id, state=FAILED, error=str(e), finished=time.time())
+    finally:
+        if video_path and os.path.exists(video_path):
+            os.unlink(video_path)
+
+
+def _prune_jobs():
+    """Удаляет завершенные задачи старше SKATING_JOB_TTL"""
+    if not os.path.isdir(SKATING_JOBS_DIR):
+        return
+    now = time.time()
+    for job_id in os.listdir(SKATING_JOBS_DIR):
+        status = _read_json(os.path.join(_job_dir(job_id), "status.json"))
+        if status and status.get("state") in FINISHED and now - status.get("updated", now) > SKATING_JOB_TTL:
+            shutil.rmtree(_job_dir(job_id), ignore_errors=True)
+
+
+def create_job(video_path, jump_intervals):
+    """
+    Регистрирует задачу. Если результат для этого видео и интервалов уже
+    сохранен, задача сразу завершена. Возвращает (job_id, key или None):
+    key - задачу нужно отправить в пул (submit_job)
+    """
+    _prune_jobs()
+    job_id = uuid.uuid4().hex
+    os.makedirs(_job_dir(job_id), exist_ok=True)
+    key = result_key(video_path, jump_intervals)
+
+    status = {
+        "job_id": job_id,
+        "state": QUEUED,
+        "jump_intervals": jump_intervals,
+        "jumps_done": 0,
+        # Без интервалов число прыжков станет известно после автоматического поиска
+        "jumps_total": len(jump_intervals or []),
+        "created": time.time(),
+        "from_storage": False,
+    }
+    stored = _result_path(key)
+    if os.path.exists(stored):
+        shutil.copyfile(stored, os.path.join(_job_dir(job_id), "result.json"))
+        jumps = len(_read_json(stored).get("jump_intervals") or jump_intervals or [])
+        status.update(state=DONE, jumps_done=jumps, jumps_total=jumps, from_storage=True)
+        key = None
+    _write_json(os.path.join(_job_dir(job_id), "status.json"), dict(status, updated=time.time()))
+    return job_id, key
+
+
+def submit_job(pool, job_id, video_path, jump_intervals, key):
+    future = pool.submit(run_skating_job, job_id, video_path, jump_intervals, key)
+    _futures[job_id] = future
+
+    def on_done(f):
+        _futures.pop(job_id, None)
+        if f.cancelled():
+            # Задача снята до запуска: воркер ее не видел, прибираем сами
+            _update_status(job_id, state=CANCELLED)
+            if os.path.exists(video_path):
+                os.unlink(video_path)
+        elif f.exception() is not None:
+            # Воркер аварийно завершился (BrokenProcessPool и т.п.)
+            _update_status(job_id, state=FAILED, error=str(f.exception()))
+            if os.path.exists(video_path):
+                os.unlink(video_path)
+
+    future.add_done_callback(on_done)
+
+
+def get_status(job_id):
+    if not _is_job_id(job_id):
+        return None
+    status = _read_json(os.path.join(_job_dir(job_id), "status.json"))
+    if status is None:
+        return None
+    total = status.get("jumps_total") or 0
+    status["cancel_requested"] = os.path.exists(os.path.join(_job_dir(job_id), "cancel"))
+    status["progress"] = round(status.get("jumps_done", 0) / total, 3) if total else 0.0
+    return status
+
+
+def get_result(job_id):
+    if not _is_job_id(job_id):
+        return None
+    return _read_json(os.path.join(_job_dir(job_id), "result.json"))
+
+
+def cancel_job(job_id):
+    """Отмена: ожидающая задача снимается из очереди, выполняющаяся остановится после текущего прыжка"""
+    status = get_status(job_id)
+    if status is None or status["state"] in FINISHED:
+        return status
+    open(os.path.join(_job_dir(job_id), "cancel"), "w").close()
+    future = _futures.get(job_id)
+    if future is not None:
+        future.cancel()
+    # status.json пишет воркер; сервер только ставит флаг, иначе записи могут затереть друг друга
+    return get_status(job_id)
+
+
+def cancel_all():
+    """При остановке сервера: выполняющиеся задачи завершатся после текущего прыжка"""
+    for job_id in list(_futures):
+        cancel_job(job_id)
@@ -9,6 +9,8 @@ from datetime import datetime
 PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 CACHE_FILE = os.path.join(PROJECT_ROOT, "backend", "data", "stats_cache.json")
 CACHE_DURATION = 360000000  # 1 час в секундах
+# Формат статистики: кеш другого формата пересчитывается
+CACHE_FORMAT = 2
 
 def is_cache_valid():
     """Проверяет, актуален ли кеш"""
@@ -19,6 +21,9 @@ def is_cache_valid():
         with open(CACHE_FILE, 'r', encoding='utf-8') as f:
             cache_data = json.load(f)
         
+        if cache_data.get('format') != CACHE_FORMAT:
+            return False
+
         # Проверяем время создания кеша
         cache_time = datetime.fromisoformat(cache_data['timestamp'])
         current_time = datetime.now()
@@ -45,13 +50,15 @@ def save_stats_to_cache(stats_data):
     """Сохраняет статистику в кеш"""
     cache_data = {
         'timestamp': datetime.now().isoformat(),
+        'format': CACHE_FORMAT,
         'stats': stats_data
     }
     
     os.makedirs(os.path.dirname(CACHE_FILE), exist_ok=True)
     
     with open(CACHE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(cache_data, f, indent=2, ensure_ascii=False)
+        # Компактная запись: по-обложечные данные лежат в таблице признаков, а не здесь
+        json.dump(cache_data, f, ensure_ascii=False, separators=(",", ":"))
 
 def get_cached_stats(csv_path=None, force_refresh=False):
     """
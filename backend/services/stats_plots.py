@@ -0,0 +1,98 @@
+# backend/services/stats_plots.py
+import hashlib
+import json
+import os
+
+from backend.config import STATS_PLOTS_DIR, STATS_PLOTS_KEEP
+
+# Поля статистики, от которых зависит график
+PLOT_FIELDS = [
+    "total_books", "minimalistic", "overloaded", "faces",
+    "avg_color_contrast", "contrast_histogram", "warm_count", "cold_count",
+]
+
+
+def stats_version(stats):
+    """Версия графика: хеш данных, по которым он рисуется (используется как ETag)"""
+    data = {name: stats.get(name) for name in PLOT_FIELDS}
+    return hashlib.sha1(json.dumps(data, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def plot_path(version, output_dir=STATS_PLOTS_DIR):
+    return os.path.join(output_dir, f"stats_{version}.png")
+
+
+def create_statistics_plots(stats_data, plot_path):
+    """Создает графики статистики и сохраняет их"""
+    # matplotlib нужен только здесь: импортируем при первой отрисовке и без GUI
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    os.makedirs(os.path.dirname(plot_path), exist_ok=True)
+
+    # График распределения типов дизайна
+    design_counts = {
+        'Минималистичные': stats_data['minimalistic'],
+        'Сбалансированные': stats_data['total_books'] - stats_data['minimalistic'] - stats_data['overloaded'],
+        'Перегруженные': stats_data['overloaded']
+    }
+
+    fig = plt.figure(figsize=(10, 6))
+    plt.subplot(2, 2, 1)
+    plt.pie(design_counts.values(), labels=design_counts.keys(), autopct='%1.1f%%')
+    plt.title('Распределение типов дизайна')
+
+    # График наличия лиц
+    plt.subplot(2, 2, 2)
+    face_counts = [stats_data['faces'], stats_data['total_books'] - stats_data['faces']]
+    plt.bar(['С лицами', 'Без лиц'], face_counts, color=['lightblue', 'lightcoral'])
+    plt.title('Наличие лиц на обложках')
+
+    # График цветового контраста (гистограмма уже посчитана в summarize)
+    plt.subplot(2, 2, 3)
+    histogram = stats_data['contrast_histogram']
+    if histogram['counts']:
+        edges = histogram['edges']
+        plt.stairs(histogram['counts'], edges, fill=True, alpha=0.7, color='lightgreen')
+        plt.axvline(stats_data['avg_color_contrast'], color='red', linestyle='--', label=f'Среднее: {stats_data["avg_color_contrast"]:.2f}')
+        plt.legend()
+        plt.title('Распределение цветового контраста')
+
+    # График теплоты/холода
+    plt.subplot(2, 2, 4)
+    if stats_data['warm_count'] or stats_data['cold_count']:
+        plt.bar(['Теплые', 'Холодные'], [stats_data['warm_count'], stats_data['cold_count']], color=['orange', 'blue'])
+        plt.title('Баланс теплых/холодных тонов')
+
+    plt.tight_layout()
+    # Пишем во временный файл: параллельный запрос не должен увидеть недописанный PNG
+    tmp_path = plot_path + f".{os.getpid()}.tmp"
+    fig.savefig(tmp_path, format="png")
+    plt.close(fig)
+    os.replace(tmp_path, plot_path)
+
+    return plot_path
+
+
+def _prune(output_dir, keep):
+    """Оставляет keep последних отрисованных версий"""
+    files = [
+        os.path.join(output_dir, name) for name in os.listdir(output_dir)
+        if name.startswith("stats_") and name.endswith(".png")
+    ]
+    files.sort(key=os.path.getmtime, reverse=True)
+    for path in files[keep:]:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+def get_stats_plot(stats, output_dir=STATS_PLOTS_DIR):
+    """Путь к графику для этой версии статистики; рисуется только при отсутствии"""
+    path = plot_path(stats_version(stats), output_dir)
+    if not os.path.exists(path):
+        create_statistics_plots(stats, path)
+        _prune(output_dir, STATS_PLOTS_KEEP)
+    return path
@@ -0,0 +1,62 @@
+# backend/services/thumbnails.py
+import os
+import logging
+
+import cv2
+import pandas as pd
+
+from backend.config import BOOKS_CSV, THUMBNAILS_DIR, THUMBNAIL_MAX_SIDE, THUMBNAIL_QUALITY
+from backend.services.descriptor_index import resolve_path
+
+logger = logging.getLogger(__name__)
+
+
+def thumbnail_path(book_id, thumbnails_dir=THUMBNAILS_DIR):
+    return os.path.join(thumbnails_dir, f"{int(book_id)}.webp")
+
+
+def make_thumbnail(image, max_side=THUMBNAIL_MAX_SIDE):
+    """Уменьшает изображение так, чтобы большая сторона не превышала max_side"""
+    h, w = image.shape[:2]
+    scale = max_side / max(h, w)
+    if scale >= 1:
+        return image
+    return cv2.resize(image, (max(1, int(w * scale)), max(1, int(h * scale))), interpolation=cv2.INTER_AREA)
+
+
+def save_thumbnail(image, book_id, thumbnails_dir=THUMBNAILS_DIR):
+    os.makedirs(thumbnails_dir, exist_ok=True)
+    path = thumbnail_path(book_id, thumbnails_dir)
+    cv2.imwrite(path, make_thumbnail(image), [cv2.IMWRITE_WEBP_QUALITY, THUMBNAIL_QUALITY])
+    return path
+
+
+def ensure_thumbnail(book_id, image_path, thumbnails_dir=THUMBNAILS_DIR, force=False):
+    """Возвращает путь к превью, создавая его, если нет или обложка новее превью"""
+    source = resolve_path(image_path)
+    if not os.path.exists(source):
+        return None
+
+    path = thumbnail_path(book_id, thumbnails_dir)
+    if not force and os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(source):
+        return path
+
+    img = cv2.imread(source)
+    if img is None:
+        return None
+    return save_thumbnail(img, book_id, thumbnails_dir)
+
+
+def build_thumbnails(csv_path=BOOKS_CSV, thumbnails_dir=THUMBNAILS_DIR, force=False):
+    df = pd.read_csv(resolve_path(csv_path))
+    summary = {"ready": 0, "missing": 0}
+
+    for row in df.itertuples():
+        image_path = getattr(row, "image_path", None)
+        if not isinstance(image_path, str):
+            summary["missing"] += 1
+            continue
+        path = ensure_thumbnail(row.id, image_path, thumbnails_dir, force=force)
+        summary["ready" if path else "missing"] += 1
+
+    return summary
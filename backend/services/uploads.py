@@ -0,0 +1,145 @@
+# backend/services/uploads.py
+"""
+Прием видео без промежуточных копий: multipart-тело запроса разбирается
+по мере поступления (request.stream()), файл пишется сразу в UPLOAD_DIR,
+лимит размера проверяется на каждом куске - слишком большое видео
+обрывается на первом лишнем мегабайте, а не после загрузки целиком.
+Обработчик поэтому принимает Request, а не UploadFile/Form: иначе
+Starlette заранее сохранит все тело во временный файл
+"""
+import os
+import tempfile
+from urllib.parse import parse_qsl
+
+from fastapi import HTTPException
+from python_multipart.multipart import MultipartParser, parse_options_header
+
+from backend.config import UPLOAD_DIR, UPLOAD_CHUNK_SIZE, MAX_VIDEO_UPLOAD_BYTES, MAX_FORM_FIELD_BYTES
+from backend.services.executor import run_in_thread
+
+
+def remove_upload(path):
+    if path and os.path.exists(path):
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+
+
+def too_large(max_bytes):
+    return HTTPException(413, f"Файл больше {max_bytes // (1024 * 1024)} МБ")
+
+
+async def _read_urlencoded(request, max_field_bytes):
+    body = bytearray()
+    async for chunk in request.stream():
+        body += chunk
+        if len(body) > max_field_bytes:
+            raise HTTPException(413, "Слишком большие поля формы")
+    return dict(parse_qsl(body.decode("utf-8"), keep_blank_values=True))
+
+
+async def receive_form(request, file_field="file", max_bytes=MAX_VIDEO_UPLOAD_BYTES,
+                       chunk_size=UPLOAD_CHUNK_SIZE, max_field_bytes=MAX_FORM_FIELD_BYTES):
+    """
+    Поля формы и загруженный файл: ({имя: строка}, путь к файлу или None).
+    Файл поля file_field пишется во временный файл UPLOAD_DIR кусками по
+    chunk_size; больше max_bytes - 413, файл удаляется. Остальные поля
+    держатся в памяти, не больше max_field_bytes на поле
+    """
+    content_type, params = parse_options_header(request.headers.get("content-type", ""))
+    if content_type == b"application/x-www-form-urlencoded":
+        return await _read_urlencoded(request, max_field_bytes), None
+    if content_type != b"multipart/form-data" or b"boundary" not in params:
+        raise HTTPException(400, "Ожидается multipart/form-data")
+
+    # Колбэки парсера синхронные - собираем события и обрабатываем их после
+    # каждого куска тела, чтобы запись на диск шла не в цикле событий
+    events = []
+    header = {"field": b"", "value": b""}
+    headers = {}
+
+    def on_header_field(data, start, end):
+        header["field"] += data[start:end]
+
+    def on_header_value(data, start, end):
+        header["value"] += data[start:end]
+
+    def on_header_end():
+        headers[header["field"].lower()] = header["value"]
+        header["field"] = header["value"] = b""
+
+    def on_headers_finished():
+        events.append(("part", dict(headers)))
+        headers.clear()
+
+    def on_part_data(data, start, end):
+        events.append(("data", data[start:end]))
+
+    def on_part_end():
+        events.append(("end", None))
+
+    parser = MultipartParser(params[b"boundary"], {
+        "on_header_field": on_header_field,
+        "on_header_value": on_header_value,
+        "on_header_end": on_header_end,
+        "on_headers_finished": on_headers_finished,
+        "on_part_data": on_part_data,
+        "on_part_end": on_part_end,
+    })
+
+    fields = {}
+    path = out = None
+    name = None
+    value = bytearray()
+    buffer = bytearray()
+    written = 0
+    try:
+        async for chunk in request.stream():
+            parser.write(chunk)
+            for kind, data in events:
+                if kind == "part":
+                    _, options = parse_options_header(data.get(b"content-disposition", b""))
+                    name = options.get(b"name", b"").decode("utf-8", "replace")
+                    filename = options.get(b"filename")
+                    if name == file_field and filename and out is None and path is None:
+                        os.makedirs(UPLOAD_DIR, exist_ok=True)
+                        suffix = os.path.splitext(filename.decode("utf-8", "replace"))[1][:10]
+                        fd, path = tempfile.mkstemp(suffix=suffix, dir=UPLOAD_DIR)
+                        out = os.fdopen(fd, "wb")
+                    value = bytearray()
+                elif kind == "data":
+                    if out is not None:
+                        written += len(data)
+                        if written > max_bytes:
+                            raise too_large(max_bytes)
+                        buffer += data
+                        if len(buffer) >= chunk_size:
+                            await run_in_thread(out.write, bytes(buffer))
+                            buffer.clear()
+                    else:
+                        value += data
+                        if len(value) > max_field_bytes:
+                            raise HTTPException(413, "Слишком большие поля формы")
+                elif kind == "end":
+                    if out is not None:
+                        await run_in_thread(out.write, bytes(buffer))
+                        buffer.clear()
+                        out.close()
+                        out = None
+                    elif name:
+                        fields[name] = value.decode("utf-8", "replace")
+            events.clear()
+        parser.finalize()
+    except BaseException:
+        # В том числе отмена запроса клиентом посреди загрузки
+        if out is not None:
+            out.close()
+        remove_upload(path)
+        raise
+    if out is not None:
+        # Тело оборвалось посреди файла
+        out.close()
+        remove_upload(path)
+        raise HTTPException(400, "Загрузка файла не завершена")
+    return fields, path
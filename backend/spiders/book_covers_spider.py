@@ -2,8 +2,12 @@
 
 import scrapy
 import pandas as pd
+import numpy as np
+import cv2
 import os
 
+from backend.services.thumbnails import save_thumbnail
+
 
 class BookCoversSpider(scrapy.Spider):
     name = "book_covers"
@@ -66,6 +70,11 @@ class BookCoversSpider(scrapy.Spider):
         with open(image_path, "wb") as f:
             f.write(response.body)
 
+        # Превью для выдачи /api/similarity строим сразу из скачанных байтов
+        img = cv2.imdecode(np.frombuffer(response.body, np.uint8), cv2.IMREAD_COLOR)
+        if img is not None:
+            save_thumbnail(img, book_id)
+
         self.rows.append({
             "id": book_id,
             "title": title,
@@ -88,3 +97,11 @@ class BookCoversSpider(scrapy.Spider):
 
         self.logger.info(f"CSV saved: {self.output_csv}")
         self.logger.info(f"Images saved: {len(self.rows)}")
+
+        # Дескрипторы считаются только для новых/изменившихся обложек
+        try:
+            from backend.services.similarity_engine import rebuild_similarity_index
+            summary = rebuild_similarity_index(self.output_csv)
+            self.logger.info(f"ORB index updated: {summary}")
+        except Exception as e:
+            self.logger.warning(f"ORB index update failed: {e}")
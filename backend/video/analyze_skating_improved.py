@@ -2,6 +2,8 @@
 import cv2
 import logging
 from .jump_contrastive import JumpContrastiveAnalyzer 
+from .jumps_improved import ImprovedJumpDetector
+from .shots_improved import ImprovedShotDetector
 
 cv2.setNumThreads(0)
 logging.basicConfig(level=logging.INFO)
@@ -12,10 +14,22 @@ class SkatingAnalyzer:
     def __init__(self):
         self.contrastive = JumpContrastiveAnalyzer()
 
-    def analyze_skating(self, video_path, jump_intervals=None): 
+    def analyze_skating(self, video_path, jump_intervals=None, progress=None): 
+        """
+        Без jump_intervals интервалы находит ImprovedJumpDetector.
+        progress(done, total) вызывается после каждого прыжка (см. skating_jobs)
+        """
         try:
-            if not jump_intervals or len(jump_intervals) == 0:
-                raise ValueError("Не указаны интервалы прыжков. Пример: [[75, 78], [94, 96]]")
+            detected_jumps = []
+            detections = None
+            manual = bool(jump_intervals)
+            if not manual:
+                # Рамки, найденные при поиске, переиспользуются в анализе прыжков
+                detector = ImprovedJumpDetector(self.contrastive.skater_detector)
+                detected_jumps, detections = detector.scan(video_path)
+                if not detected_jumps:
+                    raise ValueError("Прыжки не найдены автоматически - укажите интервалы вручную. Пример: [[75, 78], [94, 96]]")
+                jump_intervals = [[jump["start"], jump["end"]] for jump in detected_jumps]
  
             cap = cv2.VideoCapture(video_path)
             if not cap.isOpened():
@@ -26,18 +40,25 @@ class SkatingAnalyzer:
             duration = frame_count / fps if fps > 0 else 0
             cap.release()
  
-            contrastive_results = self.contrastive.analyze(video_path, jump_intervals, context_window=3.0)
+            contrastive_results = self.contrastive.analyze(
+                video_path, jump_intervals, context_window=3.0, progress=progress, detections=detections
+            )
+            shots_timeline = ImprovedShotDetector().shots_timeline(video_path)
 
             return {
                 "success": True,
                 "video_info": {
                     "fps": round(fps, 2),
                     "duration": round(duration, 2),
-                    "total_frames": frame_count
+                    "total_frames": frame_count,
+                    "shots_detected": len(shots_timeline)
                 },
-                "manual_jump_intervals": jump_intervals,
+                "manual_jump_intervals": jump_intervals if manual else None,
+                "jump_intervals": jump_intervals,
+                "detected_jumps": detected_jumps,
                 "jump_analysis": contrastive_results,   
-                "analysis_method": "contextual_body_only"
+                "shots_timeline": shots_timeline,
+                "analysis_method": "contextual_body_only" if manual else "auto_candidates"
             }
 
         except Exception as e:
@@ -0,0 +1,149 @@
+# backend/video/detector_backends.py
+"""
+Бэкенды детектора людей для SkaterDetector.
+
+Бэкенд получает пачку кадров одинакового размера (уже уменьшенных
+letterbox) и для каждого возвращает массив (N, 6): x1, y1, x2, y2,
+уверенность, класс - в координатах переданного кадра.
+
+    ultralytics - модель YOLO через PyTorch (эталон)
+    onnx        - та же модель, экспортированная в ONNX, через ONNX Runtime
+    onnx-int8   - ONNX с динамическим квантованием весов в INT8
+"""
+import logging
+import os
+
+import cv2
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Пороги как у ultralytics по умолчанию - для совпадения результатов
+CONF_THRESHOLD = 0.25
+IOU_THRESHOLD = 0.7
+MAX_DETECTIONS = 300
+
+
+class UltralyticsBackend:
+    name = "ultralytics"
+
+    def __init__(self, model_path):
+        # ultralytics/torch импортируются долго - только когда бэкенд действительно нужен
+        import torch
+        from ultralytics import YOLO
+
+        self.model = YOLO(model_path)
+        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        self.model.to(self.device)
+
+    def detect(self, images, input_size):
+        results = self.model(list(images), imgsz=input_size, verbose=False)
+        detections = []
+        for result in results:
+            boxes = result.boxes
+            if boxes is None or len(boxes) == 0:
+                detections.append(np.empty((0, 6), dtype=np.float32))
+                continue
+            detections.append(np.column_stack([
+                boxes.xyxy.cpu().numpy(),
+                boxes.conf.cpu().numpy(),
+                boxes.cls.cpu().numpy(),
+            ]).astype(np.float32))
+        return detections
+
+
+class OnnxBackend:
+    name = "onnx"
+    device = "cpu"
+
+    def __init__(self, onnx_path):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        self.onnx_path = onnx_path
+
+    @classmethod
+    def from_model(cls, model_path, output_dir, quantize=False):
+        """Экспортирует модель в ONNX при первом использовании и открывает сессию"""
+        onnx_path = export_onnx(model_path, output_dir, quantize=quantize)
+        backend = cls(onnx_path)
+        backend.name = "onnx-int8" if quantize else "onnx"
+        return backend
+
+    def detect(self, images, input_size):
+        # BGR uint8 (B, H, W, 3) -> RGB float32 (B, 3, H, W) в [0, 1], как в ultralytics
+        batch = np.stack(images)[..., ::-1].transpose(0, 3, 1, 2)
+        batch = np.ascontiguousarray(batch, dtype=np.float32) / 255.0
+        output = self.session.run(None, {self.input_name: batch})[0]  # (B, 4 + классы, N)
+        return [self._postprocess(prediction) for prediction in output]
+
+    @staticmethod
+    def _postprocess(prediction):
+        """(4 + классы, N) -> (M, 6) после порога уверенности и NMS по классам"""
+        prediction = prediction.T
+        scores = prediction[:, 4:]
+        cls = scores.argmax(axis=1)
+        conf = scores[np.arange(len(cls)), cls]
+        keep = conf > CONF_THRESHOLD
+        if not keep.any():
+            return np.empty((0, 6), dtype=np.float32)
+
+        cx, cy, w, h = prediction[keep, :4].T
+        cls, conf = cls[keep], conf[keep]
+        xyxy = np.stack([cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2], axis=1)
+
+        # NMS отдельно по классам, как в ultralytics (сдвиг рамок на номер класса)
+        offset = cls[:, None] * 7680.0
+        shifted = xyxy + offset
+        rects = np.column_stack([shifted[:, :2], shifted[:, 2:] - shifted[:, :2]])
+        indices = cv2.dnn.NMSBoxes(rects.tolist(), conf.tolist(), CONF_THRESHOLD, IOU_THRESHOLD)
+        indices = np.array(indices, dtype=int).reshape(-1)[:MAX_DETECTIONS]
+
+        return np.column_stack([xyxy[indices], conf[indices], cls[indices]]).astype(np.float32)
+
+
+def export_onnx(model_path, output_dir, quantize=False):
+    """
+    Путь к ONNX-версии модели; экспорт (и квантование) выполняются один раз,
+    дальше используется файл из output_dir
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    base = os.path.splitext(os.path.basename(model_path))[0]
+    onnx_path = os.path.join(output_dir, f"{base}.onnx")
+
+    if not os.path.exists(onnx_path):
+        from ultralytics import YOLO
+        logger.info(f"Экспорт {model_path} в ONNX...")
+        # dynamic: произвольные размер пачки и размер кадра после letterbox
+        exported = YOLO(model_path).export(format="onnx", dynamic=True)
+        os.replace(exported, onnx_path)
+
+    if not quantize:
+        return onnx_path
+
+    int8_path = os.path.join(output_dir, f"{base}.int8.onnx")
+    if not os.path.exists(int8_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+        logger.info(f"Квантование {onnx_path} в INT8...")
+        quantize_dynamic(onnx_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+DETECTOR_BACKENDS = ["ultralytics", "onnx", "onnx-int8"]
+
+
+def create_backend(name, model_path, onnx_dir):
+    """Бэкенд по имени; если ONNX недоступен - ultralytics"""
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"Неизвестный бэкенд детектора: {name}. Доступны: {', '.join(DETECTOR_BACKENDS)}")
+
+    if name in ("onnx", "onnx-int8"):
+        try:
+            return OnnxBackend.from_model(model_path, onnx_dir, quantize=name == "onnx-int8")
+        except Exception as e:
+            logger.warning(f"Бэкенд {name} недоступен ({e}) - используем ultralytics")
+
+    return UltralyticsBackend(model_path)
@@ -0,0 +1,89 @@
+# backend/video/frame_planner.py
+import cv2
+import numpy as np
+
+
+class FramePlanner:
+    """
+    Чтение нескольких временных окон видео за один проход.
+
+    Окна (например, [до прыжка, прыжок, после] для всех прыжков) переводятся
+    в диапазоны номеров кадров, пересекающиеся и смежные объединяются в
+    отсортированные отрезки. Каждый отрезок декодируется один раз в
+    непрерывный массив, окна получают view на него без копирования.
+    Видео читается только вперед: короткие промежутки пропускаются grab(),
+    длинные - перемоткой. Отрезок не растет больше max_span_frames кадров
+    (память под массив): цепочка часто идущих прыжков делится на несколько
+    отрезков, общие кадры на стыке декодируются повторно
+    """
+
+    def __init__(self, video_path, seek_gap=None, max_span_frames=1200):
+        self.video_path = video_path
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("Не удалось открыть видео")
+        self.fps = cap.get(cv2.CAP_PROP_FPS) or 25
+        self.frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        cap.release()
+        # Перемотка дешевле последовательного grab() примерно после пары секунд
+        self.seek_gap = seek_gap if seek_gap is not None else int(2 * self.fps)
+        self.max_span_frames = max_span_frames
+        self.windows = []
+
+    def add(self, key, start_sec, end_sec, max_frames=120):
+        """Окно [start_sec, end_sec), не длиннее max_frames кадров"""
+        start = max(0, int(round(start_sec * self.fps)))
+        stop = min(int(round(end_sec * self.fps)), start + max_frames)
+        if self.frame_count > 0:
+            stop = min(stop, self.frame_count)
+        self.windows.append((key, start, max(start, stop)))
+
+    def spans(self):
+        """Объединенные отрезки: [(start, stop, [(key, start, stop), ...]), ...]"""
+        spans = []
+        for window in sorted(self.windows, key=lambda w: (w[1], w[2])):
+            _, start, stop = window
+            if spans and start <= spans[-1][1] and max(spans[-1][1], stop) - spans[-1][0] <= self.max_span_frames:
+                spans[-1][1] = max(spans[-1][1], stop)
+                spans[-1][2].append(window)
+            else:
+                spans.append([start, stop, [window]])
+        return [(start, stop, windows) for start, stop, windows in spans]
+
+    def read(self):
+        """
+        Генератор по отрезкам: {key: (кадры, номера кадров)} для окон отрезка.
+        Кадры - view на общий массив отрезка; он освобождается, когда окна
+        отрезка больше не нужны вызывающему коду
+        """
+        cap = cv2.VideoCapture(self.video_path)
+        position = 0
+        try:
+            for span_start, span_stop, windows in self.spans():
+                if span_start < position or span_start - position > self.seek_gap:
+                    cap.set(cv2.CAP_PROP_POS_FRAMES, span_start)
+                    position = span_start
+                while position < span_start and cap.grab():
+                    position += 1
+
+                buffer = None
+                count = 0
+                for i in range(span_stop - span_start):
+                    ret, frame = cap.read()
+                    if not ret:
+                        break
+                    if buffer is None:
+                        buffer = np.empty((span_stop - span_start,) + frame.shape, dtype=frame.dtype)
+                    buffer[i] = frame
+                    count += 1
+                position += count
+
+                result = {}
+                for key, start, stop in windows:
+                    a = min(start - span_start, count)
+                    b = min(stop - span_start, count)
+                    frames = buffer[a:b] if buffer is not None else np.empty((0,), dtype=np.uint8)
+                    result[key] = (frames, np.arange(span_start + a, span_start + b))
+                yield result
+        finally:
+            cap.release()
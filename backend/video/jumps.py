@@ -1,39 +1,32 @@
 # backend/video/jumps.py 
-import cv2
-import numpy as np
+from .motion import create_motion_estimator
 
-def detect_jumps(frames, fps, motion_threshold=1.2, min_jump_duration=0.3): 
+def detect_jumps(frames, fps, motion_threshold=1.2, min_jump_duration=0.3, motion="farneback", stride=1,
+                 bboxes=None):
+    """
+    motion - оценщик движения (см. backend.video.motion) или его имя,
+    stride - сравнивать кадры через stride (смещение делится на stride),
+    bboxes - рамки фигуриста по кадрам (движение усредняется внутри рамки)
+    """
     if len(frames) < 10:  
         return []
 
     jumps = []
     jump_candidates = []
-     
-    processed_frames = []
-    for frame in frames: 
-        small_frame = cv2.resize(frame, (480, 270))  
-        gray = cv2.cvtColor(small_frame, cv2.COLOR_BGR2GRAY) 
-        gray = cv2.GaussianBlur(gray, (5, 5), 0)
-        processed_frames.append(gray)
- 
-    for i in range(1, len(processed_frames)):
-        prev_gray = processed_frames[i-1]
-        curr_gray = processed_frames[i]
-        
-        flow = cv2.calcOpticalFlowFarneback(
-            prev_gray, curr_gray,
-            None, 
-            pyr_scale=0.5, 
-            levels=3, 
-            winsize=15, 
-            iterations=3, 
-            poly_n=5, 
-            poly_sigma=1.2, 
-            flags=0
-        )
-         
-        mean_horizontal = np.mean(flow[..., 0])
-        mean_vertical = np.mean(flow[..., 1])
+    estimator = create_motion_estimator(motion) if isinstance(motion, str) else motion
+
+    prev_gray = None
+    for i in range(0, len(frames), stride):
+        curr_gray = estimator.prepare(frames[i])
+        if prev_gray is None:
+            prev_gray = curr_gray
+            continue
+
+        # Поток считается в координатах предыдущего кадра - и рамка его
+        bbox = bboxes[i - stride] if bboxes is not None else None
+        mean_horizontal, mean_vertical = estimator.estimate(prev_gray, curr_gray, bbox)
+        mean_vertical /= stride
+        prev_gray = curr_gray
          
         is_upward_motion = mean_vertical < -motion_threshold
         is_significant_motion = abs(mean_vertical) > motion_threshold * 0.7
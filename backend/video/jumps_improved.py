@@ -1,106 +1,238 @@
-# # backend/video/jumps_improved.py
-# import cv2
-# import numpy as np
-# from .skater_detector import SkaterDetector
- 
-
-# class ImprovedJumpDetector:
-#     def __init__(self):
-#         self.skater_detector = SkaterDetector()
-        
-#     def detect_jumps_by_height(self, frames, fps, height_threshold=0.15):
-#         """Исправленная детекция прыжков по изменению высоты фигуриста"""
-#         if len(frames) < 10:
-#             return []
-        
-#         heights = self.skater_detector.track_skater_height(frames)
-        
-#         if len(heights) < 10:
-#             return []
-        
-#         heights = np.array(heights, dtype=np.float32)
-#         valid_heights = heights[heights > 0]
-        
-#         if len(valid_heights) == 0:
-#             return []
-        
-#         base_height = np.median(valid_heights)
-#         jumps = []
-#         in_jump = False
-#         jump_start = 0
-#         min_height_ratio = 1.0  # Отслеживаем минимальную высоту (сжатие)
-#         max_height_ratio = 1.0  # Отслеживаем максимальную высоту (прыжок)
-        
-#         for i in range(len(heights)):
-#             if heights[i] > 0:
-#                 height_ratio = heights[i] / base_height
-                
-#                 # Детекция подготовки к прыжку (сжатие)
-#                 if not in_jump and height_ratio < 0.85:
-#                     in_jump = True
-#                     jump_start = i
-#                     min_height_ratio = height_ratio
-#                     max_height_ratio = height_ratio
-                
-#                 # Во время прыжка
-#                 elif in_jump:
-#                     min_height_ratio = min(min_height_ratio, height_ratio)
-#                     max_height_ratio = max(max_height_ratio, height_ratio)
-                    
-#                     # Конец прыжка - возврат к нормальной высоте
-#                     if height_ratio < 1.1 and i - jump_start > fps * 0.1:
-#                         # Проверяем, был ли это реальный прыжок
-#                         if max_height_ratio > 1.15:  # Фигурист действительно подпрыгнул
-#                             jump_time = jump_start / fps
-#                             jump_duration = (i - jump_start) / fps
-                            
-#                             intensity = max_height_ratio - 1.0  # Интенсивность пропорциональна высоте
-                            
-#                             jumps.append({
-#                                 "time": round(jump_time, 3),
-#                                 "duration": round(jump_duration, 3),
-#                                 "intensity": round(intensity, 3),
-#                                 "height_ratio": round(max_height_ratio, 3),
-#                                 "compression_ratio": round(min_height_ratio, 3)
-#                             })
-                        
-#                         in_jump = False
-        
-#         return jumps
-
-    
-#     def detect_jumps_combined(self, frames, fps):
-#         """
-#         Комбинированный подход: движение + высота
-#         """
-#         # 1. Детекция по оптическому потоку (старый метод)
-#         from .jumps import detect_jumps as detect_by_motion
-#         motion_jumps = detect_by_motion(frames, fps)
-        
-#         # 2. Детекция по высоте (новый метод)
-#         height_jumps = self.detect_jumps_by_height(frames, fps)
-        
-#         # 3. Объединение результатов
-#         all_jumps = []
-#         jump_times = set()
-        
-#         # Добавляем прыжки по движению
-#         for jump in motion_jumps:
-#             all_jumps.append({
-#                 **jump,
-#                 "detection_method": "motion"
-#             })
-#             jump_times.add(round(jump["time"], 1))
-        
-#         # Добавляем прыжки по высоте, если они не дублируются
-#         for jump in height_jumps:
-#             if round(jump["time"], 1) not in jump_times:
-#                 all_jumps.append({
-#                     **jump,
-#                     "detection_method": "height"
-#                 })
-        
-#         # Сортируем по времени
-#         all_jumps.sort(key=lambda x: x["time"])
-        
-#         return all_jumps
+# backend/video/jumps_improved.py
+"""
+Автоматический поиск кандидатов в прыжки - один потоковый проход по видео.
+
+Кадры берутся с шагом stride (по умолчанию sample_fps в секунду, остальные
+только grab(), без преобразования), переводятся в серый, уменьшаются до
+flow_width и сравниваются плотным оценщиком движения из backend.video.motion
+(по умолчанию DIS: на таком размере в ~15 раз быстрее Farneback при той же
+форме сигнала). Фигурист ищется YOLO только на detect_fps кадрах в секунду,
+рамки между ними интерполируются. Сигналы:
+
+    подъем  - вертикальный поток внутри рамки фигуриста относительно фона
+              (камера следит за фигуристом), в высотах рамки в секунду;
+              прыжок - подъем, сразу за ним такой же спуск
+    высота  - отклонение высоты рамки от медианы за последние секунды
+              (группировка в воздухе, толчок и выезд)
+
+Пики суммарной оценки дают интервалы для JumpContrastiveAnalyzer.
+В памяти одновременно только кадры одной пачки YOLO
+"""
+import bisect
+import logging
+import time
+
+import cv2
+import numpy as np
+from scipy.ndimage import median_filter
+
+from backend.config import SKATING_MOTION, SKATING_MOTION_STRIDE
+from backend.video.motion import DenseMotion, create_motion_estimator
+
+logger = logging.getLogger(__name__)
+
+
+def _robust_z(values, floor):
+    """z-оценка по медиане и MAD; floor - минимальный разброс в единицах сигнала"""
+    median = np.nanmedian(values)
+    mad = np.nanmedian(np.abs(values - median)) * 1.4826
+    return (values - median) / max(mad, floor)
+
+
+def _window_means(values, w):
+    """Средние по окну w отсчетов до и после каждого отсчета"""
+    padded = np.concatenate([np.full(w, values[0]), values, np.full(w, values[-1])])
+    csum = np.concatenate([[0.0], np.cumsum(padded)])
+    idx = np.arange(len(values)) + w
+    before = (csum[idx] - csum[idx - w]) / w
+    after = (csum[idx + w] - csum[idx]) / w
+    return before, after
+
+
+def _interpolate_box(a, b, t):
+    return tuple(int(round(x + (y - x) * t)) for x, y in zip(a, b))
+
+
+class ImprovedJumpDetector:
+    def __init__(self, skater_detector=None, sample_fps=10, detect_fps=2, flow_width=160,
+                 min_score=3.0, min_lift=0.3, max_jumps=12, min_gap=2.0, half_width=0.6,
+                 motion=SKATING_MOTION, stride=SKATING_MOTION_STRIDE):
+        # Без детектора подъем считается по движущимся пикселям всего кадра
+        self.skater_detector = skater_detector
+        self.sample_fps = sample_fps
+        self.detect_fps = detect_fps
+        self.flow_width = flow_width
+        # Оценщик движения (имя или объект) - нужен плотный поток: подъем
+        # считается по медиане поля внутри рамки относительно фона
+        self.motion = create_motion_estimator(motion, width=flow_width) if isinstance(motion, str) else motion
+        if not isinstance(self.motion, DenseMotion):
+            raise ValueError(f"Для поиска прыжков нужен плотный оценщик движения, а не {self.motion.name}")
+        # Шаг между кадрами с потоком; 0 или None - из sample_fps
+        self.stride = stride
+        self.min_score = min_score
+        # Подъем и спуск вокруг вершины, высот рамки в секунду
+        self.min_lift = min_lift
+        self.max_jumps = max_jumps
+        self.min_gap = min_gap
+        self.half_width = half_width
+
+    def _read_samples(self, cap, step):
+        """Генератор (номер кадра, кадр) для каждого step-го кадра"""
+        index = 0
+        while True:
+            if index % step == 0:
+                ret, frame = cap.read()
+                if not ret:
+                    return
+                yield index, frame
+            elif not cap.grab():
+                return
+            index += 1
+
+    def _detect(self, batch, detections, detected):
+        """Рамки фигуриста для пачки [(номер кадра, кадр)] -> detections"""
+        if not batch:
+            return
+        found = self.skater_detector.detect_skaters([frame for _, frame in batch])
+        for (index, _), detection in zip(batch, found):
+            detections[index] = detection
+            detected.append(index)
+
+    @staticmethod
+    def _box_at(index, detected, detections):
+        """
+        Исходная рамка фигуриста в кадре index: интерполяция между соседними
+        детекциями; detected - отсортированные номера кадров с детекцией
+        """
+        pos = bisect.bisect_left(detected, index)
+        a = detected[pos - 1] if pos > 0 else None
+        b = detected[pos] if pos < len(detected) else None
+        box_a = detections[a][1] if a is not None else None
+        box_b = detections[b][1] if b is not None else None
+        if box_a and box_b:
+            return box_b if b == index else _interpolate_box(box_a, box_b, (index - a) / (b - a))
+        return box_a or box_b
+
+    def _lift(self, dy, box, scale, rate):
+        """Скорость подъема фигуриста относительно фона, высот рамки в секунду"""
+        background = np.median(dy)
+        if box is not None:
+            x1, y1, x2, y2 = (int(round(v * scale)) for v in box)
+            region = dy[y1:max(y2, y1 + 1), x1:max(x2, x1 + 1)]
+            height = max(y2 - y1, 1)
+        else:
+            # Движущиеся пиксели вместо рамки
+            region = dy[np.abs(dy - background) > 0.5]
+            height = dy.shape[0]
+        if region.size < 4:
+            return 0.0
+        return float(-(np.median(region) - background) / height * rate)
+
+    def scan(self, video_path):
+        """
+        Потоковый проход: (кандидаты в прыжки, детекции YOLO {номер кадра:
+        (bbox с отступом, исходный bbox)}) - детекции можно передать в
+        JumpContrastiveAnalyzer.analyze, чтобы не искать фигуриста повторно
+        """
+        started = time.perf_counter()
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("Не удалось открыть видео")
+        fps = cap.get(cv2.CAP_PROP_FPS) or 25
+        step = self.stride or max(1, int(round(fps / self.sample_fps)))
+        rate = fps / step
+        detect_every = max(1, int(round(rate / self.detect_fps))) if self.skater_detector else 0
+        batch_size = self.skater_detector.batch_size if self.skater_detector else 0
+
+        detections = {}
+        detected = []
+        batch = []
+        pending = []  # (номер кадра, поле вертикального потока) - ждут рамки следующей пачки
+        indices, lifts, heights = [], [], []
+        prev_gray = None
+        scale = None
+        frame_count = 0
+
+        def resolve(until):
+            while pending and (until is None or pending[0][0] <= until):
+                index, dy = pending.pop(0)
+                box = self._box_at(index, detected, detections) if detected else None
+                indices.append(index)
+                lifts.append(self._lift(dy, box, scale, rate))
+                heights.append(box[3] - box[1] if box else np.nan)
+
+        try:
+            for sample, (index, frame) in enumerate(self._read_samples(cap, step)):
+                frame_count = index + 1
+                gray = self.motion.prepare(frame)
+                scale = self.motion.scale
+
+                if prev_gray is not None:
+                    flow = self.motion.flow(prev_gray, gray)
+                    pending.append((index, flow[..., 1].copy()))
+                prev_gray = gray
+
+                if detect_every and sample % detect_every == 0:
+                    batch.append((index, frame))
+                    if len(batch) >= batch_size:
+                        self._detect(batch, detections, detected)
+                        resolve(batch[-1][0])
+                        batch = []
+                elif not detect_every:
+                    resolve(None)
+
+            self._detect(batch, detections, detected)
+            resolve(None)
+        finally:
+            cap.release()
+
+        jumps = self._find_peaks(np.array(indices), np.array(lifts), np.array(heights, dtype=float), fps, rate)
+        elapsed = time.perf_counter() - started
+        duration = frame_count / fps
+        logger.info(
+            f"Поиск прыжков: {duration:.0f} с видео за {elapsed:.1f} с (x{duration / max(elapsed, 1e-6):.1f} к реальному времени), "
+            f"кадров с потоком: {len(indices)}, YOLO: {len(detections)}, кандидатов: {len(jumps)}"
+        )
+        return jumps, detections
+
+    def detect_jumps(self, video_path):
+        return self.scan(video_path)[0]
+
+    def _find_peaks(self, indices, lifts, heights, fps, rate):
+        if len(indices) < 10:
+            return []
+        times = indices / fps
+        w = max(1, int(round(0.3 * rate)))
+
+        # Подъем перед вершиной и спуск после нее
+        before, after = _window_means(lifts, w)
+        swing = before - after
+        score = _robust_z(swing, 0.05)
+
+        has_height = np.isfinite(heights).sum() >= 10
+        if has_height:
+            valid = np.isfinite(heights)
+            filled = np.interp(np.arange(len(heights)), np.flatnonzero(valid), heights[valid])
+            baseline = median_filter(filled, size=max(3, int(10 * rate)), mode="nearest")
+            deviation = np.abs(filled / np.maximum(baseline, 1) - 1)
+            dev_before, dev_after = _window_means(deviation, w)
+            score = score + 0.5 * _robust_z((dev_before + dev_after) / 2, 0.02)
+
+        duration = times[-1]
+        jumps = []
+        for i in np.argsort(-score):
+            if score[i] < self.min_score or len(jumps) >= self.max_jumps:
+                break
+            if swing[i] < self.min_lift or any(abs(times[i] - jump["time"]) < self.min_gap for jump in jumps):
+                continue
+            ratio = filled[i] / max(baseline[i], 1) if has_height else None
+            jumps.append({
+                "time": round(float(times[i]), 2),
+                "start": round(float(max(0.0, times[i] - self.half_width)), 2),
+                "end": round(float(min(duration, times[i] + self.half_width)), 2),
+                "score": round(float(score[i]), 2),
+                "lift": round(float(before[i]), 3),
+                "height_ratio": round(float(ratio), 3) if ratio is not None else None,
+                "detection_method": "flow+height" if has_height else "flow"
+            })
+        return sorted(jumps, key=lambda jump: jump["time"])
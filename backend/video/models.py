@@ -0,0 +1,67 @@
+# backend/video/models.py
+"""
+Реестр моделей процесса: детектор загружается один раз при первом обращении
+(или заранее - preload_models в инициализаторе воркера) и прогревается
+пустым кадром, чтобы первый запрос не платил за инициализацию
+"""
+import logging
+import threading
+import time
+
+import numpy as np
+
+from backend.config import SKATER_BACKEND, SKATER_MODEL, SKATER_INPUT_SIZE, SKATER_ONNX_DIR
+from backend.video.detector_backends import create_backend
+
+logger = logging.getLogger(__name__)
+
+_backends = {}
+_load_times = {}
+_lock = threading.Lock()
+
+
+def _load_backend(name, model_path, input_size):
+    start = time.perf_counter()
+    backend = create_backend(name, model_path, SKATER_ONNX_DIR)
+    loaded = time.perf_counter()
+
+    # Прогрев: первый вызов инициализирует предобработку и ядра
+    backend.detect([np.zeros((input_size, input_size, 3), dtype=np.uint8)], input_size)
+    warmed = time.perf_counter()
+
+    _load_times[f"{backend.name}:{model_path}"] = {
+        "device": backend.device,
+        "load_seconds": round(loaded - start, 3),
+        "warmup_seconds": round(warmed - loaded, 3),
+    }
+    logger.info(
+        f"Детектор {backend.name} ({model_path}) загружен на {backend.device} за {loaded - start:.2f} с, "
+        f"прогрев {warmed - loaded:.2f} с"
+    )
+    return backend
+
+
+def get_detector_backend(name=SKATER_BACKEND, model_path=SKATER_MODEL, input_size=SKATER_INPUT_SIZE):
+    """Бэкенд детектора процесса (загружается и прогревается при первом вызове)"""
+    key = (name, model_path)
+    backend = _backends.get(key)
+    if backend is None:
+        with _lock:
+            backend = _backends.get(key)
+            if backend is None:
+                backend = _load_backend(name, model_path, input_size)
+                _backends[key] = backend
+    return backend
+
+
+def preload_models():
+    """Хук для инициализатора пула процессов: модель готова до первого запроса"""
+    try:
+        get_detector_backend()
+    except Exception as e:
+        # Без модели воркер остается рабочим для остальных задач
+        logger.error(f"Не удалось предзагрузить модель детекции: {e}")
+
+
+def models_info():
+    return {key: dict(info) for key, info in _load_times.items()}
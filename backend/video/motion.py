@@ -0,0 +1,146 @@
+# backend/video/motion.py
+"""
+Оценщики движения между соседними кадрами для поиска прыжков.
+
+Каждый оценщик готовит кадр (prepare) и возвращает среднее смещение
+(dx, dy) между двумя подготовленными кадрами - по всему кадру или внутри
+рамки фигуриста. Смещение всегда в пикселях кадра шириной REFERENCE_WIDTH
+(как у прежнего detect_jumps), поэтому пороги не зависят от оценщика.
+
+    farneback - плотный поток Farneback 480x270, 3 уровня пирамиды (эталон)
+    dis       - плотный поток DIS (пресет ultrafast/fast/medium) на уменьшенном кадре
+    lk        - разреженный Lucas-Kanade по углам внутри рамки фигуриста
+
+Плотные оценщики (DenseMotion) отдают и само поле смещений flow() - его
+использует потоковый поиск прыжков (jumps_improved)
+"""
+from abc import ABC, abstractmethod
+
+import cv2
+import numpy as np
+
+REFERENCE_WIDTH = 480
+
+
+def _scaled_box(bbox, scale, shape):
+    x1, y1, x2, y2 = (int(round(v * scale)) for v in bbox)
+    h, w = shape[:2]
+    x1, x2 = max(0, min(x1, w - 1)), max(0, min(x2, w))
+    y1, y2 = max(0, min(y1, h - 1)), max(0, min(y2, h))
+    return x1, y1, max(x2, x1 + 1), max(y2, y1 + 1)
+
+
+class MotionEstimator(ABC):
+    """
+    Интерфейс оценщика: prepare(кадр) -> подготовленный кадр (scale - его
+    масштаб к исходному), estimate(prev, curr, bbox) -> (dx, dy)
+    """
+    name = None
+
+    def __init__(self, width):
+        self.width = width
+        self.scale = 1.0
+
+    def prepare(self, frame):
+        # Серый до уменьшения - втрое меньше данных для resize
+        h, w = frame.shape[:2]
+        self.scale = self.width / w
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (self.width, int(round(h * self.scale))), interpolation=cv2.INTER_AREA)
+
+    @abstractmethod
+    def estimate(self, prev, curr, bbox=None):
+        """(dx, dy) в пикселях кадра ширины REFERENCE_WIDTH; bbox - в координатах исходного кадра"""
+
+
+class DenseMotion(MotionEstimator):
+    """Плотный поток: поле смещений (H, W, 2) и его среднее по кадру или рамке"""
+
+    @abstractmethod
+    def flow(self, prev, curr):
+        """Поле смещений (H, W, 2) в пикселях подготовленного кадра"""
+
+    def estimate(self, prev, curr, bbox=None):
+        flow = self.flow(prev, curr)
+        if bbox is not None:
+            x1, y1, x2, y2 = _scaled_box(bbox, self.scale, flow.shape)
+            flow = flow[y1:y2, x1:x2]
+        factor = REFERENCE_WIDTH / self.width
+        return float(np.mean(flow[..., 0])) * factor, float(np.mean(flow[..., 1])) * factor
+
+
+class FarnebackMotion(DenseMotion):
+    name = "farneback"
+
+    def __init__(self, width=REFERENCE_WIDTH, levels=3):
+        super().__init__(width)
+        self.levels = levels
+
+    def prepare(self, frame):
+        # Как в прежнем detect_jumps: resize всего кадра и размытие
+        h, w = frame.shape[:2]
+        self.scale = self.width / w
+        small = cv2.resize(frame, (self.width, int(round(h * self.scale))))
+        gray = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+        return cv2.GaussianBlur(gray, (5, 5), 0)
+
+    def flow(self, prev, curr):
+        return cv2.calcOpticalFlowFarneback(prev, curr, None, 0.5, self.levels, 15, 3, 5, 1.2, 0)
+
+
+class DISMotion(DenseMotion):
+    name = "dis"
+
+    PRESETS = {
+        "ultrafast": cv2.DISOPTICAL_FLOW_PRESET_ULTRAFAST,
+        "fast": cv2.DISOPTICAL_FLOW_PRESET_FAST,
+        "medium": cv2.DISOPTICAL_FLOW_PRESET_MEDIUM,
+    }
+
+    def __init__(self, width=320, preset="ultrafast"):
+        super().__init__(width)
+        self.dis = cv2.DISOpticalFlow_create(self.PRESETS[preset])
+
+    def flow(self, prev, curr):
+        return self.dis.calc(prev, curr, None)
+
+
+class LucasKanadeMotion(MotionEstimator):
+    """Разреженный поток: поля смещений нет, только медианный сдвиг углов"""
+    name = "lk"
+
+    def __init__(self, width=REFERENCE_WIDTH, max_corners=60):
+        super().__init__(width)
+        self.max_corners = max_corners
+
+    def estimate(self, prev, curr, bbox=None):
+        # Медианное смещение углов, найденных в рамке (без рамки - по всему кадру)
+        mask = None
+        if bbox is not None:
+            x1, y1, x2, y2 = _scaled_box(bbox, self.scale, prev.shape)
+            mask = np.zeros(prev.shape, dtype=np.uint8)
+            mask[y1:y2, x1:x2] = 255
+        points = cv2.goodFeaturesToTrack(prev, self.max_corners, 0.01, 5, mask=mask)
+        if points is None or len(points) < 3:
+            return 0.0, 0.0
+        moved, status, _ = cv2.calcOpticalFlowPyrLK(prev, curr, points, None, winSize=(15, 15), maxLevel=2)
+        ok = status.reshape(-1) == 1
+        if ok.sum() < 3:
+            return 0.0, 0.0
+        shift = (moved[ok] - points[ok]).reshape(-1, 2)
+        factor = REFERENCE_WIDTH / self.width
+        return float(np.median(shift[:, 0])) * factor, float(np.median(shift[:, 1])) * factor
+
+
+MOTION_ESTIMATORS = {
+    "farneback": FarnebackMotion,
+    "dis": DISMotion,
+    "lk": LucasKanadeMotion,
+}
+
+
+def create_motion_estimator(name="farneback", **options):
+    """Оценщик по имени; options - параметры его конструктора (width, preset, ...)"""
+    if name not in MOTION_ESTIMATORS:
+        raise ValueError(f"Неизвестный оценщик движения: {name}. Доступны: {', '.join(MOTION_ESTIMATORS)}")
+    return MOTION_ESTIMATORS[name](**options)
@@ -0,0 +1,93 @@
+# backend/video/scene_features.py
+"""
+Признаки сцены (яркость, контраст, цветовая энтропия) сразу для пачки кадров.
+
+Кадры куска (chunk_size) переводятся в серый прямо в общий буфер, где у
+каждого кадра есть отраженные строки сверху и снизу: Sobel в float32 и
+величина градиента считаются одним вызовом по всей склеенной пачке, без
+смешивания соседних кадров (граница как у cv2 для отдельного кадра).
+Гистограммы тона собираются в матрицу (N, 256), энтропия всех кадров
+считается в NumPy разом. Кусками - чтобы float32-градиенты не занимали
+гигабайты
+"""
+import cv2
+import numpy as np
+
+HUE_BINS = 256
+
+
+def _as_stack(frames):
+    if isinstance(frames, np.ndarray) and frames.ndim == 4:
+        return frames
+    return np.stack(frames)
+
+
+def _downscale(frames, max_width):
+    n, h, w = frames.shape[:3]
+    if not max_width or w <= max_width:
+        return frames
+    size = (max_width, max(1, int(round(h * max_width / w))))
+    return np.stack([cv2.resize(frame, size, interpolation=cv2.INTER_AREA) for frame in frames])
+
+
+def _padded_gray(frames):
+    """(N, H + 2, W) uint8: серые кадры с отраженными крайними строками"""
+    n, h, w = frames.shape[:3]
+    padded = np.empty((n, h + 2, w), dtype=np.uint8)
+    for k in range(n):
+        cv2.cvtColor(frames[k], cv2.COLOR_BGR2GRAY, dst=padded[k, 1:-1])
+    # BORDER_REFLECT_101, как у cv2.Sobel по отдельному кадру
+    padded[:, 0] = padded[:, 2]
+    padded[:, -1] = padded[:, -3]
+    return padded
+
+
+def _edges(padded):
+    """Средняя величина градиента Sobel 3x3 по каждому кадру"""
+    n, h, w = padded.shape
+    tall = padded.reshape(n * h, w)
+    sobel_x = cv2.Sobel(tall, cv2.CV_32F, 1, 0, ksize=3)
+    sobel_y = cv2.Sobel(tall, cv2.CV_32F, 0, 1, ksize=3)
+    magnitude = cv2.magnitude(sobel_x, sobel_y).reshape(n, h, w)
+    return np.array([cv2.mean(magnitude[k, 1:-1])[0] for k in range(n)])
+
+
+def _hue_histograms(frames):
+    hist = np.empty((len(frames), HUE_BINS), dtype=np.float64)
+    for k, frame in enumerate(frames):
+        hsv = cv2.cvtColor(frame, cv2.COLOR_BGR2HSV)
+        hist[k] = cv2.calcHist([hsv], [0], None, [HUE_BINS], [0, HUE_BINS])[:, 0]
+    return hist
+
+
+def _entropy(hist):
+    """Энтропия каждой строки (N, bins), как scipy.stats.entropy(hist / sum + 1e-10)"""
+    p = hist / hist.sum(axis=1, keepdims=True) + 1e-10
+    p /= p.sum(axis=1, keepdims=True)
+    return -(p * np.log(p)).sum(axis=1)
+
+
+def extract_scene_features(frames, max_width=None, chunk_size=32):
+    """
+    frames - (N, H, W, 3) BGR или список кадров одного размера.
+    max_width - уменьшить кадры до этой ширины перед расчетом (быстрее;
+    контраст зависит от масштаба, поэтому сравнивать окна нужно при одном
+    и том же max_width)
+    """
+    if len(frames) == 0:
+        return {"brightness": [], "edges": [], "color_entropy": []}
+
+    frames = _as_stack(frames)
+    brightness, edges, color_entropy = [], [], []
+    for i in range(0, len(frames), chunk_size):
+        chunk = np.ascontiguousarray(_downscale(frames[i:i + chunk_size], max_width))
+        padded = _padded_gray(chunk)
+        brightness.append([cv2.mean(gray[1:-1])[0] for gray in padded])
+        edges.append(_edges(padded))
+        color_entropy.append(_entropy(_hue_histograms(chunk)))
+
+    return {
+        "brightness": np.concatenate(brightness),
+        "edges": np.concatenate(edges),
+        "color_entropy": np.concatenate(color_entropy)
+    }
@@ -1,80 +1,175 @@
-# # backend/video/shots_improved.py
-# import cv2
-# import numpy as np
-# from .skater_detector import SkaterDetector
-
-# class ImprovedShotDetector:
-#     def __init__(self):
-#         self.skater_detector = SkaterDetector()
-        
-#     def detect_shots_by_background(self, video_path, threshold=0.7, motion_threshold=0.1):
-#         """Улучшенная детекция смены планов с фильтрацией движения фигуриста"""
-#         cap = cv2.VideoCapture(video_path)
-#         fps = cap.get(cv2.CAP_PROP_FPS) or 25
-        
-#         shots = [0.0]
-#         prev_background_hist = None
-#         frame_idx = 0
-#         last_shot_time = 0.0
-        
-#         sample_interval = max(1, int(fps / 5))
-#         prev_frame = None
-        
-#         while True:
-#             ret, frame = cap.read()
-#             if not ret:
-#                 break
-                
-#             if frame_idx % sample_interval != 0:
-#                 frame_idx += 1
-#                 continue
-            
-#             # Детекция фигуриста и удаление его из кадра
-#             frame_without_skater, bbox = self.skater_detector.detect_skater(frame)
-            
-#             if frame_without_skater is None:
-#                 continue
-            
-#             # Фильтрация по движению камеры (если предыдущий кадр есть)
-#             if prev_frame is not None:
-#                 # Сравниваем только фон (без фигуриста)
-#                 prev_gray = cv2.cvtColor(prev_frame, cv2.COLOR_BGR2GRAY)
-#                 curr_gray = cv2.cvtColor(frame_without_skater, cv2.COLOR_BGR2GRAY)
-                
-#                 flow = cv2.calcOpticalFlowFarneback(prev_gray, curr_gray, None, 0.5, 3, 15, 3, 5, 1.2, 0)
-#                 motion_magnitude = np.sqrt(flow[...,0]**2 + flow[...,1]**2)
-#                 avg_motion = np.mean(motion_magnitude)
-                
-#                 # Пропускаем кадры с сильным движением камеры
-#                 if avg_motion > motion_threshold:
-#                     prev_frame = frame_without_skater
-#                     frame_idx += 1
-#                     continue
-            
-#             # Анализ фона
-#             background_frame = cv2.resize(frame_without_skater, (320, 180))
-            
-#             hist_b = cv2.calcHist([background_frame], [0], None, [32], [0, 256])
-#             hist_g = cv2.calcHist([background_frame], [1], None, [32], [0, 256])
-#             hist_r = cv2.calcHist([background_frame], [2], None, [32], [0, 256])
-            
-#             hist_b = cv2.normalize(hist_b, hist_b).flatten()
-#             hist_g = cv2.normalize(hist_g, hist_g).flatten()
-#             hist_r = cv2.normalize(hist_r, hist_r).flatten()
-            
-#             current_hist = np.concatenate([hist_b, hist_g, hist_r])
-            
-#             if prev_background_hist is not None:
-#                 correlation = cv2.compareHist(prev_background_hist, current_hist, cv2.HISTCMP_CORREL)
-#                 current_time = frame_idx / fps
-                
-#                 if correlation < threshold and (current_time - last_shot_time) > 2.0:
-#                     shots.append(round(current_time, 2))
-#                     last_shot_time = current_time
-            
-#             prev_background_hist = current_hist
-#             prev_frame = frame_without_skater
-#             frame_idx += 1
-        
-#         cap.release()
-#         return shots
+# backend/video/shots_improved.py
+"""
+Поиск смен планов (склеек) без декодирования каждого кадра в изображение.
+
+Грубый проход: каждый step-й кадр (sample_fps в секунду) читается и
+сжимается в миниатюру THUMB_SIZE, остальные пропускаются grab(). Цветовые
+гистограммы миниатюр считаются пачками одним np.bincount, расстояния между
+соседними выборками - одним векторным выражением. Кандидат - выборка с
+расстоянием больше cut_threshold и в contrast раз больше медианы соседних
+расстояний (быстрое движение камеры меняет гистограмму постоянно, склейка -
+одним скачком). Точный кадр склейки ищется двоичным поиском только между
+двумя соседними выборками (log2(step) кадров), и кандидат подтверждается,
+если на найденной границе соседние кадры резко различаются (плавная
+панорама или наезд склейкой не считаются)
+"""
+import logging
+import time
+
+import cv2
+import numpy as np
+from scipy.ndimage import median_filter
+
+logger = logging.getLogger(__name__)
+
+THUMB_SIZE = (64, 36)
+HIST_BINS = 16
+BLOCK_SIZE = 256
+
+
+def thumbnail(frame, size=THUMB_SIZE):
+    """Миниатюра кадра: прореживание строк/столбцов, затем INTER_AREA по маленькому изображению"""
+    h, w = frame.shape[:2]
+    stride = max(1, w // (size[0] * 2))
+    return cv2.resize(frame[::stride, ::stride], size, interpolation=cv2.INTER_AREA)
+
+
+def color_histograms(thumbs):
+    """(N, h, w, 3) uint8 -> (N, 3 * HIST_BINS): гистограммы каналов, сумма строки 1"""
+    thumbs = np.asarray(thumbs)
+    n = len(thumbs)
+    pixels = thumbs.reshape(n, -1, 3)
+    bins = (pixels // (256 // HIST_BINS)).astype(np.int64) + np.arange(3) * HIST_BINS
+    bins += (np.arange(n) * 3 * HIST_BINS)[:, None, None]
+    hist = np.bincount(bins.ravel(), minlength=n * 3 * HIST_BINS).reshape(n, 3 * HIST_BINS)
+    return hist / (pixels.shape[1] * 3)
+
+
+def histogram_distance(a, b):
+    """Расстояние полной вариации между гистограммами: 0 - одинаковые, 1 - не пересекаются"""
+    return 0.5 * np.abs(a - b).sum(axis=-1)
+
+
+class ImprovedShotDetector:
+    def __init__(self, sample_fps=4, cut_threshold=0.25, contrast=3.0, min_shot_duration=2.0, max_shots=50,
+                 seek_gap=None):
+        self.sample_fps = sample_fps
+        self.cut_threshold = cut_threshold
+        self.contrast = contrast
+        self.min_shot_duration = min_shot_duration
+        self.max_shots = max_shots
+        # Ближе seek_gap кадров вперед - grab(), дальше или назад - перемотка
+        self.seek_gap = seek_gap
+
+    def _sample(self, cap, step):
+        """Грубый проход: (номера выборок, гистограммы (N, bins), число кадров)"""
+        indices, hists, thumbs = [], [], []
+        index = 0
+        while True:
+            if index % step == 0:
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                indices.append(index)
+                thumbs.append(thumbnail(frame))
+                if len(thumbs) == BLOCK_SIZE:
+                    hists.append(color_histograms(thumbs))
+                    thumbs = []
+            elif not cap.grab():
+                break
+            index += 1
+        if thumbs:
+            hists.append(color_histograms(thumbs))
+        hists = np.concatenate(hists) if hists else np.empty((0, 3 * HIST_BINS))
+        return np.array(indices), hists, index
+
+    def _refine(self, cap, position, lo, hi, h_lo, h_hi, seek_gap):
+        """
+        Двоичный поиск первого кадра нового плана между выборками lo и hi.
+        Возвращает (кадр склейки, резкость границы, позиция чтения, число чтений)
+        """
+        reads = 0
+        while hi - lo > 1:
+            mid = (lo + hi) // 2
+            if mid < position or mid - position > seek_gap:
+                cap.set(cv2.CAP_PROP_POS_FRAMES, mid)
+                position = mid
+            while position < mid and cap.grab():
+                position += 1
+            ret, frame = cap.read()
+            reads += 1
+            if not ret:
+                break
+            position += 1
+            h_mid = color_histograms([thumbnail(frame)])[0]
+            if histogram_distance(h_mid, h_lo) <= histogram_distance(h_mid, h_hi):
+                lo, h_lo = mid, h_mid
+            else:
+                hi, h_hi = mid, h_mid
+        return hi, float(histogram_distance(h_lo, h_hi)), position, reads
+
+    def detect(self, video_path):
+        """Кадры склеек (первые кадры новых планов), fps и число кадров"""
+        started = time.perf_counter()
+        cap = cv2.VideoCapture(video_path)
+        if not cap.isOpened():
+            raise ValueError("Не удалось открыть видео")
+        try:
+            fps = cap.get(cv2.CAP_PROP_FPS) or 25
+            step = max(1, int(round(fps / self.sample_fps)))
+            seek_gap = self.seek_gap if self.seek_gap is not None else int(2 * fps)
+
+            indices, hists, frame_count = self._sample(cap, step)
+            if len(indices) < 2:
+                return [], fps, frame_count
+
+            distances = histogram_distance(hists[1:], hists[:-1])
+            # Медиана расстояний в окне ~4 с вокруг выборки
+            local = median_filter(distances, size=2 * int(round(2 * fps / step)) + 1, mode="nearest")
+            candidates = np.flatnonzero((distances > self.cut_threshold) & (distances > self.contrast * local)) + 1
+
+            # Кандидаты по возрастанию: чтение между ними идет вперед, почти без перемотки
+            cap.set(cv2.CAP_PROP_POS_FRAMES, 0)
+            position = 0
+            cuts, reads = [], 0
+            for i in candidates:
+                cut, sharpness, position, n = self._refine(
+                    cap, position, indices[i - 1], indices[i], hists[i - 1], hists[i], seek_gap
+                )
+                reads += n
+                if sharpness >= self.cut_threshold * 0.5:
+                    cuts.append(int(cut))
+        finally:
+            cap.release()
+
+        # Слишком короткие планы (вспышки, титры) не считаются отдельными
+        boundaries = []
+        last = 0
+        for cut in cuts:
+            if (cut - last) / fps >= self.min_shot_duration and len(boundaries) < self.max_shots:
+                boundaries.append(cut)
+                last = cut
+
+        logger.info(
+            f"Смены планов: {len(boundaries)} за {time.perf_counter() - started:.1f} с; "
+            f"выборок {len(indices)} из {frame_count} кадров, кандидатов {len(candidates)}, "
+            f"кадров при уточнении {reads}"
+        )
+        return boundaries, fps, frame_count
+
+    def shots_timeline(self, video_path):
+        """Планы видео: [{index, start, end, duration, start_frame, end_frame}, ...] (время в секундах)"""
+        boundaries, fps, frame_count = self.detect(video_path)
+        edges = [0] + boundaries + [frame_count]
+        return [
+            {
+                "index": k + 1,
+                "start": round(start / fps, 2),
+                "end": round(end / fps, 2),
+                "duration": round((end - start) / fps, 2),
+                "start_frame": start,
+                "end_frame": end
+            }
+            for k, (start, end) in enumerate(zip(edges[:-1], edges[1:]))
+            if end > start
+        ]
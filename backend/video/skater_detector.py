@@ -1,47 +1,125 @@
 # ./backend/video/skater_detector.py
+import cv2
 import numpy as np
-from ultralytics import YOLO
-import torch 
+
+from backend.config import SKATER_BACKEND, SKATER_MODEL, SKATER_BATCH_SIZE, SKATER_INPUT_SIZE, SKATER_DETECT_EVERY
+from backend.video.models import get_detector_backend
+
+PERSON_CLASS = 0
+BBOX_PADDING = 15
+STRIDE = 32
+
+
+def letterbox(frame, size):
+    """
+    Уменьшает кадр так, чтобы длинная сторона была size, и дополняет до
+    кратных STRIDE сторон. Возвращает (кадр, масштаб, (отступ x, отступ y))
+    """
+    h, w = frame.shape[:2]
+    scale = min(size / max(h, w), 1.0)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    pad_w = (-new_w) % STRIDE
+    pad_h = (-new_h) % STRIDE
+    left, top = pad_w // 2, pad_h // 2
+
+    if (new_w, new_h) != (w, h):
+        frame = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_AREA)
+    if pad_w or pad_h:
+        frame = cv2.copyMakeBorder(
+            frame, top, pad_h - top, left, pad_w - left,
+            cv2.BORDER_CONSTANT, value=(114, 114, 114)
+        )
+    return frame, scale, (left, top)
+
+
+def pad_box(box, frame_shape):
+    """Рамка с отступом BBOX_PADDING, не выходящая за кадр"""
+    x1, y1, x2, y2 = box
+    return (
+        max(0, x1 - BBOX_PADDING),
+        max(0, y1 - BBOX_PADDING),
+        min(frame_shape[1], x2 + BBOX_PADDING),
+        min(frame_shape[0], y2 + BBOX_PADDING),
+    )
+
 
 class SkaterDetector:
-    def __init__(self, model_path='yolov8n.pt'):
-        self.model = YOLO(model_path)
-        self.device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        self.model.to(self.device)
-        
-    def detect_skater(self, frame):
-        """Детектирует фигуриста и возвращает маску без него"""
-        results = self.model(frame, verbose=False)[0]
-        person_boxes = []
-        
-        for box in results.boxes:
-            if int(box.cls) == 0:   
-                x1, y1, x2, y2 = map(int, box.xyxy[0].tolist())
-                person_boxes.append((x1, y1, x2, y2))
-        
-        if not person_boxes:
-            return frame, None, None
-            
+    def __init__(self, model_path=SKATER_MODEL, batch_size=SKATER_BATCH_SIZE, input_size=SKATER_INPUT_SIZE,
+                 backend=SKATER_BACKEND):
+        # Модель общая для процесса: загружается и прогревается один раз
+        self.backend = get_detector_backend(backend, model_path, input_size)
+        self.batch_size = batch_size
+        # Длинная сторона кадра на входе YOLO; рамки пересчитываются в координаты исходного кадра
+        self.input_size = input_size
+
+    @staticmethod
+    def _person_boxes(detections, frame_shape, scale=1.0, pad=(0, 0)):
+        """
+        Рамки людей в координатах исходного кадра, от крупной к мелкой.
+        detections - (N, 6) от бэкенда: x1, y1, x2, y2, уверенность, класс
+        """
+        xyxy = detections[detections[:, 5].astype(int) == PERSON_CLASS, :4]
+        if len(xyxy) == 0:
+            return []
+
+        # Из координат уменьшенного кадра с полями - в координаты исходного
+        xyxy = (xyxy - np.array([pad[0], pad[1], pad[0], pad[1]])) / scale
+        xyxy[:, [0, 2]] = xyxy[:, [0, 2]].clip(0, frame_shape[1])
+        xyxy[:, [1, 3]] = xyxy[:, [1, 3]].clip(0, frame_shape[0])
+        xyxy = xyxy.astype(int)
+
+        areas = (xyxy[:, 2] - xyxy[:, 0]) * (xyxy[:, 3] - xyxy[:, 1])
+        return [tuple(int(v) for v in xyxy[i]) for i in np.argsort(-areas, kind="stable")]
+
+    def detect_people(self, frames, batch_size=None):
+        """Для каждого кадра - все рамки людей (от крупной к мелкой), без отступа"""
+        batch_size = batch_size or self.batch_size
+        people = []
+        for start in range(0, len(frames), batch_size):
+            batch = frames[start:start + batch_size]
+            prepared = [letterbox(frame, self.input_size) for frame in batch]
+            results = self.backend.detect([image for image, _, _ in prepared], self.input_size)
+            for frame, (_, scale, pad), boxes in zip(batch, prepared, results):
+                people.append(self._person_boxes(boxes, frame.shape, scale, pad))
+        return people
+
+    def detect_skaters(self, frames, batch_size=None):
+        """
+        Пакетная детекция: кадры уменьшаются до input_size и подаются в YOLO
+        пачками по batch_size. Возвращает для каждого кадра
+        (bbox с отступом, исходный bbox) в координатах исходного кадра или (None, None)
+        """
         # Берем самого крупного (предполагаем, что это фигурист)
-        largest_box = max(person_boxes, key=lambda b: (b[2]-b[0])*(b[3]-b[1]))
-        x1, y1, x2, y2 = largest_box
-         
-        padding = 15
-        x1 = max(0, x1 - padding)
-        y1 = max(0, y1 - padding)
-        x2 = min(frame.shape[1], x2 + padding)
-        y2 = min(frame.shape[0], y2 + padding)
-        
-        # Создаем маску без фигуриста
-        mask = np.ones(frame.shape[:2], dtype=np.uint8) * 255
-        mask[y1:y2, x1:x2] = 0
+        return [
+            (pad_box(boxes[0], frame.shape), boxes[0]) if boxes else (None, None)
+            for frame, boxes in zip(frames, self.detect_people(frames, batch_size))
+        ]
+
+    @staticmethod
+    def mask_skater(frame, bbox):
+        """Копия кадра с закрашенной областью фигуриста"""
+        x1, y1, x2, y2 = bbox
         frame_without_skater = frame.copy()
-        frame_without_skater[mask == 0] = 0
-        
-        return frame_without_skater, (x1, y1, x2, y2), largest_box
+        frame_without_skater[y1:y2, x1:x2] = 0
+        return frame_without_skater
+
+    def detect_skater(self, frame, with_masked_frame=False):
+        """
+        Детектирует фигуриста: (кадр без фигуриста, bbox с отступом, исходный bbox).
+        Кадр без фигуриста строится только при with_masked_frame, иначе None
+        """
+        bbox, largest_box = self.detect_skaters([frame])[0]
+        if bbox is None:
+            return (frame if with_masked_frame else None), None, None
+
+        frame_without_skater = self.mask_skater(frame, bbox) if with_masked_frame else None
+        return frame_without_skater, bbox, largest_box
 
-    def track_skater_body(self, frames, fps=25):
+    def track_skater_body(self, frames, fps=25, detections=None):
         """
+        detections - уже найденные рамки для frames (см. DetectionCache),
+        иначе детекция выполняется здесь
+
         Возвращает массив данных по телу фигуриста в каждом кадре
         Каждый элемент: {
             "bbox": [x1, y1, x2, y2],
@@ -65,8 +143,10 @@ class SkaterDetector:
         prev_height = None
         prev_angle = None
 
-        for i, frame in enumerate(frames):
-            _, bbox, full_bbox = self.detect_skater(frame)
+        if detections is None:
+            detections = self.detect_skaters(frames)
+
+        for i, (bbox, full_bbox) in enumerate(detections):
             if not bbox:
                 body_data.append(None)
                 continue
@@ -122,9 +202,9 @@ class SkaterDetector:
 
         return body_data
 
-    def get_body_features(self, frames, fps=25):
+    def get_body_features(self, frames, fps=25, detections=None):
         """Агрегирует признаки тела в статистику для сравнения"""
-        body_data = self.track_skater_body(frames, fps)
+        body_data = self.track_skater_body(frames, fps, detections)
         
         # Фильтруем только валидные кадры
         valid_data = [d for d in body_data if d is not None]
@@ -155,3 +235,66 @@ class SkaterDetector:
             "legs_apart_ratio": float(np.mean(legs_apart)),
             "frames_count": len(valid_data)
         }
+
+
+class DetectionCache:
+    """
+    Детекции фигуриста в пределах одного видео, ключ - номер кадра.
+    Пересекающиеся окна (контекст соседних прыжков, кадры-примеры) берут
+    рамки отсюда: каждый кадр проходит через YOLO не больше одного раза.
+    При detect_every > 1 YOLO видит только каждый K-й кадр окна, остальные
+    заполняет SkaterTracker
+    """
+
+    def __init__(self, detector, detections=None, detect_every=SKATER_DETECT_EVERY):
+        self.detector = detector
+        # Рамки, уже найденные раньше (например, при поиске прыжков)
+        self.detections = dict(detections or {})
+        self.tracker = None
+        if detect_every > 1:
+            from backend.video.skater_tracker import SkaterTracker
+            self.tracker = SkaterTracker(detector, detect_every)
+        self.detected_frames = 0
+        self.tracked_frames = 0
+        self.cached_frames = 0
+
+    def _track(self, missing):
+        """Трекинг по непрерывным участкам кадров; возвращает число кадров, прошедших через YOLO"""
+        before = self.tracker.detected_frames
+        indices = list(missing)
+        run = [indices[0]]
+        for index in indices[1:] + [None]:
+            if index is not None and index == run[-1] + 1:
+                run.append(index)
+                continue
+            found = self.tracker.track([missing[i] for i in run])
+            self.detections.update(zip(run, found))
+            run = [index]
+        return self.tracker.detected_frames - before
+
+    def detect(self, frames, indices):
+        """Рамки для кадров frames с номерами indices; новые кадры - одной пачкой"""
+        missing = {}
+        for frame, index in zip(frames, indices):
+            if index not in self.detections and index not in missing:
+                missing[index] = frame
+
+        detected = 0
+        if missing and self.tracker is not None:
+            detected = self._track(missing)
+        elif missing:
+            found = self.detector.detect_skaters(list(missing.values()))
+            self.detections.update(zip(missing.keys(), found))
+            detected = len(missing)
+
+        self.detected_frames += detected
+        self.tracked_frames += len(missing) - detected
+        self.cached_frames += len(indices) - len(missing)
+        return [self.detections[index] for index in indices]
+
+    def info(self):
+        return {
+            "yolo_frames": self.detected_frames,
+            "tracked_frames": self.tracked_frames,
+            "cached_frames": self.cached_frames
+        }
@@ -0,0 +1,179 @@
+# backend/video/skater_tracker.py
+"""
+Трекинг фигуриста между детекциями YOLO.
+
+YOLO запускается на каждом every-м кадре (одной пачкой), промежуточные
+кадры заполняет трекер: фильтр Калмана (центр рамки, постоянная скорость)
+предсказывает положение, сопоставление с шаблоном (matchTemplate по серому
+уменьшенному фрагменту, три масштаба) уточняет его. Если совпадение с
+шаблоном ниже min_score, кадр детектируется заново. На кадрах с детекцией
+фигурист выбирается по IoU с предсказанной рамкой, а не как самый крупный
+человек: судья или зритель у бортика не перехватывает трек.
+
+Экспериментально: включается SKATER_DETECT_EVERY > 1 (по умолчанию
+выключен); IoU с покадровой YOLO проверен только на синтетических
+видео - на реальных его нужно замерить bench_tracker
+"""
+import cv2
+import numpy as np
+
+from backend.config import SKATER_DETECT_EVERY
+from backend.video.skater_detector import pad_box
+
+TEMPLATE_HEIGHT = 48
+SCALES = (0.95, 1.0, 1.05)
+
+
+def iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0, x2 - x1) * max(0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def _kalman(center):
+    """Постоянная скорость центра рамки: состояние (cx, cy, vx, vy), измерение (cx, cy)"""
+    kf = cv2.KalmanFilter(4, 2)
+    kf.transitionMatrix = np.array([[1, 0, 1, 0], [0, 1, 0, 1], [0, 0, 1, 0], [0, 0, 0, 1]], np.float32)
+    kf.measurementMatrix = np.array([[1, 0, 0, 0], [0, 1, 0, 0]], np.float32)
+    kf.processNoiseCov = np.eye(4, dtype=np.float32)
+    kf.measurementNoiseCov = np.eye(2, dtype=np.float32) * 4
+    kf.errorCovPost = np.eye(4, dtype=np.float32) * 10
+    kf.statePost = np.array([[center[0]], [center[1]], [0], [0]], np.float32)
+    return kf
+
+
+def _center(box):
+    return (box[0] + box[2]) / 2, (box[1] + box[3]) / 2
+
+
+class SkaterTracker:
+    def __init__(self, detector, every=SKATER_DETECT_EVERY, min_score=0.5, search=0.5, iou_threshold=0.3):
+        self.detector = detector
+        self.every = max(1, every)
+        # Ниже этой уверенности (TM_CCOEFF_NORMED) рамка трекера не принимается
+        self.min_score = min_score
+        # Окно поиска: рамка, расширенная на search своих размеров в каждую сторону
+        self.search = search
+        self.iou_threshold = iou_threshold
+        self.detected_frames = 0
+        self.tracked_frames = 0
+        self.redetections = 0
+
+    @staticmethod
+    def _template(gray, box):
+        """Серый фрагмент рамки высотой TEMPLATE_HEIGHT и коэффициент уменьшения"""
+        x1, y1, x2, y2 = box
+        patch = gray[y1:y2, x1:x2]
+        if patch.shape[0] < 4 or patch.shape[1] < 4:
+            return None, 1.0
+        factor = TEMPLATE_HEIGHT / patch.shape[0]
+        size = (max(4, int(round(patch.shape[1] * factor))), TEMPLATE_HEIGHT)
+        return cv2.resize(patch, size, interpolation=cv2.INTER_AREA), factor
+
+    def _match(self, gray, template, factor, center, size):
+        """(рамка, уверенность) лучшего совпадения шаблона вокруг предсказанного центра"""
+        w, h = size
+        mx, my = w * (0.5 + self.search), h * (0.5 + self.search)
+        x0, y0 = max(0, int(center[0] - mx)), max(0, int(center[1] - my))
+        x1, y1 = min(gray.shape[1], int(center[0] + mx)), min(gray.shape[0], int(center[1] + my))
+        crop = gray[y0:y1, x0:x1]
+        if crop.size == 0:
+            return None, -1.0
+        region = cv2.resize(
+            crop, (max(1, int(round(crop.shape[1] * factor))), max(1, int(round(crop.shape[0] * factor)))),
+            interpolation=cv2.INTER_AREA
+        )
+
+        best_box, best_score = None, -1.0
+        th, tw = template.shape
+        for scale in SCALES:
+            t = template if scale == 1.0 else cv2.resize(template, (max(4, int(round(tw * scale))), max(4, int(round(th * scale)))))
+            if t.shape[0] > region.shape[0] or t.shape[1] > region.shape[1]:
+                continue
+            _, score, _, (lx, ly) = cv2.minMaxLoc(cv2.matchTemplate(region, t, cv2.TM_CCOEFF_NORMED))
+            if score > best_score:
+                best_score = score
+                best_box = (
+                    x0 + lx / factor, y0 + ly / factor,
+                    x0 + (lx + t.shape[1]) / factor, y0 + (ly + t.shape[0]) / factor
+                )
+        return best_box, best_score
+
+    def _associate(self, boxes, predicted):
+        """Рамка, продолжающая трек (по IoU с предсказанием), иначе самая крупная"""
+        if not boxes:
+            return None
+        if predicted is not None:
+            overlaps = [iou(box, predicted) for box in boxes]
+            best = int(np.argmax(overlaps))
+            if overlaps[best] >= self.iou_threshold:
+                return boxes[best]
+        return boxes[0]
+
+    def track(self, frames):
+        """
+        Рамки фигуриста для последовательных кадров - в том же формате, что
+        SkaterDetector.detect_skaters: [(bbox с отступом, исходный bbox) или (None, None)]
+        """
+        scheduled = list(range(0, len(frames), self.every))
+        people = dict(zip(scheduled, self.detector.detect_people([frames[i] for i in scheduled])))
+        self.detected_frames += len(scheduled)
+
+        results = []
+        box = kf = template = None
+        factor = 1.0
+        for i, frame in enumerate(frames):
+            predicted = None
+            if kf is not None:
+                state = kf.predict()
+                cx, cy = float(state[0, 0]), float(state[1, 0])
+                w, h = box[2] - box[0], box[3] - box[1]
+                predicted = (cx - w / 2, cy - h / 2, cx + w / 2, cy + h / 2)
+
+            detected = True
+            gray = None
+            if i in people:
+                found = self._associate(people[i], predicted)
+            elif template is not None:
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                found, score = self._match(gray, template, factor, (cx, cy), (w, h))
+                if found is not None and score >= self.min_score:
+                    detected = False
+                    self.tracked_frames += 1
+                else:
+                    # Трекер потерял фигуриста - внеочередная детекция
+                    found = self._associate(self.detector.detect_people([frame])[0], predicted)
+                    self.detected_frames += 1
+                    self.redetections += 1
+            else:
+                # Трека нет (фигуриста не было на последней детекции) - ждем следующей
+                found = None
+
+            if found is None:
+                box = kf = template = None
+                results.append((None, None))
+                continue
+
+            found = tuple(int(round(v)) for v in found)
+            if detected:
+                if kf is None or predicted is None or iou(found, predicted) < self.iou_threshold:
+                    kf = _kalman(_center(found))
+                else:
+                    kf.correct(np.array(_center(found), np.float32).reshape(2, 1))
+                # Шаблон обновляется только по детекциям - трекер не накапливает дрейф
+                gray = gray if gray is not None else cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                template, factor = self._template(gray, found)
+            else:
+                kf.correct(np.array(_center(found), np.float32).reshape(2, 1))
+            box = found
+            results.append((pad_box(found, frame.shape), found))
+        return results
+
+    def info(self):
+        return {
+            "yolo_frames": self.detected_frames,
+            "tracked_frames": self.tracked_frames,
+            "redetections": self.redetections
+        }
@@ -277,7 +277,7 @@ function displaySimilarityResults(results) {
     if (!results || results.length === 0) { container.innerHTML = '<p>Не найдено</p>'; return; }
     container.innerHTML = results.map(item => `
 <div class="similarity-item">
-<img src="data:image/png;base64,${item.image_base64}" style="width:150px;height:auto">
+<a href="${item.image_url}" target="_blank"><img src="${item.thumbnail_url}" loading="lazy" style="width:150px;height:auto"></a>
 <h4>${item.title}</h4>
 <p>Сходство: ${item.score}</p>
 </div>`).join('');
@@ -317,10 +317,19 @@ async function showGenreStats(forceRefresh = false) {
             </ul>
         </div>`;
      
-    if (data.plot_base64) {
+    if (data.genres) {
+        html += `
+        <table class="stats-genres">
+            <tr><th>Жанр</th><th>Книг</th><th>С лицами, %</th><th>Минималистичные, %</th><th>Перегруженные, %</th></tr>
+            ${Object.entries(data.genres).map(([genre, g]) => `
+            <tr><td>${genre}</td><td>${g.total_books}</td><td>${g.face_percentage ?? '-'}</td><td>${g.minimalistic_percentage ?? '-'}</td><td>${g.overloaded_percentage ?? '-'}</td></tr>`).join('')}
+        </table>`;
+    }
+
+    if (data.plot_url) {
         html += `
         <div class="stats-plot"> 
-            <img src="data:image/png;base64,${data.plot_base64}" style="max-width: 100%; border: 1px solid #ccc;">
+            <img src="${data.plot_url}" loading="lazy" style="max-width: 100%; border: 1px solid #ccc;">
         </div>`;
     }
     